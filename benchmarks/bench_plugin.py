@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+"""Measure the cost of pytest-github on large synthetic test suites.
+
+A test tree is generated with the requested number of items, spread over
+plain, parametrized and class-based tests, which reference a number of
+distinct github issues.  github3.login is replaced by a fake backend that
+sleeps ``--latency`` seconds per request.  Each scenario runs pytest in a
+fresh process, and reports its wall time and peak memory::
+
+    python benchmarks/bench_plugin.py --preset large --latency 0.01 --json large.json
+    python benchmarks/bench_plugin.py --preset large --latency 0.01 --compare large.json
+
+:copyright: see LICENSE for details
+:license: MIT, see LICENSE for more details.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+# (items, distinct issues) generated by each preset
+PRESETS = {
+    'small': (10000, 10),
+    'medium': (50000, 500),
+    'large': (200000, 5000),
+}
+
+# pytest arguments used by each scenario
+SCENARIOS = {
+    # Collection only, issues aren't resolved
+    'collect': ['--collect-only', '-q'],
+    # Collection, issue resolution, and pytest_runtest_setup for every item
+    'run': ['-q'],
+    # The same run, without the plugin, to isolate the overhead of the plugin
+    'run-baseline': ['-q', '-p', 'no:pytest-github'],
+    # Collection, issue resolution, and the --github-summary report
+    'summary': ['--github-summary'],
+    # The same run, fetching issues found by parsing test files while they are collected
+    'run-static': ['-q', '--github-static'],
+    # The same run, fetching each issue in the background once collected, in the order of its first test
+    'run-pipeline': ['-q', '--github-pipeline'],
+    # The --github-summary report of the github markers found by parsing test files, without collecting
+    'summary-static': ['--github-summary', '--github-static'],
+}
+
+# Number of issues listed in each repository
+ISSUES_PER_REPOSITORY = 50
+
+# Number of test functions written to each module
+FUNCTIONS_PER_MODULE = 200
+
+CONFTEST = '''
+import os
+import time
+
+import github3
+
+LATENCY = float(os.environ.get('PYTEST_GITHUB_BENCH_LATENCY', '0'))
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'github(*args): GitHub issue integration')
+
+
+class Label(object):
+    def __init__(self, name):
+        self.name = name
+
+
+class Issue(object):
+    def __init__(self, username, repository, number):
+        self.html_url = 'https://github.com/%s/%s/issues/%s' % (username, repository, number)
+        self.number = int(number)
+        self.title = 'Issue %s' % number
+        self.state = 'closed' if self.number % 2 else 'open'
+        self.original_labels = [Label('bug')]
+
+
+class Response(object):
+    status_code = 200
+    headers = {}
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+class Session(object):
+    """List the issues of any repository, which never change."""
+
+    def get(self, url, params=None, **kwargs):
+        time.sleep(LATENCY)
+        (username, repository) = url.split('/')[-3:-1]
+        params = params or {}
+        if params.get('since'):
+            return Response([])
+        (per_page, page) = (params.get('per_page', 30), params.get('page', 1))
+        first = (page - 1) * per_page + 1
+        issues = [Issue(username, repository, number) for number in range(first, first + per_page)]
+        return Response([dict(html_url=issue.html_url, number=issue.number, title=issue.title, state=issue.state,
+                              labels=[dict(name=label.name) for label in issue.original_labels]) for issue in issues])
+
+
+class Backend(object):
+    """Answer every request after LATENCY seconds."""
+
+    session = Session()
+
+    def _build_url(self, *args):
+        return '/'.join(('https://api.github.com',) + args)
+
+    def issue(self, username, repository, number):
+        time.sleep(LATENCY)
+        return Issue(username, repository, number)
+
+    def rate_limit(self):
+        limit = {'remaining': 10 ** 6, 'reset': time.time() + 3600}
+        return {'resources': {'core': limit, 'graphql': limit}}
+
+
+github3.login = lambda *args, **kwargs: Backend()
+'''
+
+
+def issue_url(index):
+    """Return the URL of the index-th distinct issue."""
+    repository, number = divmod(index, ISSUES_PER_REPOSITORY)
+    return 'https://github.com/bench/repo%s/issues/%s' % (repository, number + 1)
+
+
+def generate_tree(root, items, issues):
+    """Write a test tree with about ``items`` items, referencing ``issues`` distinct issues.
+
+    Return the number of items written.
+    """
+    with open(os.path.join(root, 'conftest.py'), 'w') as fd:
+        fd.write(CONFTEST)
+
+    written = 0
+    referenced = 0
+    module = 0
+    while written < items:
+        lines = ['import pytest', '']
+        for function in range(FUNCTIONS_PER_MODULE):
+            if written >= items:
+                break
+            kind = function % 5
+            # Mark most tests with one or more issues, cycling through every issue
+            urls = []
+            if kind != 0:
+                for _ in range(1 + kind % 3):
+                    urls.append(issue_url(referenced % issues))
+                    referenced += 1
+            if urls:
+                lines.append('@pytest.mark.github(%s)' % ', '.join(repr(url) for url in urls))
+            if kind in (2, 4):
+                # Parametrized tests, with a varying number of parameters
+                count = min((1, 5, 20)[function % 3], items - written)
+                lines.append('@pytest.mark.parametrize("value", range(%s))' % count)
+                lines.append('def test_%s(value):' % function)
+                written += count
+            elif kind == 3:
+                lines.append('class Test%s(object):' % function)
+                lines.append('    def test_method(self):')
+                lines.append('        pass')
+                lines.append('')
+                written += 1
+                continue
+            else:
+                lines.append('def test_%s():' % function)
+                written += 1
+            lines.append('    pass')
+            lines.append('')
+
+        with open(os.path.join(root, 'test_bench_%s.py' % module), 'w') as fd:
+            fd.write('\n'.join(lines))
+        module += 1
+    return written
+
+
+def run_child(output, args):
+    """Run pytest in this process, and write its wall time and peak memory to output."""
+    import pytest
+
+    start = time.time()
+    exitcode = pytest.main(args)
+    wall = time.time() - start
+
+    peak = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform != 'darwin':
+            peak *= 1024  # kilobytes on linux
+    with open(output, 'w') as fd:
+        json.dump({'wall': wall, 'peak': peak, 'exitcode': int(exitcode)}, fd)
+
+
+def run_scenario(root, scenario, latency, workers, repeat):
+    """Return the best wall time and peak memory of repeat runs of scenario."""
+    env = dict(os.environ, PYTEST_GITHUB_BENCH_LATENCY=str(latency))
+    args = SCENARIOS[scenario] + ['-p', 'no:cacheprovider', '--github-workers', str(workers)]
+    if 'no:pytest-github' in args:
+        args = args[:-2]
+    output = os.path.join(root, '.result.json')
+    results = []
+    with open(os.devnull, 'w') as devnull:
+        for _ in range(repeat):
+            subprocess.check_call([sys.executable, os.path.abspath(__file__), '--child', output, '--'] + args,
+                                  cwd=root, env=env, stdout=devnull)
+            with open(output) as fd:
+                results.append(json.load(fd))
+    return {
+        'wall': min(result['wall'] for result in results),
+        'peak': min(result['peak'] for result in results) if results[0]['peak'] is not None else None,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return a description of each result more than tolerance worse than baseline."""
+    regressions = []
+    for scenario, result in sorted(results.items()):
+        for metric in ('wall', 'peak'):
+            before = baseline.get(scenario, {}).get(metric)
+            after = result.get(metric)
+            if before and after and after > before * (1 + tolerance):
+                regressions.append('%s %s: %.3f -> %.3f (+%.0f%%)' % (
+                    scenario, metric, before, after, 100.0 * (after - before) / before))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='small',
+                        help='Size of the generated test tree (default: %(default)s)')
+    parser.add_argument('--items', type=int, help='Number of test items, overriding the preset')
+    parser.add_argument('--issues', type=int, help='Number of distinct github issues, overriding the preset')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Seconds the fake backend takes to answer each request (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=1, help='Value of --github-workers (default: %(default)s)')
+    parser.add_argument('--scenarios', default=','.join(sorted(SCENARIOS)),
+                        help='Comma separated scenarios to run (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs of each scenario, keeping the best')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--compare', help='Fail if any result regressed from the results in this file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Fraction a result may exceed --compare results by (default: %(default)s)')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated test tree')
+    (args, pytest_args) = parser.parse_known_args(argv)
+
+    if args.child:
+        return run_child(args.child, [arg for arg in pytest_args if arg != '--'])
+
+    (items, issues) = PRESETS[args.preset]
+    items = args.items or items
+    issues = args.issues or issues
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(',')]
+    for scenario in scenarios:
+        if scenario not in SCENARIOS:
+            parser.error('unknown scenario: %s' % scenario)
+
+    root = tempfile.mkdtemp(prefix='pytest-github-bench-')
+    try:
+        written = generate_tree(root, items, issues)
+        print('%s items referencing %s github issues, %ss latency, %s workers (%s)' % (
+            written, issues, args.latency, args.workers, root))
+
+        results = {}
+        for scenario in scenarios:
+            results[scenario] = run_scenario(root, scenario, args.latency, args.workers, args.repeat)
+            peak = results[scenario]['peak']
+            print('%-14s %9.3fs %9s' % (
+                scenario, results[scenario]['wall'], '%.1fMB' % (peak / 1048576.0) if peak else '-'))
+        if 'run' in results and 'run-baseline' in results:
+            print('%-14s %9.3fs' % ('overhead', results['run']['wall'] - results['run-baseline']['wall']))
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w') as fd:
+            json.dump({'items': written, 'issues': issues, 'latency': args.latency, 'workers': args.workers,
+                       'results': results}, fd, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as fd:
+            regressions = compare(results, json.load(fd)['results'], args.tolerance)
+        for regression in regressions:
+            print('REGRESSION %s' % regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""Measure what pytest-github adds to the startup of pytest.
+
+Every pytest invocation loads the plugin through its entry point, including
+runs without any github marker.  Each scenario runs in a fresh process, and
+reports its best wall time, and which of the expensive dependencies of the
+plugin it imported::
+
+    python benchmarks/bench_startup.py --repeat 10 --json startup.json
+    python benchmarks/bench_startup.py --repeat 10 --compare startup.json
+
+:copyright: see LICENSE for details
+:license: MIT, see LICENSE for more details.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from bench_plugin import compare
+
+# Modules the plugin only needs once a github issue is resolved
+DEPENDENCIES = ('github3', 'requests', 'yaml')
+
+# Python run in each scenario
+SCENARIOS = {
+    # Importing pytest, as loading any plugin requires
+    'import-baseline': 'import pytest',
+    # Importing the plugin module, as the pytest11 entry point does
+    'import': 'import pytest; import pytest_github.plugin',
+    # A run of a single test without github markers, with and without the plugin
+    'run': 'import pytest; pytest.main(["-q", "-p", "no:cacheprovider"])',
+    'run-baseline': 'import pytest; pytest.main(["-q", "-p", "no:cacheprovider", "-p", "no:pytest-github"])',
+}
+
+CHILD = '''
+import json, sys, time
+start = time.time()
+%s
+wall = time.time() - start
+json.dump({'wall': wall, 'imported': [name for name in %r if name in sys.modules]}, open(%r, 'w'))
+'''
+
+
+def run_scenario(root, scenario, repeat):
+    """Return the best wall time of repeat runs of scenario, and the dependencies it imported."""
+    output = os.path.join(root, '.result.json')
+    results = []
+    with open(os.devnull, 'w') as devnull:
+        for _ in range(repeat):
+            code = CHILD % (SCENARIOS[scenario], DEPENDENCIES, output)
+            subprocess.check_call([sys.executable, '-c', code], cwd=root, stdout=devnull, stderr=devnull)
+            with open(output) as fd:
+                results.append(json.load(fd))
+    return {
+        'wall': min(result['wall'] for result in results),
+        'imported': results[0]['imported'],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--scenarios', default=','.join(sorted(SCENARIOS)),
+                        help='Comma separated scenarios to run (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs of each scenario, keeping the best')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--compare', help='Fail if any result regressed from the results in this file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Fraction a result may exceed --compare results by (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(',')]
+    for scenario in scenarios:
+        if scenario not in SCENARIOS:
+            parser.error('unknown scenario: %s' % scenario)
+
+    root = tempfile.mkdtemp(prefix='pytest-github-startup-')
+    try:
+        with open(os.path.join(root, 'test_startup.py'), 'w') as fd:
+            fd.write('def test_startup():\n    pass\n')
+
+        results = {}
+        for scenario in scenarios:
+            results[scenario] = run_scenario(root, scenario, args.repeat)
+            print('%-16s %9.3fs  imported: %s' % (
+                scenario, results[scenario]['wall'], ', '.join(results[scenario]['imported']) or '-'))
+        for (scenario, baseline) in (('import', 'import-baseline'), ('run', 'run-baseline')):
+            if scenario in results and baseline in results:
+                print('%-16s %9.3fs' % (scenario + ' overhead', results[scenario]['wall'] - results[baseline]['wall']))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w') as fd:
+            json.dump({'repeat': args.repeat, 'results': results}, fd, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as fd:
+            regressions = compare(results, json.load(fd)['results'], args.tolerance)
+        for regression in regressions:
+            print('REGRESSION %s' % regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""Asyncio engine used to resolve github issues over a single HTTP client.
+
+Requires python 3 and the optional ``aiohttp`` package.
+"""
+
+import asyncio
+import json
+
+import aiohttp
+
+from pytest_github.ratelimit import RateLimitExceeded
+
+
+def fetch_issues(api_urls, username=None, password=None, limit=1, connect_timeout=None, read_timeout=None,
+                 observe=None, scheduler=None):
+    """Fetch the github issues found at ``api_urls``, with at most ``limit`` requests in flight.
+
+    Return a list of ``(json, error)`` tuples, in the same order as ``api_urls``.
+    ``observe(elapsed, size)`` is called for every response received.  Requests
+    are paced by any :class:`~pytest_github.ratelimit.RateLimitScheduler` given
+    as ``scheduler``, and retried once a secondary rate limit expires.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(_fetch_issues(api_urls, username, password, limit, connect_timeout, read_timeout,
+                                                     observe, scheduler))
+    finally:
+        loop.close()
+
+
+def _timeouts(connect_timeout, read_timeout):
+    """Return the ClientSession keyword arguments for the given timeouts."""
+    if hasattr(aiohttp, 'ClientTimeout'):
+        return dict(timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout))
+    return dict(conn_timeout=connect_timeout, read_timeout=read_timeout)  # aiohttp < 3.3
+
+
+async def _fetch_issues(api_urls, username, password, limit, connect_timeout, read_timeout, observe, scheduler):
+    auth = None
+    if username and password:
+        auth = aiohttp.BasicAuth(username, password)
+
+    # Every request shares one keep-alive connection pool
+    connector = aiohttp.TCPConnector(limit=max(1, limit))
+    headers = {
+        'Accept': 'application/vnd.github.v3.full+json',
+        'Accept-Encoding': 'gzip',
+    }
+    async with aiohttp.ClientSession(connector=connector, auth=auth, headers=headers,
+                                     **_timeouts(connect_timeout, read_timeout)) as session:
+        return await asyncio.gather(*[_fetch_issue(session, api_url, observe, scheduler) for api_url in api_urls])
+
+
+async def _sleep(scheduler, seconds):
+    """Wait for the rate limit without blocking other requests, counting the time waited."""
+    if seconds > 0:
+        scheduler.record_wait(seconds)
+        await asyncio.sleep(seconds)
+
+
+async def _fetch_issue(session, api_url, observe, scheduler):
+    loop = asyncio.get_event_loop()
+    try:
+        attempt = 0
+        while True:
+            if scheduler is not None:
+                await _sleep(scheduler, scheduler.reserve())
+            start = loop.time()
+            delay = None
+            async with session.get(api_url) as response:
+                body = await response.read()
+                if observe is not None:
+                    observe(loop.time() - start, int(response.headers.get('Content-Length') or len(body)))
+                if scheduler is not None:
+                    scheduler.observe(response)
+                    delay = scheduler.retry_delay(response, attempt)
+            if delay is None:
+                break
+            await _sleep(scheduler, delay)
+            attempt += 1
+
+        if response.status != 200:
+            return (None, '%s %s' % (response.status, response.reason))
+        data = json.loads(body.decode('utf-8'))
+        # Keep any validators alongside the issue, as github3.py does
+        data['ETag'] = response.headers.get('ETag')
+        data['Last-Modified'] = response.headers.get('Last-Modified')
+        return (data, None)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, RateLimitExceeded) as e:
+        return (None, e)
@@ -0,0 +1,429 @@
+"""Fake GitHub REST and GraphQL API served over HTTP.
+
+Lets the plugin's network path be tested, and load tested, without reaching
+GitHub.  Use it as a pytest plugin to get the ``github_server`` fixture::
+
+    pytest_plugins = 'pytest_github.fakeserver'
+
+    def test_foo(testdir, github_server):
+        github_server.add_issue('https://github.com/owner/repo/issues/1', state='closed')
+        testdir.runpytest('--github-api-url', github_server.url,
+                          '--github-username', 'user', '--github-token', 'token')
+
+or run it on its own, for load testing::
+
+    python -m pytest_github.fakeserver --port 8080 --latency 0.05
+
+Issues, per-request latency, rate limit budgets and injected errors are all
+configured on :class:`FakeGitHubServer`.
+
+:copyright: see LICENSE for details
+:license: MIT, see LICENSE for more details.
+"""
+
+import argparse
+import calendar
+import hashlib
+import json
+import re
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlsplit
+except ImportError:  # python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlsplit
+
+import pytest
+
+ISSUE_URL_RE = re.compile(r'https?://github.com/([^/]+)/([^/]+)/(?:issues|pull)/([0-9]+)$')
+ISSUE_PATH_RE = re.compile(r'/repos/([^/]+)/([^/]+)/issues/([0-9]+)$')
+LISTING_PATH_RE = re.compile(r'/repos/([^/]+)/([^/]+)/issues$')
+GRAPHQL_REPOSITORY_RE = re.compile(r'(\w+): repository\(owner: "([^"]+)", name: "([^"]+)"\)')
+GRAPHQL_ISSUE_RE = re.compile(r'(\w+): issueOrPullRequest\(number: (\d+)\)')
+
+
+def timestamp(seconds):
+    """Format seconds since the epoch as GitHub does."""
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(seconds))
+
+
+def parse_timestamp(value):
+    """Return the seconds since the epoch of a GitHub timestamp."""
+    return calendar.timegm(time.strptime(value, '%Y-%m-%dT%H:%M:%SZ'))
+
+
+class RateLimit(object):
+
+    """Budget of requests to an API resource, reset every window seconds."""
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.remaining = limit
+        self.reset = int(time.time()) + window
+
+    def spend(self):
+        """Spend one request, returning whether the budget allowed it."""
+        now = time.time()
+        if now >= self.reset:
+            self.remaining = self.limit
+            self.reset = int(now) + self.window
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+    def headers(self, resource):
+        return {
+            'X-RateLimit-Limit': str(self.limit),
+            'X-RateLimit-Remaining': str(self.remaining),
+            'X-RateLimit-Reset': str(self.reset),
+            'X-RateLimit-Resource': resource,
+        }
+
+    def to_dict(self):
+        return {'limit': self.limit, 'remaining': self.remaining, 'reset': self.reset}
+
+
+class Failure(object):
+
+    """An injected error response."""
+
+    def __init__(self, pattern, status, times, headers, method):
+        self.pattern = re.compile(pattern)
+        self.status = status
+        self.times = times
+        self.headers = headers or {}
+        self.method = method
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+
+    """Answer GitHub API requests from the issues of the server."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.handle_api_request(self, 'GET')
+
+    def do_POST(self):
+        self.server.handle_api_request(self, 'POST')
+
+    def respond(self, status, data=None, headers=None):
+        body = b'' if data is None else json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        for (key, value) in (headers or {}).items():
+            self.send_header(key, value)
+        if data is not None:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeGitHubServer(ThreadingMixIn, HTTPServer):
+
+    """Serve a fake GitHub API from a thread.
+
+    :param latency: seconds to wait before answering each request
+    :param rate_limit: requests allowed per ``rate_limit_window`` seconds, for
+        each of the ``core`` and ``graphql`` resources
+    :param autocreate: answer requests for unknown issues with a new open issue,
+        rather than 404 Not Found
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0, rate_limit=5000, rate_limit_window=3600,
+                 autocreate=True):
+        HTTPServer.__init__(self, (host, port), FakeGitHubHandler)
+        self.latency = latency
+        self.autocreate = autocreate
+        self.rate_limits = {
+            'core': RateLimit(rate_limit, rate_limit_window),
+            'graphql': RateLimit(rate_limit, rate_limit_window),
+        }
+        self.issues = {}
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._failures = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        """Base URL of the API, as given to ``--github-api-url``."""
+        return 'http://%s:%s' % self.server_address[:2]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+    def add_issue(self, url, state='open', title=None, labels=(), updated_at=None):
+        """Add the issue at the html url, replacing any existing issue."""
+        (owner, repository, number) = ISSUE_URL_RE.match(url).groups()
+        now = updated_at or time.time()
+        issue = {
+            'owner': owner,
+            'repository': repository,
+            'number': int(number),
+            'state': state,
+            'title': title or 'Issue %s' % number,
+            'labels': list(labels),
+            'created_at': now,
+            'updated_at': now,
+        }
+        with self._lock:
+            self.issues[(owner, repository, int(number))] = issue
+        return issue
+
+    def update_issue(self, url, **changes):
+        """Change attributes of an issue, marking it updated now."""
+        (owner, repository, number) = ISSUE_URL_RE.match(url).groups()
+        with self._lock:
+            issue = self.issues[(owner, repository, int(number))]
+            issue.update(changes)
+            issue['updated_at'] = changes.get('updated_at', time.time())
+        return issue
+
+    def fail(self, pattern, status=500, times=1, headers=None, method=None):
+        """Answer the next ``times`` requests whose path matches pattern with status.
+
+        A ``times`` of None fails every matching request.
+        """
+        self._failures.append(Failure(pattern, status, times, headers, method))
+
+    def count(self, pattern, method=None):
+        """Return the number of requests received whose path matches pattern."""
+        pattern = re.compile(pattern)
+        return len([path for (request_method, path) in self.requests
+                    if pattern.search(path) and method in (None, request_method)])
+
+    def handle_api_request(self, handler, method):
+        with self._lock:
+            self.requests.append((method, handler.path))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Read the whole body first, so connections kept alive are ready for the next request
+            length = int(handler.headers.get('Content-Length') or 0)
+            body = handler.rfile.read(length) if length else b''
+            if self.latency:
+                time.sleep(self.latency)
+            (status, data, headers) = self.dispatch(handler, method, body)
+            handler.respond(status, data, headers)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def dispatch(self, handler, method, body=b''):
+        """Return the status, data and headers answering a request, given its body."""
+        split = urlsplit(handler.path)
+        path = split.path.rstrip('/')
+        query = dict((key, values[-1]) for (key, values) in parse_qs(split.query).items())
+
+        if method == 'GET' and path == '/rate_limit':
+            limits = dict((resource, limit.to_dict()) for (resource, limit) in self.rate_limits.items())
+            return (200, {'resources': limits, 'rate': limits['core']}, {})
+
+        failure = self.__failure(method, path)
+        if failure is not None:
+            return (failure.status, {'message': 'Injected failure'}, failure.headers)
+
+        resource = 'graphql' if path == '/graphql' else 'core'
+        limit = self.rate_limits[resource]
+        with self._lock:
+            allowed = limit.spend()
+            headers = limit.headers(resource)
+        if not allowed:
+            return (403, {'message': 'API rate limit exceeded'}, headers)
+
+        if method == 'POST' and path == '/graphql':
+            return (200, self.graphql(json.loads(body.decode('utf-8'))['query']), headers)
+
+        match = ISSUE_PATH_RE.match(path)
+        if method == 'GET' and match:
+            issue = self.__issue(*match.groups())
+            if issue is None:
+                return (404, {'message': 'Not Found'}, headers)
+            data = self.issue_json(issue)
+            headers['ETag'] = '"%s"' % hashlib.sha1(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+            headers['Last-Modified'] = time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime(issue['updated_at']))
+            if handler.headers.get('If-None-Match') == headers['ETag']:
+                # Conditional requests answered with 304 are free
+                with self._lock:
+                    limit.remaining += 1
+                    headers.update(limit.headers(resource))
+                return (304, None, headers)
+            return (200, data, headers)
+
+        match = LISTING_PATH_RE.match(path)
+        if method == 'GET' and match:
+            return self.listing(handler, split.path, query, headers, *match.groups())
+
+        return (404, {'message': 'Not Found'}, headers)
+
+    def listing(self, handler, path, query, headers, owner, repository):
+        """Return one page of the issues of a repository."""
+        state = query.get('state', 'open')
+        since = parse_timestamp(query['since']) if 'since' in query else None
+        with self._lock:
+            issues = [issue for (key, issue) in self.issues.items() if key[:2] == (owner, repository)
+                      and state in ('all', issue['state']) and (since is None or issue['updated_at'] >= since)]
+        sort = 'updated_at' if query.get('sort') == 'updated' else 'created_at'
+        issues.sort(key=lambda issue: (issue[sort], issue['number']), reverse=query.get('direction', 'desc') == 'desc')
+
+        per_page = min(100, int(query.get('per_page', 30)))
+        page = int(query.get('page', 1))
+        pages = max(1, (len(issues) + per_page - 1) // per_page)
+        if page < pages:
+            params = '&'.join('%s=%s' % (key, value) for (key, value) in sorted(query.items()) if key != 'page')
+            link = '<%s%s?%s&page=%%s>; rel="%%s"' % (self.url, path, params)
+            headers['Link'] = ', '.join([link % (page + 1, 'next'), link % (pages, 'last')])
+        return (200, [self.issue_json(issue) for issue in issues[(page - 1) * per_page:page * per_page]], headers)
+
+    def graphql(self, query):
+        """Answer the issue lookups of a GraphQL query."""
+        data = {}
+        errors = []
+        fragments = GRAPHQL_REPOSITORY_RE.split(query)
+        for repo_alias, owner, repository, body in zip(*[iter(fragments[1:])] * 4):
+            data[repo_alias] = {}
+            for issue_alias, number in GRAPHQL_ISSUE_RE.findall(body):
+                issue = self.__issue(owner, repository, number)
+                if issue is None:
+                    data[repo_alias][issue_alias] = None
+                    errors.append({'type': 'NOT_FOUND', 'path': [repo_alias, issue_alias],
+                                   'message': 'Could not resolve to an issue or pull request with the number '
+                                              'of %s.' % number})
+                    continue
+                data[repo_alias][issue_alias] = {
+                    'state': issue['state'].upper(),
+                    'title': issue['title'],
+                    'url': self.html_url(issue),
+                    'labels': {'nodes': [{'name': name} for name in issue['labels']]},
+                }
+        result = {'data': data}
+        if errors:
+            result['errors'] = errors
+        return result
+
+    def html_url(self, issue):
+        return 'https://github.com/%(owner)s/%(repository)s/issues/%(number)s' % issue
+
+    def issue_json(self, issue):
+        """Return the REST representation of an issue."""
+        api_url = '%s/repos/%s/%s/issues/%s' % (self.url, issue['owner'], issue['repository'], issue['number'])
+        user_url = '%s/users/octocat' % self.url
+        return {
+            'id': issue['number'],
+            'node_id': 'I_%s' % issue['number'],
+            'number': issue['number'],
+            'url': api_url,
+            'html_url': self.html_url(issue),
+            'repository_url': '%s/repos/%s/%s' % (self.url, issue['owner'], issue['repository']),
+            'labels_url': api_url + '/labels{/name}',
+            'comments_url': api_url + '/comments',
+            'events_url': api_url + '/events',
+            'state': issue['state'],
+            'title': issue['title'],
+            'body': '',
+            'body_html': '',
+            'body_text': '',
+            'user': {
+                'login': 'octocat',
+                'id': 1,
+                'avatar_url': '',
+                'gravatar_id': '',
+                'url': user_url,
+                'html_url': 'https://github.com/octocat',
+                'events_url': user_url + '/events{/privacy}',
+                'followers_url': user_url + '/followers',
+                'following_url': user_url + '/following{/other_user}',
+                'gists_url': user_url + '/gists{/gist_id}',
+                'organizations_url': user_url + '/orgs',
+                'received_events_url': user_url + '/received_events',
+                'repos_url': user_url + '/repos',
+                'starred_url': user_url + '/starred{/owner}{/repo}',
+                'subscriptions_url': user_url + '/subscriptions',
+                'type': 'User',
+                'site_admin': False,
+            },
+            'labels': [{'id': index, 'name': name, 'color': 'ededed', 'default': False,
+                        'url': '%s/repos/%s/%s/labels/%s' % (self.url, issue['owner'], issue['repository'], name)}
+                       for (index, name) in enumerate(issue['labels'])],
+            'assignee': None,
+            'assignees': [],
+            'milestone': None,
+            'locked': False,
+            'comments': 0,
+            'created_at': timestamp(issue['created_at']),
+            'updated_at': timestamp(issue['updated_at']),
+            'closed_at': timestamp(issue['updated_at']) if issue['state'] == 'closed' else None,
+            'closed_by': None,
+        }
+
+    def __issue(self, owner, repository, number):
+        key = (owner, repository, int(number))
+        with self._lock:
+            issue = self.issues.get(key)
+        if issue is None and self.autocreate:
+            issue = self.add_issue('https://github.com/%s/%s/issues/%s' % key)
+        return issue
+
+    def __failure(self, method, path):
+        with self._lock:
+            for failure in self._failures:
+                if failure.method in (None, method) and failure.pattern.search(path) and failure.times != 0:
+                    if failure.times is not None:
+                        failure.times -= 1
+                    return failure
+
+
+@pytest.fixture()
+def github_server(request):
+    """Return a running :class:`FakeGitHubServer`, stopped after the test."""
+    server = FakeGitHubServer().start()
+    request.addfinalizer(server.stop)
+    return server
+
+
+def main(argv=None):
+    """Serve a fake GitHub API until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on (default: %(default)s)')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='Seconds to wait before answering each request (default: %(default)s)')
+    parser.add_argument('--rate-limit', type=int, default=5000,
+                        help='Requests allowed per hour, for each API resource (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    server = FakeGitHubServer(args.host, args.port, latency=args.latency, rate_limit=args.rate_limit)
+    print('Serving a fake GitHub API on %s' % server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""Hooks called while pytest-github resolves issues.
+
+Implement them in a ``conftest.py`` or another plugin, to add a cache layer,
+profile requests, or serve issue states from an internal mirror.
+
+:copyright: see LICENSE for details
+:license: MIT, see LICENSE for more details.
+"""
+
+from pluggy import HookspecMarker
+
+hookspec = HookspecMarker('pytest')
+
+
+@hookspec(firstresult=True)
+def pytest_github_resolve_issues(config, urls):
+    """Resolve github issues before they are requested from GitHub.
+
+    ``urls`` lists every issue that is neither cached nor already resolved.
+    Return a dictionary mapping any of them to a record, which is a dictionary
+    with the ``html_url``, ``state``, ``title`` and ``labels`` (a list of label
+    names) of the issue.  Issues missing from the dictionary are requested
+    from GitHub.  Stops at the first non-None result.
+
+    With ``--github-pipeline``, it is called while tests are collected, with
+    the issues first referenced by each test.
+    """
+
+
+@hookspec
+def pytest_github_issue_fetched(config, url, record, elapsed):
+    """Called with the record of every issue requested from GitHub.
+
+    ``elapsed`` is the number of seconds spent on the request.  Issues resolved
+    by the same request, such as a GraphQL query, share its time.
+    """
+
+
+@hookspec
+def pytest_github_fetch_failed(config, url, exc):
+    """Called with the exception raised for every issue that couldn't be resolved."""
@@ -0,0 +1,135 @@
+"""Measure what resolving github issues costs a test run.
+
+:copyright: see LICENSE for details
+:license: MIT, see LICENSE for more details.
+"""
+
+import math
+import threading
+
+
+def percentile(values, percent):
+    """Return the nearest-rank percentile of values, or None if there are none."""
+    if not values:
+        return None
+    values = sorted(values)
+    rank = int(math.ceil(percent / 100.0 * len(values)))
+    return values[max(1, rank) - 1]
+
+
+def _lowest(*rate_limits):
+    """Return the lowest known remaining budget of every resource in rate_limits."""
+    lowest = {}
+    for limits in rate_limits:
+        for (resource, remaining) in limits.items():
+            if remaining is not None and (lowest.get(resource) is None or remaining < lowest[resource]):
+                lowest[resource] = remaining
+            else:
+                lowest.setdefault(resource, remaining)
+    return lowest
+
+
+class Metrics(object):
+
+    """Counters updated while issues are resolved, possibly by several threads.
+
+    Responses are observed through :meth:`observe`, which can be registered as
+    a requests response hook.
+    """
+
+    def __init__(self):
+        self.issues = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.requests = 0
+        self.bytes_received = 0
+        self.latencies = []
+        self.blocking = 0.0
+        # reported by pytest-xdist workers, see merge()
+        self.rate_limits = {}
+        self.rate_limit_wait = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, elapsed, size):
+        """Record a response received elapsed seconds after its request was sent."""
+        with self._lock:
+            self.requests += 1
+            self.bytes_received += size
+            self.latencies.append(elapsed)
+
+    def observe(self, response, *args, **kwargs):
+        """Record a requests response."""
+        size = response.headers.get('Content-Length')
+        self.record(response.elapsed.total_seconds(), int(size) if size else len(response.content))
+
+    def to_state(self, rate_limits=None, rate_limit_wait=0.0):
+        """Return the raw counters and the given remaining rate limits, as sent by pytest-xdist workers."""
+        with self._lock:
+            return {
+                'issues': self.issues,
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses,
+                'requests': self.requests,
+                'bytes_received': self.bytes_received,
+                'latencies': list(self.latencies),
+                'blocking': self.blocking,
+                'rate_limits': dict(rate_limits or {}),
+                'rate_limit_wait': rate_limit_wait,
+            }
+
+    def merge(self, state):
+        """Add the counters of a pytest-xdist worker, as returned by to_state().
+
+        Every worker collects the same tests, so issues is the most collected by
+        any worker, and blocking the longest any worker was held up.  The lowest
+        remaining rate limit reported by any worker is kept.
+        """
+        with self._lock:
+            self.issues = max(self.issues, state['issues'])
+            self.cache_hits += state['cache_hits']
+            self.cache_misses += state['cache_misses']
+            self.requests += state['requests']
+            self.bytes_received += state['bytes_received']
+            self.latencies.extend(state['latencies'])
+            self.blocking = max(self.blocking, state['blocking'])
+            self.rate_limit_wait += state['rate_limit_wait']
+            self.rate_limits = _lowest(self.rate_limits, state['rate_limits'])
+
+    def to_dict(self, rate_limits=None, rate_limit_wait=0.0):
+        """Return the metrics as a dictionary, with the given remaining rate limits."""
+        rate_limits = _lowest(self.rate_limits, rate_limits or {})
+        rate_limit_wait += self.rate_limit_wait
+        return {
+            'issues': self.issues,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'requests': self.requests,
+            'bytes_received': self.bytes_received,
+            'latency': {
+                'total': sum(self.latencies),
+                'p50': percentile(self.latencies, 50),
+                'p95': percentile(self.latencies, 95),
+                'max': max(self.latencies) if self.latencies else None,
+            },
+            'rate_limit_remaining': rate_limits or {},
+            'blocking': self.blocking,
+            'rate_limit_wait': rate_limit_wait,
+        }
+
+    def lines(self, rate_limits=None, rate_limit_wait=0.0):
+        """Return the metrics as lines for the terminal summary."""
+        data = self.to_dict(rate_limits, rate_limit_wait)
+        latency = data['latency']
+        lines = [
+            "issues: {0} ({1} cached, {2} fetched)".format(data['issues'], data['cache_hits'], data['cache_misses']),
+            "requests: {0} ({1:.1f} KiB received)".format(data['requests'], data['bytes_received'] / 1024.0),
+        ]
+        if self.latencies:
+            lines.append("latency: total {0:.3f}s, p50 {1:.3f}s, p95 {2:.3f}s, max {3:.3f}s".format(
+                latency['total'], latency['p50'], latency['p95'], latency['max']))
+        if data['rate_limit_remaining']:
+            lines.append("rate limit remaining: {0}".format(', '.join(
+                '%s %s' % item for item in sorted(data['rate_limit_remaining'].items()))))
+        lines.append("blocked collection: {0:.3f}s ({1:.3f}s waiting on rate limits)".format(
+            data['blocking'], data['rate_limit_wait']))
+        return lines
@@ -0,0 +1,150 @@
+"""Resolve github issues in the background, most urgent first.
+
+Each issue is submitted once, as soon as it is first seen, with the position
+of its first test in the run order as its priority.  Worker threads resolve
+the most urgent issue first, so the first tests can start while the issues
+of later tests are still being resolved.  Waiting for an issue moves it to
+the front of the queue.
+
+:copyright: see LICENSE for details
+:license: MIT, see LICENSE for more details.
+"""
+
+import heapq
+import itertools
+import sys
+import threading
+
+
+class IssueFuture(object):
+
+    """The resolution of a github issue, which may not have finished yet."""
+
+    def __init__(self, url, parsed_url, priority):
+        self.url = url
+        self.parsed_url = parsed_url
+        self.priority = priority
+        self.started = False
+        self.cancelled = False
+        # exception raised while resolving the issue
+        self.exception = None
+        self._done = threading.Event()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self):
+        self._done.wait()
+
+
+class FetchPipeline(object):
+
+    """Call resolve(url, parsed_url) for each submitted issue on up to workers threads.
+
+    Issues with the lowest priority are resolved first.  Worker threads are
+    started as issues are submitted, and stopped by close().
+    """
+
+    def __init__(self, resolve, workers=1):
+        self._resolve = resolve
+        self.workers = workers
+        self._futures = {}
+        # heap of (priority, sequence, future), which may hold outdated entries for reprioritized futures
+        self._queue = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._closed = False
+
+    def submit(self, url, parsed_url, priority):
+        """Queue an issue, or move it up the queue if it was submitted with a higher priority, returning its future."""
+        with self._condition:
+            future = self._futures.get(url)
+            if future is None:
+                future = self._futures[url] = IssueFuture(url, parsed_url, priority)
+                self.__push(future)
+                if len(self._threads) < self.workers:
+                    thread = threading.Thread(target=self.__work, name='pytest-github-pipeline-%s' % len(self._threads))
+                    thread.daemon = True
+                    thread.start()
+                    self._threads.append(thread)
+            elif not future.started and priority < future.priority:
+                future.priority = priority
+                self.__push(future)
+            return future
+
+    def prioritize(self, priorities):
+        """Reorder queued issues, given a dictionary mapping their urls to priorities.
+
+        Queued issues missing from priorities, such as those of deselected
+        tests, are cancelled.
+        """
+        with self._condition:
+            self._queue = []
+            for future in list(self._futures.values()):
+                if future.started:
+                    continue
+                if future.url in priorities:
+                    future.priority = priorities[future.url]
+                    self._queue.append((future.priority, next(self._sequence), future))
+                else:
+                    self.__cancel(future)
+            heapq.heapify(self._queue)
+
+    def wait(self, urls):
+        """Wait until any submitted issues in urls are resolved, returning the futures of those that raised."""
+        with self._condition:
+            futures = [self._futures[url] for url in urls if url in self._futures]
+            for future in futures:
+                if not future.started and not future.cancelled:
+                    future.priority = float('-inf')
+                    self.__push(future)
+        for future in futures:
+            future.wait()
+        return [future for future in futures if future.exception is not None]
+
+    def close(self):
+        """Cancel queued issues, and wait for the issues being resolved."""
+        with self._condition:
+            self._closed = True
+            for future in list(self._futures.values()):
+                if not future.started:
+                    self.__cancel(future)
+            self._queue = []
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def __push(self, future):
+        heapq.heappush(self._queue, (future.priority, next(self._sequence), future))
+        self._condition.notify()
+
+    def __pop(self):
+        """Return the most urgent queued future, or None."""
+        while self._queue:
+            (priority, _, future) = heapq.heappop(self._queue)
+            if not future.started and not future.cancelled and priority == future.priority:
+                return future
+        return None
+
+    def __cancel(self, future):
+        future.cancelled = True
+        del self._futures[future.url]
+        future._done.set()
+
+    def __work(self):
+        while True:
+            with self._condition:
+                future = self.__pop()
+                while future is None and not self._closed:
+                    self._condition.wait()
+                    future = self.__pop()
+                if future is None:
+                    return
+                future.started = True
+            try:
+                self._resolve(future.url, future.parsed_url)
+            except Exception:
+                future.exception = sys.exc_info()[1]
+            future._done.set()
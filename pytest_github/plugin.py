@@ -4,14 +4,26 @@
 :license: MIT, see LICENSE for more details.
 """
 
+import errno
+import functools
+import json
 import logging
 import os
 import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
 import warnings
-import yaml
+from collections import OrderedDict
 
 import pytest
-import github3
+
+from pytest_github.metrics import Metrics
+from pytest_github.ratelimit import RateLimitExceeded, RateLimitScheduler
+from pytest_github.report import IssueReport, report_outcome
+from pytest_github.transport import GITHUB_CONNECT_TIMEOUT, GITHUB_READ_TIMEOUT, GITHUB_RETRIES
 
 # Import, or define, NullHandler
 try:
@@ -34,29 +46,113 @@ log.addHandler(NullHandler())
 # associated with these labels will be considered "done".
 GITHUB_COMPLETED_LABELS = []
 
+# Engines available to resolve github issues referenced by markers
+GITHUB_ENGINES = ('rest', 'graphql', 'async')
+
+# Maximum number of issues requested in a single GraphQL query
+GITHUB_BATCH_SIZE = 100
+
+# Key used to persist resolved issues between runs in the pytest cache
+GITHUB_CACHE_KEY = 'github/issues'
+
+# Repositories with at least this many pending issues have their issues listed in bulk
+GITHUB_BULK_THRESHOLD = 20
+
+# Number of issues in each page of a repository's issue listing
+GITHUB_PAGE_SIZE = 100
+
+# Seconds subtracted from the last sync when listing updated issues, allowing for clock skew
+GITHUB_SYNC_OVERLAP = 60
+
+# Seconds between checks of --github-store for issues another process is fetching
+GITHUB_STORE_POLL = 0.1
+
+# Key of the index of github marker URLs found by --github-static in the pytest cache
+GITHUB_SCAN_KEY = 'github/scan'
+
+# URL of a github issue or pull request
+GITHUB_ISSUE_URL_RE = re.compile(r'https?://github.com/([^/]+)/([^/]+)/(?:issues|pull)/([0-9]+)$')
+
+# Only request the fields needed by IssueWrapper
+GITHUB_GRAPHQL_FIELDS = "state title url labels(first: 100) { nodes { name } }"
+
+
+class FileLock(object):
+
+    """Lock shared by several processes, held while the lock file exists."""
+
+    def __init__(self, path, timeout=600, interval=0.05):
+        self.path = path
+        self.timeout = timeout
+        self.interval = interval
+        self.locked = False
+
+    def __enter__(self):
+        deadline = time.time() + self.timeout
+        while not self.locked:
+            try:
+                os.close(os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                self.locked = True
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+                if time.time() > deadline:
+                    warnings.warn("Timed out waiting for lock file: %s" % self.path, Warning)
+                    break
+                time.sleep(self.interval)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.locked:
+            os.remove(self.path)
+            self.locked = False
+
+
+def generic_path(item, cache=None):
+    """Return the path of item, as shown by --github-summary.
+
+    The paths of parent nodes are stored in cache when it is given, so items
+    sharing a module or class don't walk and rebuild the same prefix.
+    """
+    return _generic_path(item, {} if cache is None else cache)[0]
 
-def generic_path(item):
-    chain = item.listchain()
-    gpath = [chain[0].name]
-    fspath = chain[0].fspath
-    fspart = False
-    for node in chain[1:]:
-        newfspath = node.fspath
-        if newfspath == fspath:
-            if fspart:
-                gpath.append(":")
+
+def _generic_path(node, cache):
+    """Return the path of node, its fspath, and whether the path ended in a file."""
+    state = cache.get(node)
+    if state is None:
+        if node.parent is None:
+            state = (node.name, node.fspath, False)
+        else:
+            (path, fspath, fspart) = _generic_path(node.parent, cache)
+            if node.fspath == fspath:
+                separator = ":" if fspart else "."
                 fspart = False
             else:
-                gpath.append(".")
-        else:
-            gpath.append("/")
-            fspart = True
-        name = node.name
-        if name[0] in "([":
-            gpath.pop()
-        gpath.append(name)
-        fspath = newfspath
-    return "".join(gpath)
+                separator = "/"
+                fspart = True
+            if node.name[0] in "([":
+                separator = ""
+            state = (path + separator + node.name, node.fspath, fspart)
+        cache[node] = state
+    return state
+
+
+def gpath_lines(gpaths):
+    """Return the lines listing gpaths in --github-summary.
+
+    Writing them at once lets the terminal writer measure only the last line.
+    """
+    return "".join(" - %s\n" % gpath for gpath in gpaths)
+
+
+def issue_sort_key(url):
+    """Return a key sorting issue URLs by owner, repository and number."""
+    match = GITHUB_ISSUE_URL_RE.match(url)
+    if match is None:
+        return (url, '', 0)
+    (username, repository, number) = match.groups()
+    return (username, repository, int(number))
 
 
 def pytest_addoption(parser):
@@ -92,11 +188,153 @@ def pytest_addoption(parser):
                     dest='show_github_summary',
                     default=False,
                     help='Show a summary of all GitHub markers and their associated tests')
+    group.addoption('--github-static',
+                    action='store_true',
+                    dest='github_static',
+                    default=False,
+                    help='Find github marker URLs by parsing test files, and fetch their issues while tests are '
+                    'collected.  With --github-summary, summarize the parsed markers without collecting tests')
+    group.addoption('--github-pipeline',
+                    action='store_true',
+                    dest='github_pipeline',
+                    default=False,
+                    help='Fetch each github issue in the background as soon as it is collected, in the order of '
+                    'its first test, so tests start without waiting for the issues of later tests')
+    group.addoption('--github-engine',
+                    action='store',
+                    dest='github_engine',
+                    metavar='GITHUB_ENGINE',
+                    choices=GITHUB_ENGINES,
+                    default='rest',
+                    help='Method used to resolve github issues, one of: %s '
+                    '(default: %%(default)s)' % ', '.join(GITHUB_ENGINES))
+    group.addoption('--github-batch-size',
+                    action='store',
+                    dest='github_batch_size',
+                    metavar='GITHUB_BATCH_SIZE',
+                    type=int,
+                    default=GITHUB_BATCH_SIZE,
+                    help='Number of issues resolved per GraphQL query (default: %(default)s)')
+    group.addoption('--github-workers',
+                    action='store',
+                    dest='github_workers',
+                    metavar='GITHUB_WORKERS',
+                    type=int,
+                    default=1,
+                    help='Number of github issues fetched concurrently, or the number of '
+                    'requests in flight with --github-engine=async (default: %(default)s)')
+    group.addoption('--github-cache-ttl',
+                    action='store',
+                    dest='github_cache_ttl',
+                    metavar='GITHUB_CACHE_TTL',
+                    type=int,
+                    default=0,
+                    help='Number of seconds that resolved github issues are reused by later runs. '
+                    'A value of 0 disables the cache (default: %(default)s)')
+    group.addoption('--github-cache-clear',
+                    action='store_true',
+                    dest='github_cache_clear',
+                    default=False,
+                    help='Remove all github issues from the cache before running')
+    group.addoption('--github-cache-sync',
+                    action='store_true',
+                    dest='github_cache_sync',
+                    default=False,
+                    help='Refresh expired github issues by listing the issues updated in each '
+                    'repository since it was last synced, instead of checking each issue')
+    group.addoption('--github-store',
+                    action='store',
+                    dest='github_store',
+                    metavar='PATH',
+                    help='Persist resolved github issues in a SQLite database at PATH, shared by every pytest '
+                    'process using it.  Issues older than --github-cache-ttl are refreshed by one process at a time')
+    group.addoption('--github-snapshot-write',
+                    action='store',
+                    dest='github_snapshot_write',
+                    metavar='GITHUB_SNAPSHOT',
+                    help='Write the state of every collected github issue to GITHUB_SNAPSHOT')
+    group.addoption('--github-snapshot-read',
+                    action='store',
+                    dest='github_snapshot_read',
+                    metavar='GITHUB_SNAPSHOT',
+                    help='Read the state of github issues from GITHUB_SNAPSHOT, instead of contacting GitHub')
+    group.addoption('--github-max-wait',
+                    action='store',
+                    dest='github_max_wait',
+                    metavar='GITHUB_MAX_WAIT',
+                    type=int,
+                    default=60,
+                    help='Number of seconds to wait for the GitHub rate limit to reset, '
+                    'before giving up on an issue (default: %(default)s)')
+    group.addoption('--github-bulk-threshold',
+                    action='store',
+                    dest='github_bulk_threshold',
+                    metavar='GITHUB_BULK_THRESHOLD',
+                    type=int,
+                    default=GITHUB_BULK_THRESHOLD,
+                    help='List the issues of any repository with at least GITHUB_BULK_THRESHOLD pending issues, '
+                    'instead of fetching them one by one. A value of 0 disables listing (default: %(default)s)')
+    group.addoption('--github-api-url',
+                    action='store',
+                    dest='github_api_url',
+                    metavar='URL',
+                    help='Base URL of the GitHub API, such as https://github.example.com/api/v3 for GitHub Enterprise, '
+                    'or the URL of a pytest_github.fakeserver (default: https://api.github.com)')
+    group.addoption('--github-proxy',
+                    action='store',
+                    dest='github_proxy',
+                    metavar='URL',
+                    help='Resolve github issues through the pytest-github-proxy listening at URL, '
+                    'which holds the GitHub credentials')
+    group.addoption('--github-pool-size',
+                    action='store',
+                    dest='github_pool_size',
+                    metavar='GITHUB_POOL_SIZE',
+                    type=int,
+                    help='Number of connections kept alive to GitHub (default: the larger of 10 and GITHUB_WORKERS)')
+    group.addoption('--github-connect-timeout',
+                    action='store',
+                    dest='github_connect_timeout',
+                    metavar='SECONDS',
+                    type=float,
+                    default=GITHUB_CONNECT_TIMEOUT,
+                    help='Number of seconds to wait for a connection to GitHub (default: %(default)s)')
+    group.addoption('--github-read-timeout',
+                    action='store',
+                    dest='github_read_timeout',
+                    metavar='SECONDS',
+                    type=float,
+                    default=GITHUB_READ_TIMEOUT,
+                    help='Number of seconds to wait for a response from GitHub (default: %(default)s)')
+    group.addoption('--github-retries',
+                    action='store',
+                    dest='github_retries',
+                    metavar='GITHUB_RETRIES',
+                    type=int,
+                    default=GITHUB_RETRIES,
+                    help='Number of times an issue lookup is retried after a connection or server error '
+                    '(default: %(default)s)')
+    group.addoption('--github-metrics-json',
+                    action='store',
+                    dest='github_metrics_json',
+                    metavar='PATH',
+                    help='Write metrics about github issue resolution, such as requests made and cache hits, to PATH')
+    group.addoption('--github-report',
+                    action='store',
+                    dest='github_report',
+                    metavar='PATH',
+                    help='Stream the github issues linked to each test, and their states, to PATH as JSON lines')
 
     # Add github marker to --help
     parser.addini("github", "GitHub issue integration", "args")
 
 
+def pytest_addhooks(pluginmanager):
+    """Register the hooks called while resolving github issues."""
+    from pytest_github import hooks
+    pluginmanager.add_hookspecs(hooks)
+
+
 def pytest_configure(config):
     """Validate --github-* parameters."""
     log.debug("pytest_configure() called")
@@ -104,41 +342,48 @@ def pytest_configure(config):
     # Add marker
     config.addinivalue_line("markers", "github(*args): GitHub issue integration")
 
+    # If not --help or --showfixtures ...
+    if not (config.option.help or config.option.showfixtures or config.option.markers):
+        # Register pytest plugin, which loads --github-cfg once the first github issue is collected
+        assert config.pluginmanager.register(
+            GitHubPytestPlugin(settings=functools.partial(load_github_cfg, config)),
+            'github_helper'
+        )
+
+
+def load_github_cfg(config):
+    """Return the github username, token and completed labels from --github-cfg and the command-line."""
     # Initialize parameters
     github_cfg_file = config.getoption('github_cfg_file')
     github_username = None
     github_token = None
     github_completed = []
 
-    # If not --help or --showfixtures ...
-    if not (config.option.help or config.option.showfixtures or config.option.markers):
-        # Load config file, if available
-        if os.path.isfile(github_cfg_file):
-            # Load configuration file ...
-            with open(github_cfg_file, 'r') as fd:
-                github_cfg = yaml.safe_load(fd)
-
-            if isinstance(github_cfg, dict) and 'github' in github_cfg and isinstance(github_cfg['github'], dict):
-                github_username = github_cfg['github'].get('username', None)
-                github_token = github_cfg['github'].get('token', None)
-                github_completed = github_cfg['github'].get('completed', [])
-            else:
-                errstr = "No github configuration found in file: %s" % os.path.realpath(github_cfg_file)
-                warnings.warn(errstr, Warning)
+    # Load config file, if available
+    if os.path.isfile(github_cfg_file):
+        import yaml
 
-        # Override with command-line parameters
-        if config.getoption('github_username'):
-            github_username = config.getoption('github_username')
-        if config.getoption('github_token'):
-            github_token = config.getoption('github_token')
-        if config.getoption('github_completed'):
-            github_completed = config.getoption('github_completed')
+        # Load configuration file ...
+        with open(github_cfg_file, 'r') as fd:
+            github_cfg = yaml.safe_load(fd)
 
-        # Register pytest plugin
-        assert config.pluginmanager.register(
-            GitHubPytestPlugin(github_username, github_token, completed_labels=github_completed),
-            'github_helper'
-        )
+        if isinstance(github_cfg, dict) and 'github' in github_cfg and isinstance(github_cfg['github'], dict):
+            github_username = github_cfg['github'].get('username', None)
+            github_token = github_cfg['github'].get('token', None)
+            github_completed = github_cfg['github'].get('completed', [])
+        else:
+            errstr = "No github configuration found in file: %s" % os.path.realpath(github_cfg_file)
+            warnings.warn(errstr, Warning)
+
+    # Override with command-line parameters
+    if config.getoption('github_username'):
+        github_username = config.getoption('github_username')
+    if config.getoption('github_token'):
+        github_token = config.getoption('github_token')
+    if config.getoption('github_completed'):
+        github_completed = config.getoption('github_completed')
+
+    return (github_username, github_token, github_completed)
 
 
 def pytest_cmdline_main(config):
@@ -146,46 +391,132 @@ def pytest_cmdline_main(config):
     log.debug("pytest_cmdline_main() called")
     if config.option.show_github_summary:
         from _pytest.main import wrap_session
-        wrap_session(config, __show_github_summary)
+        wrap_session(config, __show_static_summary if config.option.github_static else __show_github_summary)
         return 0
 
 
+class IssueUnavailable(Exception):
+
+    """Reason a github issue couldn't be resolved, when no other exception was raised."""
+
+
 class IssueWrapper(object):
 
-    def __init__(self, issue, gh_plugin):
-        self.issue = issue
-        self._gh_plugin = gh_plugin
+    """Compact record of the github issue attributes used by the plugin.
+
+    Whether the issue is resolved is computed once, using the completed
+    labels configured when the record is created.
+    """
+
+    __slots__ = ('html_url', 'state', 'title', 'labels', 'is_resolved', 'etag', 'last_modified')
+
+    # Label names are shared by every record that uses them
+    _label_names = {}
+
+    def __init__(self, html_url, state, title, labels=(), completed_labels=(), etag=None, last_modified=None):
+        self.html_url = html_url
+        self.state = state
+        self.title = title
+        self.labels = tuple(self._label_names.setdefault(name, name) for name in labels)
+        self.etag = etag
+        self.last_modified = last_modified
+
+        # if the issue is closed, or considered "completed" by any of the issue labels ...
+        self.is_resolved = self.is_closed or bool(set(completed_labels).intersection(self.labels))
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
 
     @property
     def is_closed(self):
-        return self.issue.is_closed()
+        return self.state == 'closed'
 
-    @property
-    def labels(self):
-        try:
-            labels = iter(self.issue.labels)
-        except TypeError:  # github3.py 1.0.0+ uses instance method
-            labels = self.issue.labels()
-        return [l.name for l in labels]
+    @classmethod
+    def from_issue(cls, issue, completed_labels=()):
+        """Build a record from a github3.py Issue."""
+        labels = getattr(issue, 'original_labels', None)  # github3.py 1.0.0+ requests labels() from the API
+        if labels is None:
+            labels = issue.labels
+        return cls(issue.html_url, issue.state, issue.title, [l.name for l in labels], completed_labels,
+                   etag=getattr(issue, 'etag', None), last_modified=getattr(issue, 'last_modified', None))
 
-    @property
-    def is_resolved(self):
-        # if the issue is open and isn't considered "completed" by any of the issue labels ...
-        if not self.is_closed and not set(self._gh_plugin.completed_labels).intersection(self.labels):
-            return False
-        return True
+    @classmethod
+    def from_graphql(cls, node, completed_labels=()):
+        """Build a record from an Issue or PullRequest GraphQL node."""
+        # Merged pull requests are reported as closed by the REST API
+        state = 'open' if node['state'].lower() == 'open' else 'closed'
+        labels = [label['name'] for label in (node.get('labels') or {}).get('nodes') or []]
+        return cls(node['url'], state, node['title'], labels, completed_labels)
 
-    @property
-    def html_url(self):
-        return self.issue.html_url
+    @classmethod
+    def from_json(cls, data, completed_labels=()):
+        """Build a record from an issue returned by the REST API.
 
-    @property
-    def state(self):
-        return self.issue.state
+        Like github3.py, any validators from the response headers are expected
+        in the ``ETag`` and ``Last-Modified`` keys.
+        """
+        return cls(data['html_url'], data['state'], data['title'], [label['name'] for label in data.get('labels') or []],
+                   completed_labels, etag=data.get('ETag'), last_modified=data.get('Last-Modified'))
 
-    @property
-    def title(self):
-        return self.issue.title
+    @classmethod
+    def from_dict(cls, data, completed_labels=()):
+        """Build a record from the output of to_dict()."""
+        return cls(data['html_url'], data['state'], data['title'], data['labels'], completed_labels,
+                   etag=data.get('etag'), last_modified=data.get('last_modified'))
+
+    def to_dict(self, **kwargs):
+        """Return a dictionary that can be stored in the pytest cache."""
+        data = dict(html_url=self.html_url, state=self.state, title=self.title, labels=list(self.labels),
+                    etag=self.etag, last_modified=self.last_modified)
+        data.update(kwargs)
+        return data
+
+
+class IssueDecision(object):
+
+    """What pytest_runtest_setup does with the items linked to the same github issues.
+
+    One decision is shared by every item with the same issues, ``skip`` and
+    ``raises``, so setting up an item doesn't revisit its issues.
+    """
+
+    __slots__ = ('issue_urls', 'skip_reason', 'xfail_marker')
+
+    def __init__(self, issue_urls=(), skip_reason=None, xfail_marker=None):
+        self.issue_urls = issue_urls
+        self.skip_reason = skip_reason
+        self.xfail_marker = xfail_marker
+
+    @classmethod
+    def from_issues(cls, issue_urls, unresolved_issues, skip=False, raises=None):
+        """Build the decision for items linked to issue_urls, skipping or xfailing them if any issue is unresolved."""
+        if not unresolved_issues:
+            return cls(issue_urls)
+        # TODO - Add support for skip vs xfail
+        issues = "\n ".join(["{0} [{1}] {2}".format(i.html_url, i.state, i.title) for i in unresolved_issues])
+        if skip:
+            return cls(issue_urls, skip_reason="Skipping due to unresolved github issues:\n{0}".format(issues))
+        return cls(issue_urls, xfail_marker=pytest.mark.xfail(
+            reason="Xfailing due to unresolved github issues: \n{0}".format(issues), raises=raises))
+
+    def apply(self, item):
+        """Skip or xfail item, as decided."""
+        # Listed as properties of the test case by --junitxml, and sent with test reports
+        for issue_url in self.issue_urls:
+            item.user_properties.append(('github_issue', issue_url))
+
+        if self.skip_reason is not None:
+            pytest.skip(self.skip_reason)
+        elif self.xfail_marker is not None:
+            item.add_marker(self.xfail_marker)
+
+
+# Decision for items without a github marker, or whose marker ids exclude them
+NO_DECISION = IssueDecision()
 
 
 def __show_github_summary(config, session):
@@ -195,23 +526,56 @@ def __show_github_summary(config, session):
 
     issue_cache = config.pluginmanager.get_plugin('github_helper')._issue_cache
 
-    # For each item, collect github markers and a generic_path for the item.
-    unresolved_issue_map = dict()
-    resolved_issue_map = dict()
-    for item in filter(lambda i: i.get_closest_marker("github") is not None, session.items):
+    # Group the paths of the items linked to each github issue in one pass
+    paths = dict()
+    issue_paths = dict()
+    for item in session.items:
         marker = item.get_closest_marker('github')
-        issue_urls = tuple(sorted(set(marker.args)))  # (O_O) for caching
+        if marker is None:
+            continue
+        issue_urls = getattr(item, 'funcargs', {}).get('github_issues') or tuple(sorted(set(marker.args)))
+        gpath = generic_path(item, paths)
         for issue_url in issue_urls:
+            issue_paths.setdefault(issue_url, []).append(gpath)
+
+    __write_github_summary(config, issue_paths, issue_cache)
 
-            issue = issue_cache[issue_url]
-            if not issue.is_resolved:
-                if issue_url not in unresolved_issue_map:
-                    unresolved_issue_map[issue_url] = list()
-                unresolved_issue_map[issue_url].append(generic_path(item))
-            if issue.is_resolved:
-                if issue_url not in resolved_issue_map:
-                    resolved_issue_map[issue_url] = list()
-                resolved_issue_map[issue_url].append(generic_path(item))
+
+def __show_static_summary(config, session):
+    """Generate the --github-summary report from the github markers found by --github-static, without collecting."""
+    plugin = config.pluginmanager.get_plugin('github_helper')
+    plugin._join_prefetch()
+
+    # Paths match those of collected items, except that parametrized tests are listed once
+    rootdir = str(config.rootdir)
+    prefix = os.path.basename(rootdir)
+    issue_paths = OrderedDict()
+    for path, scan in plugin._scan(config):
+        module = prefix + "/" + os.path.relpath(path, rootdir).replace(os.sep, "/")
+        for (name, issue_urls) in scan['tests']:
+            for issue_url in sorted(set(issue_urls)):
+                issue_paths.setdefault(issue_url, []).append(module + ":" + name)
+
+    plugin._queue_issues(issue_paths)
+    plugin._resolve_pending_issues(issue_paths)
+    plugin.metrics.issues = len(issue_paths)
+    reporter = config.pluginmanager.getplugin("terminalreporter")
+    if reporter:
+        reporter.write_line("collected {0} github issues".format(len(issue_paths)), bold=True)
+
+    __write_github_summary(config, issue_paths, plugin._issue_cache)
+
+
+def __write_github_summary(config, issue_paths, issue_cache):
+    """Write the --github-summary report, given the paths linked to each github issue."""
+    # Resolve each issue once, skipping any that couldn't be inspected
+    unresolved_issue_map = list()
+    resolved_issue_map = list()
+    for issue_url in sorted(issue_paths, key=issue_sort_key):
+        issue = issue_cache.get(issue_url)
+        if issue is not None:
+            (resolved_issue_map if issue.is_resolved else unresolved_issue_map).append(
+                (issue_url, issue_paths[issue_url]))
 
     # Print a summary report
     reporter = config.pluginmanager.getplugin("terminalreporter")
@@ -219,18 +583,16 @@ def __show_github_summary(config, session):
         reporter.section("github issue report")
         if unresolved_issue_map:
             reporter.write_line("Unresolved Issues", bold=True)
-            for issue_url, gpaths in sorted(unresolved_issue_map.items(), key=lambda k: int(k[0].split('/')[-1])):
+            for issue_url, gpaths in unresolved_issue_map:
                 reporter.write_line("{0}".format(issue_url), bold=True)
-                for gpath in gpaths:
-                    reporter.write_line(" - %s" % gpath)
+                reporter.write(gpath_lines(gpaths))
         if resolved_issue_map:
             if unresolved_issue_map:
                 reporter.write_line("")
             reporter.write_line("Resolved Issues", bold=True)
-            for issue_url, gpaths in sorted(resolved_issue_map.items(), key=lambda k: int(k[0].split('/')[-1])):
+            for issue_url, gpaths in resolved_issue_map:
                 reporter.write_line("{0}".format(issue_url), bold=True)
-                for gpath in gpaths:
-                    reporter.write_line(" - %s" % gpath)
+                reporter.write(gpath_lines(gpaths))
         if not unresolved_issue_map and not resolved_issue_map:
             reporter.write_line("No github issues collected")
 
@@ -239,37 +601,449 @@ class GitHubPytestPlugin(object):
 
     """GitHub Plugin class."""
 
-    def __init__(self, username, password, completed_labels=GITHUB_COMPLETED_LABELS):
-        """Initialize attributes."""
+    def __init__(self, username=None, password=None, completed_labels=GITHUB_COMPLETED_LABELS, settings=None):
+        """Initialize attributes.
+
+        settings may be a callable returning the username, password and
+        completed labels, which is called when they are first needed.
+        """
         log.debug("GitHubPytestPlugin initialized")
 
-        # initialize issue cache
+        # initialize issue cache, which may be filled by several threads
         self._issue_cache = {}
+        self._issue_cache_lock = threading.Lock()
+        self._fetched_at = {}
+
+        # issues seen during collection, but not yet resolved
+        self._pending_issues = OrderedDict()
+
+        # issues persisted by previous runs, read when first needed, see --github-cache-ttl
+        self._cache = None
+        self._issue_records = None
+        self.cache_ttl = 0
+        self.cache_sync = False
+
+        # see --github-store
+        self._store = None
+
+        # file used to share issues between pytest-xdist workers
+        self._shared_issues = None
+        self._shared_dir = None
+
+        # number of stale issues revalidated, by response status code
+        self._revalidated = {200: 0, 304: 0}
+
+        # number of repositories synced, and of cached issues updated by syncing them
+        self._synced = {'repositories': 0, 'updated': 0}
+
+        # see --github-metrics-json
+        self.metrics = Metrics()
+        self.metrics_json = None
+
+        # see --github-report
+        self.report = None
+        self._shared_records = {}
+
+        # issues fetched since the pytest_github_issue_fetched hook was last called
+        self._fetched = []
+        self._config = None
+
+        # see --github-static: the test files scanned, and the thread fetching their issues during collection
+        self._scans = None
+        self._prefetch = None
+        # issues resolved or queued before collection finished, whose cache hits are counted as they are resolved
+        self._prefetched = set()
+        self._prefetch_error = None
+        # see --github-pipeline: issues are fetched in the background, and each test waits for its own issues
+        self.pipeline = False
+        self._pipeline = None
+        self._collected = 0
+        self._decisions = {}
+
+        # warnings and hooks raised by background threads, called from the main thread once they are joined
+        self._main_thread = threading.current_thread()
+        self._deferred = []
 
         # Process parameters
+        self._settings = settings
         self.username = username
         self.password = password
         self.completed_labels = completed_labels
+        self.engine = 'rest'
+        self.batch_size = GITHUB_BATCH_SIZE
+        self.workers = 1
+        self.bulk_threshold = GITHUB_BULK_THRESHOLD
+        self.api_url = None
+        self.proxy = None
+        self.pool_size = None
+        self.connect_timeout = GITHUB_CONNECT_TIMEOUT
+        self.read_timeout = GITHUB_READ_TIMEOUT
+        self.retries = GITHUB_RETRIES
+
+        # github api connection, initialized when first needed
+        self._api = None
+        self._logged_in = False
+        self._scheduler = RateLimitScheduler()
+
+        # see --github-snapshot-read and --github-snapshot-write
+        self.snapshot_read = None
+        self.snapshot_write = None
+
+    def __load_settings(self):
+        """Load the github settings, and issues persisted by previous runs, once an issue needs them."""
+        if self._settings is not None:
+            (self.username, self.password, self.completed_labels) = self._settings()
+            self._settings = None
+        if self._issue_records is None:
+            self._issue_records = self._cache.get(GITHUB_CACHE_KEY, {}) if self._cache is not None else {}
+
+    def api(self):
+        """Return the github api connection, logging in on first use.
+
+        Not a property, as pytest looks up every attribute of registered plugins.
+        """
+        if not self._logged_in:
+            self.__load_settings()
+            import github3
+            import requests
+
+            from pytest_github.transport import configure_session
+
+            if self.proxy:
+                # The proxy authenticates with GitHub on behalf of every client
+                self._api = github3.GitHub()
+                self._api.session.base_url = self.proxy.rstrip('/')
+            else:
+                self._api = github3.login(self.username, self.password)
+                if self._api is not None and self.api_url:
+                    self._api.session.base_url = self.api_url.rstrip('/')
+            self._logged_in = True
+
+            session = getattr(self._api, 'session', None)
+            if isinstance(session, requests.Session):
+                # Size the connection pool to the number of concurrent lookups
+                configure_session(session, pool_size=self.pool_size or max(10, self.workers),
+                                  connect_timeout=self.connect_timeout, read_timeout=self.read_timeout,
+                                  retries=self.retries)
+
+                # Track the rate limit reported by every response
+                session.hooks['response'].append(self._scheduler.observe)
+                session.hooks['response'].append(self.metrics.observe)
+        return self._api
+
+    def pytest_configure(self, config):
+        """Load issue resolution settings from the command-line."""
+        self._config = config
+        self.engine = config.getoption('github_engine')
+        self.batch_size = max(1, config.getoption('github_batch_size'))
+        self.workers = max(1, config.getoption('github_workers'))
+        self._scheduler.max_wait = config.getoption('github_max_wait')
+        self.bulk_threshold = config.getoption('github_bulk_threshold')
+        self.api_url = config.getoption('github_api_url')
+        self.proxy = config.getoption('github_proxy')
+        self.pool_size = config.getoption('github_pool_size')
+        self.connect_timeout = config.getoption('github_connect_timeout')
+        self.read_timeout = config.getoption('github_read_timeout')
+        self.retries = config.getoption('github_retries')
+
+        # The report and metrics are written by the process receiving test reports, not by pytest-xdist workers
+        report = config.getoption('github_report')
+        if getattr(config, 'workerinput', None) is None:
+            self.metrics_json = config.getoption('github_metrics_json')
+            if report:
+                self.report = IssueReport(report)
+
+        if self.engine == 'async':
+            try:
+                from pytest_github import aio  # noqa F401
+            except (ImportError, SyntaxError):
+                raise pytest.UsageError('--github-engine=async requires python 3 and aiohttp')
+
+        # Issues are fetched one at a time by the pipeline, rather than in batches
+        self.pipeline = config.getoption('github_pipeline')
+        if self.pipeline and (self.engine != 'rest' or config.getoption('github_cache_sync')):
+            raise pytest.UsageError('--github-pipeline requires --github-engine=rest, without --github-cache-sync')
+        # The file shared by pytest-xdist workers would be rewritten under one lock for every issue
+        if self.pipeline and getattr(config.option, 'dist', 'no') != 'no' and not config.getoption('github_store'):
+            raise pytest.UsageError('--github-pipeline requires --github-store with pytest-xdist')
+
+        self.snapshot_write = config.getoption('github_snapshot_write')
+        self.snapshot_read = config.getoption('github_snapshot_read')
+        if self.snapshot_read is not None:
+            self.__read_snapshot()
+            return
+
+        # pytest-xdist workers share issues resolved by the first worker to finish collecting
+        workerinput = getattr(config, 'workerinput', None)
+        if workerinput is not None:
+            self._shared_issues = workerinput.get('github_shared_issues')
+
+        # The store replaces the pytest cache, and is shared by pytest-xdist workers
+        store = config.getoption('github_store')
+        if store:
+            from pytest_github.store import IssueStore
+            try:
+                self._store = IssueStore(os.path.expanduser(store))
+                if config.getoption('github_cache_clear') and workerinput is None:
+                    self._store.clear()
+            except Exception as e:  # sqlite3.Error, but sqlite3 is only imported by the store
+                raise pytest.UsageError("Unable to open github store %s - %s" % (store, e))
+            self.cache_ttl = config.getoption('github_cache_ttl')
+            self.cache_sync = config.getoption('github_cache_sync')
+            return
+
+        cache = getattr(config, 'cache', None)
+        if cache is not None:
+            if config.getoption('github_cache_clear') and workerinput is None:
+                cache.set(GITHUB_CACHE_KEY, {})
+            self.cache_ttl = config.getoption('github_cache_ttl')
+            self.cache_sync = config.getoption('github_cache_sync')
+            if self.cache_ttl > 0:
+                self._cache = cache
+
+    def pytest_sessionstart(self, session):
+        """Start fetching the github issues found by --github-static, while tests are collected.
+
+        --github-pipeline is turned off here for sessions that don't run tests.
+        """
+        config = session.config
+        # Sessions that don't run tests need every issue at once, and snapshots are read without fetching
+        if self.pipeline and (config.option.collectonly or config.option.show_github_summary or
+                              self.snapshot_write or self.snapshot_read is not None):
+            self.pipeline = False
+
+        # The pytest-xdist controller doesn't collect
+        if (not config.getoption('github_static') or not self.__needs_issues(config) or
+                self.snapshot_read is not None or config.pluginmanager.hasplugin('dsession')):
+            return
+
+        self.__load_settings()
+        pending = OrderedDict()
+        for (path, scan) in self._scan(config):
+            for url in scan['urls']:
+                # Malformed URLs are reported once collected
+                match = GITHUB_ISSUE_URL_RE.match(url)
+                if (match is not None and url not in pending and url not in self._issue_cache and
+                        not self.__load_cached_issue(url)):
+                    pending[url] = match.groups()
 
-        # Initialize github api connection
-        self.api = github3.login(self.username, self.password)
+        # Hooks are called from the main thread, so only GitHub is contacted in the background
+        pending = self.__resolve_from_hooks(pending)
+        if self.pipeline:
+            # Until they are collected, issues are fetched in the order of the files and tests using them
+            for (priority, (url, parsed_url)) in enumerate(pending.items()):
+                self.__submit(url, parsed_url, priority)
+        elif pending:
+            self._prefetched.update(pending)
+            self._prefetch = threading.Thread(target=self.__prefetch, args=(pending,), name='pytest-github-prefetch')
+            self._prefetch.daemon = True
+            self._prefetch.start()
+
+    def _scan(self, config):
+        """Return the github marker URLs of each test file, as (path, scan) pairs, see pytest_github.scanner."""
+        if self._scans is not None:
+            return self._scans
+        from pytest_github.scanner import scan
+
+        invocation_dir = str(config.invocation_dir)
+        paths = [os.path.join(invocation_dir, arg.split('::')[0]) for arg in config.args]
+        ignore = tuple(os.path.join(invocation_dir, path) for path in config.getoption('ignore') or ())
+
+        # Test files are only parsed again once their modification time or size changes
+        cache = getattr(config, 'cache', None)
+        index = cache.get(GITHUB_SCAN_KEY, {}) if cache is not None else {}
+        scanned = dict(index)
+        self._scans = [(path, result) for (path, result) in scan(
+            paths, index, python_files=config.getini('python_files'), norecursedirs=config.getini('norecursedirs'),
+            python_classes=config.getini('python_classes'), python_functions=config.getini('python_functions'),
+            instance=int(pytest.__version__.split('.')[0]) < 7) if not path.startswith(ignore)]
+        if cache is not None and (len(index) != len(scanned) or
+                                  any(scanned.get(path) is not result for (path, result) in index.items())):
+            cache.set(GITHUB_SCAN_KEY, index)
+        return self._scans
+
+    def __prefetch(self, pending):
+        try:
+            self.__resolve(pending)
+        except Exception:
+            self._prefetch_error = sys.exc_info()[1]
+
+    def _join_prefetch(self):
+        """Wait for the issues fetched since pytest_sessionstart, then report them from the main thread."""
+        if self._prefetch is None:
+            return
+        self._prefetch.join()
+        self._prefetch = None
+        self.__flush_deferred()
+
+        # Issues the prefetch failed on are fetched again once collected
+        if self._prefetch_error is not None:
+            warnings.warn("Unable to prefetch github issues - %s" % self._prefetch_error, Warning)
+            self._prefetched = set(url for url in self._prefetched if url in self._issue_cache)
+            self._prefetch_error = None
+
+    def __submit(self, url, parsed_url, priority):
+        """Fetch an issue in the background with --github-pipeline, lower priorities first."""
+        if self._pipeline is None:
+            from pytest_github.pipeline import FetchPipeline
+
+            # Log in from the main thread, before workers share the connection
+            self.api()
+            self._pipeline = FetchPipeline(self.__resolve_one, self.workers)
+        self._prefetched.add(url)
+        self._pipeline.submit(url, parsed_url, priority)
+
+    def __resolve_one(self, url, parsed_url):
+        self.__resolve(OrderedDict([(url, parsed_url)]))
+
+    def __wait(self, issue_urls):
+        """Wait for the pipeline to fetch issue_urls, then report them from the main thread."""
+        for future in self._pipeline.wait(issue_urls):
+            # Warn once, rather than for every test waiting for the issue
+            (exc, future.exception) = (future.exception, None)
+            if exc is not None:
+                self.__warn_unavailable(future.url, exc)
+
+    def pytest_sessionfinish(self, session):
+        """Stop the --github-pipeline and persist its issues, then send any pytest-xdist worker metrics."""
+        if self._pipeline is not None:
+            self._pipeline.close()
+            self._pipeline = None
+            self.__flush_deferred()
+            if self._cache is not None:
+                self._cache.set(GITHUB_CACHE_KEY, self._issue_records)
+
+        # Merged by the controller, see pytest_testnodedown
+        workeroutput = getattr(session.config, 'workeroutput', None)
+        if workeroutput is not None:
+            workeroutput['github_metrics'] = self.metrics.to_state(*self.__rate_limits())
+
+    def __deferred(self, func, *args):
+        """Queue func until __flush_deferred() is called, and return True, when called from a background thread."""
+        if threading.current_thread() is self._main_thread:
+            return False
+        with self._issue_cache_lock:
+            self._deferred.append(functools.partial(func, *args))
+        return True
+
+    def __flush_deferred(self):
+        """Call the warnings and hooks queued by background threads."""
+        with self._issue_cache_lock:
+            (deferred, self._deferred) = (self._deferred, [])
+        for func in deferred:
+            func()
+        self.__report_fetched()
+
+    def __rate_limits(self):
+        """Return the remaining rate limits, and the time spent waiting on them."""
+        return (self._scheduler.remaining_by_resource(), self._scheduler.waited)
+
+    def pytest_terminal_summary(self, terminalreporter):
+        """Report what resolving github issues cost."""
+        if self.metrics.issues:
+            terminalreporter.section("github metrics")
+            for line in self.metrics.lines(*self.__rate_limits()):
+                terminalreporter.write_line(line)
+
+    def pytest_unconfigure(self, config):
+        """Write any metrics, and persist any issues resolved by pytest-xdist workers."""
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+        if self.metrics_json:
+            with open(self.metrics_json, 'w') as fd:
+                json.dump(self.metrics.to_dict(*self.__rate_limits()), fd, indent=2, sort_keys=True)
+        if self.report is not None:
+            self.report.close()
+            self.report = None
+
+        if self._shared_dir is None:
+            return
+        if self._cache is not None:
+            self._issue_records.update(self.__read_shared_issues())
+            self._cache.set(GITHUB_CACHE_KEY, self._issue_records)
+        shutil.rmtree(self._shared_dir, ignore_errors=True)
+        self._shared_dir = None
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_configure_node(self, node):
+        """Tell each pytest-xdist worker where to share resolved issues."""
+        if self._store is not None:
+            return
+        if self._shared_dir is None:
+            self.__load_settings()
+            self._shared_dir = tempfile.mkdtemp(prefix='pytest-github-')
+            self._shared_issues = os.path.join(self._shared_dir, 'issues.json')
+
+            # Start from issues that are still fresh in the pytest cache
+            self.__write_shared_issues(dict(
+                (url, record) for (url, record) in self._issue_records.items()
+                if time.time() - record['fetched_at'] < self.cache_ttl))
+
+        node.workerinput['github_shared_issues'] = self._shared_issues
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node, error):
+        """Add the metrics of a pytest-xdist worker to those reported by the controller."""
+        state = getattr(node, 'workeroutput', {}).get('github_metrics')
+        if state is not None:
+            self.metrics.merge(state)
+
+    def __read_shared_issues(self):
+        try:
+            with open(self._shared_issues, 'r') as fd:
+                return json.load(fd)
+        except (IOError, ValueError):
+            return {}
+
+    def __write_shared_issues(self, records):
+        # Replace the file in one step, so readers never see a partial file
+        (handle, path) = tempfile.mkstemp(dir=os.path.dirname(self._shared_issues))
+        with os.fdopen(handle, 'w') as fd:
+            json.dump(records, fd)
+        os.rename(path, self._shared_issues)
+
+    def __read_snapshot(self):
+        """Fill the issue cache from --github-snapshot-read."""
+        self.__load_settings()
+        try:
+            with open(self.snapshot_read, 'r') as fd:
+                snapshot = json.load(fd)
+        except (IOError, ValueError) as e:
+            raise pytest.UsageError("Unable to read github snapshot %s - %s" % (self.snapshot_read, e))
+
+        for url, record in snapshot.get('issues', {}).items():
+            issue = IssueWrapper(url, record['state'], record['title'], record['labels'], self.completed_labels)
+            self._cache_issue(url, issue, record['fetched_at'])
+
+    def __write_snapshot(self, issue_urls):
+        """Write the state of every resolved issue in issue_urls to --github-snapshot-write."""
+        snapshot = dict(issues=dict())
+        for url in issue_urls:
+            if url in self._issue_cache:
+                issue = self._issue_cache[url]
+                snapshot['issues'][url] = dict(state=issue.state, title=issue.title, labels=list(issue.labels),
+                                               fetched_at=self._fetched_at[url])
+
+        # Sort keys and indent, so snapshots are deterministic and diff well
+        with open(self.snapshot_write, 'w') as fd:
+            json.dump(snapshot, fd, sort_keys=True, indent=2, separators=(',', ': '))
+            fd.write('\n')
 
     def __parse_issue_url(self, url):
         # Parse the github URL
-        match = re.match(r'https?://github.com/([^/]+)/([^/]+)/(?:issues|pull)/([0-9]+)$', url)
+        match = GITHUB_ISSUE_URL_RE.match(url)
         try:
             return match.groups()
         except AttributeError:
             errstr = "Malformed github issue URL: '%s'" % url
             raise Exception(errstr)
 
-    def pytest_runtest_setup(self, item):
-        """Handle github marker by calling xfail or skip, as needed."""
-        log.debug("pytest_runtest_setup() called")
-        if 'github' not in item.keywords:
-            return
-
+    def __decide(self, item, decisions):
+        """Return what pytest_runtest_setup does with item, sharing decisions through the decisions dictionary."""
         github_marker = item.get_closest_marker('github')
+        if github_marker is None or 'github_issues' not in getattr(item, 'funcargs', {}):
+            return NO_DECISION
 
         '''
         github marker may specify ids=['foo', 'bar']. By specifying ids, only
@@ -277,64 +1051,636 @@ class GitHubPytestPlugin(object):
         logic.
         '''
         github_marker_ids = github_marker.kwargs.get('ids', [])
-        if github_marker_ids:
-            param_marker = item.get_closest_marker('parametrize')
-            param_marker_ids = []
-            if param_marker:
-                param_marker_ids = param_marker.kwargs.get('ids', [])  # noqa F841
-            current_test_id = item.callspec.id
-
-            if current_test_id not in github_marker_ids:
-                return
+        if github_marker_ids and item.callspec.id not in github_marker_ids:
+            return NO_DECISION
 
-        unresolved_issues = []
         issue_urls = item.funcargs["github_issues"]
-        for issue_url in issue_urls:
-            if issue_url not in self._issue_cache:
-                continue
-                # warnings.warn(errstr, Warning)
+        skip = bool(github_marker.kwargs.get('skip', False))
+        raises = github_marker.kwargs.get('raises')
+        key = (issue_urls, skip, raises)
+        decision = decisions.get(key)
+        if decision is None:
+            unresolved_issues = [self._issue_cache[issue_url] for issue_url in issue_urls
+                                 if issue_url in self._issue_cache and not self._issue_cache[issue_url].is_resolved]
+            decision = decisions[key] = IssueDecision.from_issues(issue_urls, unresolved_issues, skip, raises)
+        return decision
 
-            issue = self._issue_cache[issue_url]
-            if not issue.is_resolved:
-                unresolved_issues.append(issue)
+    def pytest_runtest_setup(self, item):
+        """Handle github marker by calling xfail or skip, as needed."""
+        log.debug("pytest_runtest_setup() called")
+        decision = getattr(item, '_github_decision', None)
+        if decision is None and self._pipeline is not None:
+            # Only wait for the issues of this item, which may be shared by later items
+            issue_urls = getattr(item, 'funcargs', {}).get('github_issues', ())
+            if any(url not in self._issue_cache for url in issue_urls):
+                start = time.time()
+                self.__wait(issue_urls)
+                self.metrics.blocking += time.time() - start
+            if self._deferred or self._fetched:
+                self.__flush_deferred()
+            decision = self.__decide(item, self._decisions)
+        elif decision is None:
+            # Items that weren't selected when github issues were resolved
+            decision = self.__decide(item, {})
+        decision.apply(item)
 
-        if unresolved_issues:
-            # TODO - Add support for skip vs xfail
-            skip = item.get_closest_marker('github').kwargs.get('skip', False)
-            raises = item.get_closest_marker('github').kwargs.get('raises')
+    def pytest_runtest_logreport(self, report):
+        """Write the outcome of tests linked to github issues to --github-report."""
+        if self.report is None:
+            return
+        # The outcome of a test is decided by its call, unless its setup failed or skipped it
+        if report.when == 'call' or (report.when == 'setup' and not report.passed):
+            for (name, url) in report.user_properties:
+                if name == 'github_issue':
+                    self.report.issue(url, self.__reported_issue(url))
+                    self.report.link(url, report.nodeid, report_outcome(report))
 
-            if skip:
-                pytest.skip("Skipping due to unresolved github issues:\n{0}".format(
-                    "\n ".join(["{0} [{1}] {2}".format(i.html_url, i.state, i.title) for i in unresolved_issues])))
-            else:
-                item.add_marker(pytest.mark.xfail(
-                    reason="Xfailing due to unresolved github issues: \n{0}".format(
-                        "\n ".join(["{0} [{1}] {2}".format(i.html_url, i.state, i.title) for i in unresolved_issues])),
-                    raises=raises))
+    def pytest_collection_finish(self, session):
+        """Write the tests linked to github issues to --github-report, when they won't run."""
+        if self.report is None or not (session.config.option.collectonly or session.config.option.show_github_summary):
+            return
+        decisions = {}
+        for item in session.items:
+            decision = getattr(item, '_github_decision', None) or self.__decide(item, decisions)
+            for url in decision.issue_urls:
+                self.report.issue(url, self.__reported_issue(url))
+                self.report.link(url, item.nodeid)
+
+    def __reported_issue(self, url):
+        """Return the issue at url, possibly resolved by a pytest-xdist worker, or None."""
+        issue = self._issue_cache.get(url)
+        if issue is None and self._store is not None:
+            from pytest_github.store import issue_key
+
+            self.__load_settings()
+            key = issue_key(*self.__parse_issue_url(url))
+            record = self._store.get([key]).get(key)
+            if record is not None:
+                issue = IssueWrapper.from_dict(record, self.completed_labels)
+        if issue is None and self._shared_issues is not None:
+            self.__load_settings()
+            if url not in self._shared_records:
+                self._shared_records = self.__read_shared_issues()
+            if url in self._shared_records:
+                issue = IssueWrapper.from_dict(self._shared_records[url], self.completed_labels)
+        return issue
 
+    def __needs_issues(self, config):
+        # --collect-only doesn't need issue states, unless they are summarized, reported or written to a snapshot
+        return bool(not config.option.collectonly or config.option.show_github_summary or self.snapshot_write or
+                    self.report is not None)
+
+    @pytest.hookimpl(trylast=True)
     def pytest_collection_modifyitems(self, session, config, items):
-        """Report number of github issues collected."""
+        """Resolve github issues used by the selected items, and report how many were collected."""
+        # Runs after -k, -m and --deselect, so only issues for items that will run are fetched
+        issue_urls = OrderedDict()
+        for item in items:
+            for url in getattr(item, 'funcargs', {}).get('github_issues', ()):
+                if url is not None:
+                    issue_urls[url] = True
+
+        self.metrics.issues = len(issue_urls)
+        if self._pipeline is not None:
+            # Fetch issues in the final order of their first items, and cancel those of deselected items
+            priorities = {}
+            for (index, item) in enumerate(items):
+                for url in getattr(item, 'funcargs', {}).get('github_issues', ()):
+                    priorities.setdefault(url, index)
+            self._pipeline.prioritize(priorities)
+            self.metrics.cache_hits += sum(1 for url in issue_urls
+                                           if url in self._issue_cache and url not in self._prefetched)
+        elif self.__needs_issues(config):
+            start = time.time()
+            self._join_prefetch()
+            # Issues loaded from the persistent cache or a snapshot during collection
+            self.metrics.cache_hits += sum(1 for url in issue_urls
+                                           if url in self._issue_cache and url not in self._prefetched)
+            self._resolve_pending_issues(issue_urls)
+            self.metrics.blocking += time.time() - start
+            if self.snapshot_write:
+                self.__write_snapshot(issue_urls)
+
+            # Decide what pytest_runtest_setup does with each item now, once per combination of issues
+            decisions = {}
+            for item in items:
+                item._github_decision = self.__decide(item, decisions)
+
         reporter = config.pluginmanager.getplugin("terminalreporter")
         if reporter:
-            reporter.write_line("collected {0} github issues".format(len(self._issue_cache)), bold=True)
+            reporter.write_line("collected {0} github issues".format(len(issue_urls)), bold=True)
+            if any(self._revalidated.values()):
+                reporter.write_line("revalidated {0} github issues ({1} not modified, {2} modified)".format(
+                    sum(self._revalidated.values()), self._revalidated[304], self._revalidated[200]))
+            if self._synced['repositories']:
+                reporter.write_line("synced {0} github repositories ({1} issues updated)".format(
+                    self._synced['repositories'], self._synced['updated']))
 
     def pytest_itemcollected(self, item):
-        """While collecting items, cache any github issues."""
+        """While collecting items, queue any uncached github issues."""
         marker = item.get_closest_marker('github')
 
         if marker is not None and hasattr(item, 'funcargs'):
             issue_urls = tuple(sorted(set(marker.args)))  # (O_O) for caching
-            for url in issue_urls:
-                # add uncached issues to issue cache
-                if url is not None and url not in self._issue_cache:
-                    (username, repository, number) = self.__parse_issue_url(url)
-                    try:
-                        if self.api:
-                            self._issue_cache[url] = IssueWrapper(self.api.issue(username, repository, number), self)
-                        else:
-                            raise AttributeError('No valid github session found to access private issue.')
-                    except (AttributeError, github3.exceptions.GitHubError) as e:
-                        errstr = "Unable to inspect github issue %s - %s" % (url, str(e))
-                        warnings.warn(errstr, Warning)
-
+            self._queue_issues(issue_urls)
             item.funcargs["github_issues"] = issue_urls
+
+            if self.pipeline:
+                # Start fetching the issues first used by this item, in the order items were collected
+                pending = OrderedDict((url, self._pending_issues.pop(url)) for url in issue_urls
+                                      if url in self._pending_issues)
+                # Issues already submitted, such as those found by --github-static, only move up the queue
+                for url in [url for url in pending if url in self._prefetched]:
+                    self.__submit(url, pending.pop(url), self._collected)
+                for (url, parsed_url) in self.__resolve_from_hooks(pending).items():
+                    self.__submit(url, parsed_url, self._collected)
+        self._collected += 1
+
+    def _queue_issues(self, issue_urls):
+        """Queue any uncached github issues in issue_urls, for resolution once collection finishes."""
+        self.__load_settings()
+        for url in issue_urls:
+            if url is not None and url not in self._issue_cache and url not in self._pending_issues:
+                parsed_url = self.__parse_issue_url(url)
+                if not self.__load_cached_issue(url):
+                    self._pending_issues[url] = parsed_url
+
+    def __load_cached_issue(self, url):
+        """Add an issue resolved by a previous run to the issue cache, if it hasn't expired."""
+        record = self._issue_records.get(url)
+        if record is None or time.time() - record['fetched_at'] >= self.cache_ttl:
+            return False
+        self._cache_issue(url, IssueWrapper.from_dict(record, self.completed_labels), record['fetched_at'])
+        return True
+
+    def _resolve_pending_issues(self, issue_urls):
+        """Add any queued github issues found in issue_urls to the issue cache."""
+        pending = OrderedDict((url, parsed_url) for (url, parsed_url) in self._pending_issues.items() if url in issue_urls)
+        for url in pending:
+            del self._pending_issues[url]
+
+        # Issues already fetched by --github-static, even those that couldn't be, aren't fetched again
+        for url in self._prefetched.intersection(pending):
+            del pending[url]
+        self.__resolve(self.__resolve_from_hooks(pending))
+
+    def __resolve_from_hooks(self, pending):
+        """Let conftests and plugins resolve pending issues first, returning the others."""
+        if not pending:
+            return pending
+        resolved = self._config.hook.pytest_github_resolve_issues(config=self._config, urls=list(pending)) or {}
+        for url, record in resolved.items():
+            if url in pending:
+                self._cache_issue(url, IssueWrapper.from_dict(record, self.completed_labels))
+                del pending[url]
+                # Counted once, rather than again by pytest_collection_modifyitems
+                self._prefetched.add(url)
+                self.metrics.cache_hits += 1
+        return pending
+
+    def __resolve(self, pending):
+        """Add pending issues to the issue cache, from the store, other pytest-xdist workers or GitHub."""
+        if not pending:
+            return
+
+        if self._store is not None:
+            self.__resolve_from_store(pending)
+            return
+
+        if self._shared_issues is not None:
+            # Only fetch issues not already resolved by another pytest-xdist worker
+            with FileLock(self._shared_issues + '.lock'):
+                shared = self.__read_shared_issues()
+                for url in list(pending):
+                    if url in shared:
+                        self._cache_issue(url, IssueWrapper.from_dict(shared[url], self.completed_labels),
+                                          shared[url]['fetched_at'])
+                        del pending[url]
+                        self.metrics.cache_hits += 1
+                if pending:
+                    self.metrics.cache_misses += len(pending)
+                    self.__fetch_issues(pending)
+                    self.__report_fetched()
+                    shared.update(self.__issue_records(pending))
+                    self.__write_shared_issues(shared)
+            return
+
+        self.metrics.cache_misses += len(pending)
+        self.__fetch_issues(pending)
+        self.__report_fetched()
+
+        # Persist newly resolved issues for later runs, or once the session finishes with --github-pipeline
+        if self._cache is not None:
+            self._issue_records.update(self.__issue_records(pending))
+            if self._pipeline is None:
+                self._cache.set(GITHUB_CACHE_KEY, self._issue_records)
+
+    def __resolve_from_store(self, pending):
+        """Resolve issues from --github-store, refreshing those that are stale and not leased by another process."""
+        from pytest_github.store import issue_key
+
+        keys = dict((url, issue_key(*parsed_url)) for (url, parsed_url) in pending.items())
+        while pending:
+            fresh_after = time.time() - self.cache_ttl
+            records = self._store.get(set(keys[url] for url in pending))
+            for url in list(pending):
+                record = records.get(keys[url])
+                if record is not None and record['fetched_at'] > fresh_after:
+                    self._cache_issue(url, IssueWrapper.from_dict(record, self.completed_labels), record['fetched_at'])
+                    del pending[url]
+                    self.metrics.cache_hits += 1
+            if not pending:
+                return
+
+            claimed = set(self._store.claim(set(keys[url] for url in pending), fresh_after))
+            refresh = OrderedDict((url, pending.pop(url)) for url in list(pending) if keys[url] in claimed)
+            if refresh:
+                # Stale issues keep their validators, so they are revalidated with conditional requests
+                self._issue_records.update((url, records[keys[url]]) for url in refresh if keys[url] in records)
+                self.metrics.cache_misses += len(refresh)
+                try:
+                    self.__fetch_issues(refresh)
+                    self.__report_fetched()
+                    self._store.put((keys[url], record) for (url, record) in self.__issue_records(refresh).items())
+                finally:
+                    self._store.release(claimed)
+
+            # Issues another process is refreshing are read as they were, or waited for if they were never stored
+            if pending:
+                records = self._store.get(set(keys[url] for url in pending))
+            for url in list(pending):
+                record = records.get(keys[url])
+                if record is not None:
+                    self._cache_issue(url, IssueWrapper.from_dict(record, self.completed_labels), record['fetched_at'])
+                    del pending[url]
+                    self.metrics.cache_hits += 1
+            if pending:
+                time.sleep(GITHUB_STORE_POLL)
+
+    def __issue_records(self, urls):
+        """Return cache records for any of urls that were resolved."""
+        return dict((url, self._issue_cache[url].to_dict(fetched_at=self._fetched_at[url]))
+                    for url in urls if url in self._issue_cache)
+
+    def __fetch_issues(self, pending):
+        """Fetch github issues using the configured engine."""
+        if self.snapshot_read is not None:
+            for url in pending:
+                self.__warn_unavailable(url, 'Not found in github snapshot: %s' % self.snapshot_read)
+            return
+
+        if not self.api():
+            for url in pending:
+                self.__warn_unavailable(url, 'No valid github session found to access private issue.')
+            return
+
+        # A copy, as issues resolved by listing their repository are removed from it
+        pending = OrderedDict(self.__plan_rate_limit(pending))
+        if self.cache_sync:
+            pending = self.__sync_repositories(pending)
+        if not pending:
+            return
+
+        # Stale issues with validators are revalidated using conditional requests
+        stale = [(url, parsed_url) for (url, parsed_url) in pending.items() if self.__validators(url)]
+        if stale:
+            self.__warn_fetch_errors(self.__map(self.__revalidate_issue, stale))
+            pending = OrderedDict((url, parsed_url) for (url, parsed_url) in pending.items() if not self.__validators(url))
+            if not pending:
+                return
+
+        if self.engine == 'graphql':
+            urls = list(pending)
+            for start in range(0, len(urls), self.batch_size):
+                self.__resolve_graphql_batch(OrderedDict((url, pending[url]) for url in urls[start:start + self.batch_size]))
+        elif self.engine == 'async':
+            self.__resolve_async(pending)
+        else:
+            if self.bulk_threshold > 0:
+                pending = self.__resolve_bulk(pending)
+            self.__warn_fetch_errors(self.__map(self.__fetch_issue, pending.items()))
+
+    def __resolve_bulk(self, pending):
+        """Resolve issues from repositories with many pending issues by listing them, returning the rest."""
+        import github3
+
+        for (username, repository), (wanted, _) in self.__bulk_listings(pending).items():
+            last = max(wanted)
+            start = time.time()
+            found = []
+            try:
+                for data in self.__list_issues(username, repository, state='all', sort='created', direction='asc'):
+                    url = wanted.pop(data['number'], None)
+                    if url is not None:
+                        found.append((url, IssueWrapper.from_json(data, self.completed_labels)))
+                        del pending[url]
+                    if not wanted or data['number'] >= last:
+                        break
+            except (AttributeError, KeyError, ValueError, RateLimitExceeded, github3.exceptions.GitHubError) as e:
+                log.debug("Unable to list github issues in %s/%s - %s", username, repository, e)
+            for url, issue in found:
+                self.__issue_fetched(url, issue, time.time() - start)
+
+        # Anything not found in a listing, such as transferred issues, is fetched individually
+        return pending
+
+    def __bulk_listings(self, pending):
+        """Return the pending issues by number, and the pages listing them, of each repository worth listing."""
+        repositories = OrderedDict()
+        for url, (username, repository, number) in pending.items():
+            repositories.setdefault((username, repository), dict())[int(number)] = url
+
+        listings = OrderedDict()
+        for key, wanted in repositories.items():
+            # Issues are numbered in the order they were created, so listing up to the
+            # highest wanted number needs max(wanted) / GITHUB_PAGE_SIZE requests
+            pages = (max(wanted) + GITHUB_PAGE_SIZE - 1) // GITHUB_PAGE_SIZE
+            if len(wanted) >= self.bulk_threshold and pages < len(wanted):
+                listings[key] = (wanted, pages)
+        return listings
+
+    def __sync_repositories(self, pending):
+        """Refresh the cached issues of repositories with expired pending issues, returning the rest.
+
+        Every cached issue of a repository is patched using one listing of the issues
+        updated since the oldest of them was fetched.
+        """
+        import github3
+
+        repositories = OrderedDict()
+        for url, (username, repository, number) in pending.items():
+            if url in self._issue_records:
+                repositories[(username, repository)] = dict()
+        for url, record in self._issue_records.items():
+            (username, repository, number) = self.__parse_issue_url(url)
+            if (username, repository) in repositories:
+                repositories[(username, repository)][int(number)] = url
+
+        for (username, repository), cached in repositories.items():
+            synced_at = time.time()
+            since = min(self._issue_records[url]['fetched_at'] for url in cached.values()) - GITHUB_SYNC_OVERLAP
+            updated = {}
+            try:
+                for data in self.__list_issues(username, repository, state='all',
+                                               since=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(since))):
+                    url = cached.get(data['number'])
+                    if url is not None:
+                        updated[url] = IssueWrapper.from_json(data, self.completed_labels).to_dict()
+            except (AttributeError, KeyError, ValueError, RateLimitExceeded, github3.exceptions.GitHubError) as e:
+                # Expired issues of this repository are refreshed individually instead
+                log.debug("Unable to sync github issues in %s/%s - %s", username, repository, e)
+                continue
+
+            # Issues not updated since the last sync are still current
+            for url in cached.values():
+                record = updated.get(url, self._issue_records[url])
+                record['fetched_at'] = synced_at
+                self._issue_records[url] = record
+                if url in pending:
+                    self.__issue_fetched(url, IssueWrapper.from_dict(record, self.completed_labels),
+                                         time.time() - synced_at, synced_at)
+                    del pending[url]
+            self._synced['repositories'] += 1
+            self._synced['updated'] += len(updated)
+        return pending
+
+    def __list_issues(self, username, repository, **params):
+        """Yield the issues of a repository as returned by the REST API, requesting one page at a time.
+
+        Like any other request, each page waits for the rate limit, and is sent
+        again once a secondary rate limit expires.
+        """
+        url = self.api()._build_url('repos', username, repository, 'issues')
+        page = 1
+        while True:
+            response = self._scheduler.call(self.__request, 'get', url,
+                                            params=dict(params, per_page=GITHUB_PAGE_SIZE, page=page))
+            issues = response.json()
+            for data in issues:
+                yield data
+            if len(issues) < GITHUB_PAGE_SIZE:
+                return
+            page += 1
+
+    def __plan_rate_limit(self, pending):
+        """Return the pending issues to fetch, using cached issues if the rate limit can't fetch them all."""
+        import github3
+
+        resource = 'graphql' if self.engine == 'graphql' else 'core'
+        requests = len(pending)
+        if self.engine == 'graphql':
+            requests = (requests + self.batch_size - 1) // self.batch_size
+        elif self.engine == 'rest' and self.bulk_threshold > 0:
+            # Repositories listed in bulk cost a request per page, rather than one per issue
+            for (wanted, pages) in self.__bulk_listings(pending).values():
+                requests -= len(wanted) - pages
+
+        if self._scheduler.remaining(resource) is None:
+            try:
+                limit = self.api().rate_limit()['resources'][resource]
+                self._scheduler.update(resource, limit['remaining'], limit['reset'])
+            except (AttributeError, KeyError, TypeError, github3.exceptions.GitHubError) as e:
+                log.debug("Unable to inspect github rate limit - %s", e)
+
+        if self._scheduler.can_afford(requests, resource):
+            return pending
+
+        cached = [url for url in pending if url in self._issue_records]
+        for url in cached:
+            self._cache_issue(url, IssueWrapper.from_dict(self._issue_records[url], self.completed_labels),
+                              self._issue_records[url]['fetched_at'])
+        if cached:
+            errstr = ("GitHub rate limit too low to fetch %s github issues (%s remaining), "
+                      "using %s expired issues from the cache" % (
+                          len(pending), self._scheduler.remaining(resource), len(cached)))
+            if not self.__deferred(warnings.warn, errstr, Warning):
+                warnings.warn(errstr, Warning)
+        return OrderedDict((url, parsed_url) for (url, parsed_url) in pending.items() if url not in self._issue_records)
+
+    def __map(self, func, iterable):
+        """Call func for each value in iterable, using a thread pool when --github-workers is set."""
+        iterable = list(iterable)
+        if self.workers < 2 or len(iterable) < 2:
+            return [func(value) for value in iterable]
+
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(min(self.workers, len(iterable)))
+        try:
+            return pool.map(func, iterable)
+        finally:
+            pool.close()
+            pool.join()
+
+    def _cache_issue(self, url, issue, fetched_at=None):
+        """Add a resolved github issue to the issue cache."""
+        with self._issue_cache_lock:
+            self._issue_cache[url] = issue
+            self._fetched_at[url] = fetched_at or time.time()
+
+    def __issue_fetched(self, url, issue, elapsed, fetched_at=None):
+        """Cache an issue requested from GitHub, and queue the pytest_github_issue_fetched hook."""
+        self._cache_issue(url, issue, fetched_at)
+        with self._issue_cache_lock:
+            self._fetched.append((url, issue, elapsed))
+
+    def __report_fetched(self):
+        # Call hooks from the main thread, once every thread has finished
+        if threading.current_thread() is not self._main_thread:
+            return
+        with self._issue_cache_lock:
+            (fetched, self._fetched) = (self._fetched, [])
+        for url, issue, elapsed in fetched:
+            self._config.hook.pytest_github_issue_fetched(config=self._config, url=url, record=issue.to_dict(),
+                                                          elapsed=elapsed)
+
+    def __fetch_issue(self, pending_issue):
+        """Fetch and cache a single github issue, returning any error raised."""
+        import github3
+
+        url, (username, repository, number) = pending_issue
+        start = time.time()
+        try:
+            issue = self._scheduler.call(self.api().issue, username, repository, number)
+            self.__issue_fetched(url, IssueWrapper.from_issue(issue, self.completed_labels), time.time() - start)
+        except (AttributeError, RateLimitExceeded, github3.exceptions.GitHubError) as e:
+            return (url, e)
+
+    def __validators(self, url):
+        """Return the conditional request headers for a cached issue."""
+        record = self._issue_records.get(url) or {}
+        headers = {}
+        if record.get('etag'):
+            headers['If-None-Match'] = record['etag']
+        if record.get('last_modified'):
+            headers['If-Modified-Since'] = record['last_modified']
+        return headers
+
+    def __revalidate_issue(self, pending_issue):
+        """Refresh a stale github issue using a conditional request, returning any error raised."""
+        import github3
+
+        url, (username, repository, number) = pending_issue
+        record = self._issue_records[url]
+        headers = self.__validators(url)
+        start = time.time()
+
+        try:
+            response = self._scheduler.call(self.__request, 'get',
+                                            self.api()._build_url('repos', username, repository, 'issues', str(number)),
+                                            expected=(200, 304), headers=headers)
+            if response.status_code == 304:
+                issue = IssueWrapper.from_dict(record, self.completed_labels)
+            else:
+                data = response.json()
+                data['ETag'] = response.headers.get('ETag')
+                data['Last-Modified'] = response.headers.get('Last-Modified')
+                issue = IssueWrapper.from_json(data, self.completed_labels)
+        except (AttributeError, ValueError, RateLimitExceeded, github3.exceptions.GitHubError) as e:
+            return (url, e)
+
+        with self._issue_cache_lock:
+            self._revalidated[response.status_code] += 1
+        self.__issue_fetched(url, issue, time.time() - start)
+
+    def __request(self, method, url, expected=(200,), **kwargs):
+        """Send a request with the github api session, raising GitHubError unless the status code is expected."""
+        import github3
+
+        response = getattr(self.api().session, method)(url, **kwargs)
+        if response.status_code not in expected:
+            raise github3.exceptions.error_for(response)
+        return response
+
+    def __warn_fetch_errors(self, errors):
+        # Warn from the calling thread, so warnings are reported in order
+        if self.__deferred(self.__warn_fetch_errors, errors):
+            return
+        rate_limited = []
+        for error in errors:
+            if error is None:
+                continue
+            if isinstance(error[1], RateLimitExceeded):
+                rate_limited.append(error)
+                self._config.hook.pytest_github_fetch_failed(config=self._config, url=error[0], exc=error[1])
+            else:
+                self.__warn_unavailable(*error)
+
+        # Report issues skipped because of the rate limit once, rather than once per issue
+        if rate_limited:
+            errstr = "Unable to inspect %s github issues - %s" % (len(rate_limited), rate_limited[-1][1])
+            warnings.warn(errstr, Warning)
+
+    def __resolve_async(self, pending):
+        """Resolve github issues concurrently using the asyncio engine."""
+        from pytest_github import aio
+
+        api_urls = [self.api()._build_url('repos', username, repository, 'issues', str(number))
+                    for (username, repository, number) in pending.values()]
+        (username, password) = (None, None) if self.proxy else (self.username, self.password)
+        start = time.time()
+        results = aio.fetch_issues(api_urls, username, password, limit=self.workers,
+                                   connect_timeout=self.connect_timeout, read_timeout=self.read_timeout,
+                                   observe=self.metrics.record, scheduler=self._scheduler)
+        errors = []
+        for url, (data, error) in zip(pending, results):
+            if error is None:
+                self.__issue_fetched(url, IssueWrapper.from_json(data, self.completed_labels), time.time() - start)
+            else:
+                errors.append((url, error))
+        self.__warn_fetch_errors(errors)
+
+    def __resolve_graphql_batch(self, batch):
+        """Resolve a batch of github issues and pull requests using a single GraphQL query."""
+        import github3
+
+        # Group issues by repository, and alias each issue to find it in the response
+        repositories = OrderedDict()
+        for url, (username, repository, number) in batch.items():
+            repositories.setdefault((username, repository), OrderedDict())[url] = number
+
+        aliases = dict()
+        fragments = []
+        for index, ((username, repository), issues) in enumerate(repositories.items()):
+            repo_alias = 'r%d' % index
+            issue_fragments = []
+            for url, number in issues.items():
+                issue_alias = 'i%s' % number
+                aliases[url] = (repo_alias, issue_alias)
+                issue_fragments.append(
+                    '%s: issueOrPullRequest(number: %s) '
+                    '{ ... on Issue { %s } ... on PullRequest { %s } }' % (
+                        issue_alias, number, GITHUB_GRAPHQL_FIELDS, GITHUB_GRAPHQL_FIELDS))
+            fragments.append('%s: repository(owner: "%s", name: "%s") { %s }' % (
+                repo_alias, username, repository, ' '.join(issue_fragments)))
+        query = 'query { %s }' % ' '.join(fragments)
+
+        start = time.time()
+        try:
+            response = self._scheduler.call(self.__request, 'post', self.api()._build_url('graphql'),
+                                            json={'query': query}, resource='graphql')
+            result = response.json()
+        except (AttributeError, ValueError, RateLimitExceeded, github3.exceptions.GitHubError) as e:
+            for url in batch:
+                self.__warn_unavailable(url, e)
+            return
+
+        # Index any errors by the alias path that caused them
+        errors = dict()
+        for error in result.get('errors') or []:
+            errors.setdefault(tuple(error.get('path') or ())[:2], error.get('message'))
+
+        data = result.get('data') or {}
+        for url, (repo_alias, issue_alias) in aliases.items():
+            node = (data.get(repo_alias) or {}).get(issue_alias)
+            if node:
+                self.__issue_fetched(url, IssueWrapper.from_graphql(node, self.completed_labels), time.time() - start)
+            else:
+                self.__warn_unavailable(url, errors.get((repo_alias, issue_alias)) or errors.get((repo_alias,)) or 'Not Found')
+
+    def __warn_unavailable(self, url, reason):
+        if self.__deferred(self.__warn_unavailable, url, reason):
+            return
+        errstr = "Unable to inspect github issue %s - %s" % (url, str(reason))
+        warnings.warn(errstr, Warning)
+        exc = reason if isinstance(reason, Exception) else IssueUnavailable(reason)
+        self._config.hook.pytest_github_fetch_failed(config=self._config, url=url, exc=exc)
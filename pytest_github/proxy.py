@@ -0,0 +1,225 @@
+"""Local caching proxy shared by every pytest process on a machine.
+
+The proxy fronts the GitHub REST API.  Successful ``GET`` responses are cached in
+memory for ``ttl`` seconds, and concurrent requests for the same resource are
+coalesced into a single upstream request.  Once an entry expires, it is
+refreshed with a conditional request.  Point the plugin at the proxy using
+``--github-proxy``::
+
+    pytest-github-proxy --port 8765 --ttl 300
+    py.test --github-proxy=http://127.0.0.1:8765
+
+:copyright: see LICENSE for details
+:license: MIT, see LICENSE for more details.
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.error import HTTPError
+    from urllib.request import Request, urlopen
+except ImportError:  # python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urllib2 import HTTPError, Request, urlopen
+
+log = logging.getLogger(__name__)
+
+GITHUB_API_URL = 'https://api.github.com'
+
+# Default number of seconds a response is served from memory
+GITHUB_PROXY_TTL = 300
+
+# Responses that change with every request, and are never cached
+UNCACHED_PATHS = ('/rate_limit',)
+
+# Request headers passed upstream, and response headers passed back to clients
+REQUEST_HEADERS = ('Accept', 'Content-Type')
+RESPONSE_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'X-RateLimit-Limit', 'X-RateLimit-Remaining',
+                    'X-RateLimit-Reset', 'X-RateLimit-Resource', 'Retry-After')
+
+
+class Response(object):
+
+    """An upstream response, and when it expires."""
+
+    __slots__ = ('status', 'headers', 'body', 'expires')
+
+    def __init__(self, status, headers, body, expires=0):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.expires = expires
+
+
+class _Flight(object):
+
+    """An upstream request that other requests for the same resource wait for."""
+
+    __slots__ = ('done', 'response')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+
+
+class ResponseCache(object):
+
+    """Cache upstream responses, coalescing concurrent requests for the same resource."""
+
+    def __init__(self, fetch, ttl=GITHUB_PROXY_TTL, clock=time.time):
+        self._fetch = fetch
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = {}
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def get(self, path, headers=None):
+        """Return the response for path, requesting it upstream unless it is cached or already requested."""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.expires > self._clock():
+                return entry
+            flight = self._flights.get(path)
+            leader = flight is None
+            if leader:
+                flight = self._flights[path] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            return flight.response
+
+        try:
+            response = self._fetch(path, headers or {}, entry)
+            if response.status == 304 and entry is not None:
+                # Unchanged upstream, keep serving the expired entry
+                response = entry
+            if response.status == 200 and path not in UNCACHED_PATHS:
+                response.expires = self._clock() + self.ttl
+                with self._lock:
+                    self._entries[path] = response
+            flight.response = response
+        finally:
+            with self._lock:
+                del self._flights[path]
+            flight.done.set()
+        return response
+
+
+class Upstream(object):
+
+    """Send requests to the GitHub API."""
+
+    def __init__(self, url=GITHUB_API_URL, token=None, timeout=10):
+        self.url = url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+
+    def __call__(self, path, headers, entry=None, method='GET', body=None):
+        """Request path upstream, revalidating entry if it is given."""
+        headers = dict((key, headers.get(key)) for key in REQUEST_HEADERS if headers.get(key))
+        if self.token:
+            headers['Authorization'] = 'token %s' % self.token
+        if entry is not None and entry.headers.get('ETag'):
+            headers['If-None-Match'] = entry.headers['ETag']
+        request = Request(self.url + path, data=body, headers=headers)
+        request.get_method = lambda: method
+
+        log.debug("%s %s%s", method, self.url, path)
+        try:
+            response = urlopen(request, timeout=self.timeout)
+        except HTTPError as e:
+            response = e
+        except (IOError, OSError) as e:  # connection errors and timeouts
+            message = 'Bad Gateway: %s' % getattr(e, 'reason', e)
+            return Response(502, {'Content-Type': 'application/json'}, json.dumps({'message': message}).encode('utf-8'))
+        try:
+            info = response.info()
+            return Response(response.code, dict((key, info[key]) for key in RESPONSE_HEADERS if info.get(key)),
+                            response.read())
+        finally:
+            response.close()
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+
+    """Serve GitHub API requests from the cache of the server."""
+
+    # Every response has a Content-Length, so clients can keep connections alive
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        response = self.server.cache.get(self.path, self.headers)
+        etag = response.headers.get('ETag')
+        if response.status == 200 and etag is not None and self.headers.get('If-None-Match') == etag:
+            response = Response(304, response.headers, b'')
+        self.send(response)
+
+    def do_POST(self):
+        # GraphQL queries are passed through as is
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.send(self.server.upstream(self.path, self.headers, method='POST', body=body))
+
+    def send(self, response):
+        self.send_response(response.status)
+        for (key, value) in response.headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(response.body)))
+        self.end_headers()
+        self.wfile.write(response.body)
+
+    def log_message(self, format, *args):
+        log.debug(format, *args)
+
+
+class ProxyServer(ThreadingMixIn, HTTPServer):
+
+    """Serve each request in its own thread."""
+
+    daemon_threads = True
+
+    def __init__(self, address, upstream, ttl=GITHUB_PROXY_TTL):
+        HTTPServer.__init__(self, address, ProxyHandler)
+        self.upstream = upstream
+        self.cache = ResponseCache(upstream, ttl)
+
+
+def make_server(host='127.0.0.1', port=0, upstream=GITHUB_API_URL, token=None, ttl=GITHUB_PROXY_TTL):
+    """Return a proxy server for the GitHub API at upstream."""
+    return ProxyServer((host, port), Upstream(upstream, token), ttl)
+
+
+def main(argv=None):
+    """Run the proxy until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: %(default)s)')
+    parser.add_argument('--ttl', type=int, default=GITHUB_PROXY_TTL,
+                        help='Number of seconds responses are cached (default: %(default)s)')
+    parser.add_argument('--upstream', default=GITHUB_API_URL, help='GitHub API URL (default: %(default)s)')
+    parser.add_argument('--token', default=os.environ.get('GITHUB_TOKEN'),
+                        help='GitHub api token used for every request (default: $GITHUB_TOKEN)')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    server = make_server(args.host, args.port, args.upstream, args.token, args.ttl)
+    log.info("Proxying %s on http://%s:%s", args.upstream, *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
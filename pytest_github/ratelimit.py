@@ -0,0 +1,171 @@
+"""Pace github requests using the rate limits reported by GitHub.
+
+:copyright: see LICENSE for details
+:license: MIT, see LICENSE for more details.
+"""
+
+import random
+import threading
+import time
+
+# Maximum number of times a request is retried after hitting a rate limit
+GITHUB_MAX_RETRIES = 3
+
+# Below this many remaining requests, requests are spread evenly until the limit resets
+GITHUB_LOW_WATER = 100
+
+
+class RateLimitExceeded(Exception):
+
+    """Raised when a request would wait too long for the rate limit to reset."""
+
+    def __init__(self, reset):
+        super(RateLimitExceeded, self).__init__(reset)
+        self.reset = reset
+
+    def __str__(self):
+        return "GitHub rate limit exceeded until %s" % time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.reset))
+
+
+class RateLimitScheduler(object):
+
+    """Track the remaining rate limits, and decide when requests may be sent.
+
+    GitHub keeps separate budgets for each API resource, such as ``core`` and
+    ``graphql``.  Responses are observed through :meth:`observe`, which can be
+    registered as a requests response hook.  Requests sent through :meth:`call`
+    are paced once their budget runs low, and retried with jittered backoff when
+    GitHub responds with a secondary rate limit.
+    """
+
+    def __init__(self, max_wait=60, max_retries=GITHUB_MAX_RETRIES, low_water=GITHUB_LOW_WATER,
+                 clock=time.time, sleep=time.sleep):
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.low_water = low_water
+        self._limits = {}
+        self._clock = clock
+        self._sleep = sleep
+        self._next_request = 0
+        self._lock = threading.Lock()
+
+        # Total seconds spent waiting, by every thread
+        self.waited = 0.0
+
+    def update(self, resource, remaining, reset=None):
+        """Record the remaining budget of a resource, and when it resets."""
+        with self._lock:
+            self._limits[resource] = [int(remaining), reset and int(reset)]
+
+    def observe(self, response, *args, **kwargs):
+        """Update the remaining budget from the headers of a response."""
+        headers = response.headers
+        if 'X-RateLimit-Remaining' in headers:
+            self.update(headers.get('X-RateLimit-Resource', 'core'), headers['X-RateLimit-Remaining'],
+                        headers.get('X-RateLimit-Reset'))
+
+    def remaining(self, resource='core'):
+        """Return the remaining budget of a resource, or None if unknown."""
+        return self._limits.get(resource, [None])[0]
+
+    def remaining_by_resource(self):
+        """Return the known remaining budget of every resource."""
+        return dict((resource, limit[0]) for (resource, limit) in self._limits.items())
+
+    def can_afford(self, count, resource='core'):
+        """Return whether count requests fit in the remaining budget of a resource."""
+        remaining = self.remaining(resource)
+        return remaining is None or count <= remaining
+
+    def wait(self, resource='core'):
+        """Block until the next request to a resource may be sent.
+
+        Raise :class:`RateLimitExceeded` if that is more than ``max_wait`` seconds away.
+        """
+        delay = self.reserve(resource)
+        if delay > 0:
+            self.__sleep(delay)
+
+    def reserve(self, resource='core'):
+        """Reserve the next request to a resource, returning the seconds to wait before sending it.
+
+        Unlike :meth:`wait`, this doesn't block, so callers such as asyncio tasks
+        can wait their own way, and report it with :meth:`record_wait`.  Raise
+        :class:`RateLimitExceeded` if that is more than ``max_wait`` seconds away.
+        """
+        with self._lock:
+            now = self._clock()
+            start = max(now, self._next_request)
+            (remaining, reset) = self._limits.get(resource, (None, None))
+            if remaining is not None and reset is not None and reset > now:
+                if remaining <= 0:
+                    start = max(start, reset)
+                elif remaining < self.low_water:
+                    # Spread what is left of the budget until the limit resets
+                    start += float(reset - now) / remaining
+            if start - now > self.max_wait:
+                raise RateLimitExceeded(reset or start)
+            self._next_request = start
+            if remaining:
+                self._limits[resource][0] -= 1
+        return max(0, start - now)
+
+    def record_wait(self, seconds):
+        """Count seconds spent waiting for the rate limit outside of this scheduler."""
+        with self._lock:
+            self.waited += seconds
+
+    def __sleep(self, seconds):
+        self.record_wait(seconds)
+        self._sleep(seconds)
+
+    def backoff(self, attempt, retry_after=None):
+        """Return the number of seconds to wait before retrying a request."""
+        delay = float(retry_after) if retry_after else 2 ** attempt
+        return delay + random.uniform(0, delay)
+
+    def call(self, func, *args, **kwargs):
+        """Call func once the rate limit allows, retrying when it hits a secondary rate limit.
+
+        The resource func requests from may be given with the ``resource`` keyword.
+        """
+        resource = kwargs.pop('resource', 'core')
+        attempt = 0
+        while True:
+            self.wait(resource)
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                response = getattr(e, 'response', None)
+                delay = None if response is None else self.retry_delay(response, attempt, resource)
+                if delay is None:
+                    raise
+                self.__sleep(delay)
+                attempt += 1
+
+    def retry_delay(self, response, attempt, resource='core'):
+        """Return the seconds to wait before retrying the attempt answered by response, or None not to retry it.
+
+        Raise :class:`RateLimitExceeded` if that is more than ``max_wait`` seconds away.
+        """
+        if attempt >= self.max_retries or not self.is_rate_limited(response):
+            return None
+        self.observe(response)
+        retry_after = response.headers.get('Retry-After')
+        if retry_after is None and self.remaining(resource) == 0:
+            # The primary rate limit is exhausted, reserving the next request holds off until it resets
+            return 0
+        delay = self.backoff(attempt, retry_after)
+        if delay > self.max_wait:
+            raise RateLimitExceeded(self._clock() + delay)
+        return delay
+
+    @staticmethod
+    def is_rate_limited(response):
+        """Return whether a requests or aiohttp response was refused because of a rate limit."""
+        status = getattr(response, 'status_code', None) or getattr(response, 'status', None)
+        if status == 429:
+            return True
+        if status != 403:
+            return False
+        return 'Retry-After' in response.headers or response.headers.get('X-RateLimit-Remaining') == '0'
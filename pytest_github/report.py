@@ -0,0 +1,61 @@
+"""Stream the github issues linked to tests as JSON lines.
+
+Each line of the report is a JSON object, with a ``type`` of either:
+
+``issue``
+    The state of a github issue, written before the first test linked to it.
+``link``
+    A test linked to a github issue, and its outcome, written as soon as the
+    test reports it.  Tests that aren't run, such as with ``--collect-only``,
+    have no outcome.
+
+:copyright: see LICENSE for details
+:license: MIT, see LICENSE for more details.
+"""
+
+import json
+
+
+def report_outcome(report):
+    """Return the outcome of a test report, telling expected failures apart."""
+    if hasattr(report, 'wasxfail'):
+        return 'xfailed' if report.skipped else 'xpassed'
+    return report.outcome
+
+
+class IssueReport(object):
+
+    """Write issue and link records to a file, one line at a time.
+
+    Only the URLs of issues already written are kept, so the report doesn't
+    grow with the number of tests.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # Line buffered, so the report can be followed while tests run
+        self._fd = open(path, 'w', 1)
+        self._issues = set()
+
+    def issue(self, url, issue):
+        """Write the state of issue, unless it was already written.
+
+        issue is None when it couldn't be resolved.
+        """
+        if url in self._issues:
+            return
+        self._issues.add(url)
+        record = dict(type='issue', issue=url, state=None, title=None, labels=[], resolved=None)
+        if issue is not None:
+            record.update(state=issue.state, title=issue.title, labels=list(issue.labels), resolved=issue.is_resolved)
+        self._write(record)
+
+    def link(self, url, nodeid, outcome=None):
+        """Write a test linked to a github issue."""
+        self._write(dict(type='link', issue=url, nodeid=nodeid, outcome=outcome))
+
+    def close(self):
+        self._fd.close()
+
+    def _write(self, record):
+        self._fd.write(json.dumps(record, sort_keys=True) + '\n')
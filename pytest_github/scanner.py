@@ -0,0 +1,157 @@
+"""Find github marker URLs in test files without importing them.
+
+Test files are parsed with :mod:`ast`, so the github issues they reference
+are known before pytest imports and collects them.  Only literal URLs are
+found, in any ``pytest.mark.github(...)`` or ``mark.github(...)`` call, such
+as a decorator or a module or class ``pytestmark``.  URLs built at runtime
+are still found by collection.
+
+:copyright: see LICENSE for details
+:license: MIT, see LICENSE for more details.
+"""
+
+import ast
+import fnmatch
+import os
+
+# Version of the entries stored in the scan index, bumped when they change
+SCAN_VERSION = 1
+
+
+def matches_name(name, patterns):
+    """Return whether name matches any of patterns, like python_functions and python_classes."""
+    for pattern in patterns:
+        if name.startswith(pattern):
+            return True
+        if ('*' in pattern or '?' in pattern or '[' in pattern) and fnmatch.fnmatch(name, pattern):
+            return True
+    return False
+
+
+def find_test_files(paths, python_files, norecursedirs):
+    """Yield the test files in paths, as pytest would collect them."""
+    for path in paths:
+        if os.path.isfile(path):
+            if path.endswith('.py'):
+                yield path
+            continue
+        for (dirpath, dirnames, filenames) in os.walk(path):
+            dirnames[:] = sorted(name for name in dirnames
+                                 if not any(fnmatch.fnmatch(name, pattern) for pattern in norecursedirs))
+            for filename in sorted(filenames):
+                if any(fnmatch.fnmatch(filename, pattern) for pattern in python_files):
+                    yield os.path.join(dirpath, filename)
+
+
+def _string(node):
+    """Return the value of a literal string node, or None."""
+    # Compared by name, as python 3.8 replaced ast.Str with ast.Constant
+    kind = type(node).__name__
+    if kind == 'Str':
+        return node.s
+    if kind == 'Constant' and isinstance(node.value, str):
+        return node.value
+    return None
+
+
+def _github_urls(node):
+    """Return the literal URLs of a github marker call, or None if node isn't one."""
+    if not isinstance(node, ast.Call):
+        return None
+    func = node.func
+    if not (isinstance(func, ast.Attribute) and func.attr == 'github'):
+        return None
+    mark = func.value
+    if not ((isinstance(mark, ast.Attribute) and mark.attr == 'mark') or
+            (isinstance(mark, ast.Name) and mark.id == 'mark')):
+        return None
+    return [url for url in (_string(arg) for arg in node.args) if url is not None]
+
+
+def _closest_urls(markers):
+    """Return the URLs of the first github marker in markers, or None."""
+    for marker in markers:
+        urls = _github_urls(marker)
+        if urls is not None:
+            return urls
+    return None
+
+
+def _pytestmark(body):
+    """Return the markers assigned to pytestmark in body."""
+    markers = []
+    for node in body:
+        if isinstance(node, ast.Assign) and any(
+                isinstance(target, ast.Name) and target.id == 'pytestmark' for target in node.targets):
+            value = node.value
+            markers = list(value.elts) if isinstance(value, (ast.List, ast.Tuple)) else [value]
+    return markers
+
+
+def _tests(body, prefix, parents, python_classes, python_functions, instance):
+    """Yield the name and github marker URLs of each test function in body."""
+    functions = (ast.FunctionDef, getattr(ast, 'AsyncFunctionDef', ast.FunctionDef))
+    for node in body:
+        if isinstance(node, functions) and matches_name(node.name, python_functions):
+            # The closest marker applies, as with item.get_closest_marker()
+            for urls in (_closest_urls(reversed(node.decorator_list)),) + parents:
+                if urls is not None:
+                    yield (prefix + node.name, urls)
+                    break
+        elif isinstance(node, ast.ClassDef) and matches_name(node.name, python_classes):
+            markers = _pytestmark(node.body) + list(reversed(node.decorator_list))
+            for test in _tests(node.body, prefix + node.name + ('().' if instance else '.'),
+                               (_closest_urls(markers),) + parents, python_classes, python_functions, instance):
+                yield test
+
+
+def scan_source(source, python_classes=('Test',), python_functions=('test',), instance=False):
+    """Return the github marker URLs found in the source of a test file.
+
+    The result is a dictionary listing every literal URL as ``urls``, and each
+    test function linked to github issues as a ``[name, urls]`` pair in
+    ``tests``.  Methods are named ``Class.method``, or ``Class().method`` when
+    instance is set, as with pytest versions collecting class instances.
+    """
+    tree = ast.parse(source)
+    urls = []
+    # In source order, as ast.walk() is breadth first
+    calls = sorted((node for node in ast.walk(tree) if isinstance(node, ast.Call)),
+                   key=lambda node: (node.lineno, node.col_offset))
+    for node in calls:
+        for url in _github_urls(node) or ():
+            if url not in urls:
+                urls.append(url)
+    tests = []
+    if urls:
+        parents = (_closest_urls(_pytestmark(tree.body)),)
+        tests = [[name, test_urls] for (name, test_urls) in _tests(
+            tree.body, '', parents, python_classes, python_functions, instance) if test_urls]
+    return dict(urls=urls, tests=tests)
+
+
+def scan(paths, index, python_files=('test_*.py', '*_test.py'), norecursedirs=(), **kwargs):
+    """Return the scan of every test file in paths, as (path, scan) pairs.
+
+    index maps paths to scans, and is updated with any file whose modification
+    time or size changed, so unchanged files aren't parsed again.  Files that
+    can't be read or parsed are left to collection, which reports them.
+    """
+    scans = []
+    for path in find_test_files(paths, python_files, norecursedirs):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entry = index.get(path)
+        if (entry is None or entry.get('version') != SCAN_VERSION or entry['mtime'] != stat.st_mtime or
+                entry['size'] != stat.st_size):
+            try:
+                with open(path, 'rb') as fd:
+                    result = scan_source(fd.read(), **kwargs)
+            except (IOError, SyntaxError, ValueError):
+                index.pop(path, None)
+                continue
+            entry = index[path] = dict(result, version=SCAN_VERSION, mtime=stat.st_mtime, size=stat.st_size)
+        scans.append((path, entry))
+    return scans
@@ -0,0 +1,130 @@
+"""Persistent issue store shared by every pytest process on a host.
+
+Issues are stored in a single SQLite file in WAL mode, so any number of
+processes can read it while one of them writes.  Issues are keyed by their
+normalized ``(owner, repository, number)``.  Before refreshing stale issues,
+a process claims a lease on them, so the other processes keep reading the
+stale issues instead of refreshing them too::
+
+    py.test --github-store ~/.cache/pytest-github.db --github-cache-ttl 600
+
+:copyright: see LICENSE for details
+:license: MIT, see LICENSE for more details.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Number of seconds a process may hold a lease on issues it refreshes
+GITHUB_STORE_LEASE = 60
+
+# Number of seconds to wait for the store to be unlocked by another process
+GITHUB_STORE_TIMEOUT = 30
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS issues ('
+    'owner TEXT NOT NULL, repository TEXT NOT NULL, number INTEGER NOT NULL, '
+    'record TEXT NOT NULL, fetched_at REAL NOT NULL, PRIMARY KEY (owner, repository, number))',
+    'CREATE INDEX IF NOT EXISTS issues_fetched_at ON issues (owner, repository, fetched_at)',
+    'CREATE TABLE IF NOT EXISTS leases ('
+    'owner TEXT NOT NULL, repository TEXT NOT NULL, number INTEGER NOT NULL, '
+    'holder TEXT NOT NULL, expires REAL NOT NULL, PRIMARY KEY (owner, repository, number))',
+)
+
+
+def issue_key(owner, repository, number):
+    """Return the key of an issue, which GitHub matches regardless of case."""
+    return (owner.lower(), repository.lower(), int(number))
+
+
+class IssueStore(object):
+
+    """Issue records, as dictionaries with a ``fetched_at`` time, stored in path.
+
+    Methods may be called from several threads, and are serialized.
+    """
+
+    def __init__(self, path, lease=GITHUB_STORE_LEASE, timeout=GITHUB_STORE_TIMEOUT, clock=time.time):
+        self.path = path
+        self.lease = lease
+        self._clock = clock
+        # Identifies the leases of this store, amongst every process sharing path
+        self.holder = '%s:%s:%s' % (socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+        self._lock = threading.Lock()
+        # Transactions are started explicitly
+        self._db = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        with self._transaction():
+            for statement in SCHEMA:
+                self._db.execute(statement)
+
+    @contextmanager
+    def _transaction(self):
+        """Run statements in a transaction, holding the write lock from its start."""
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._db
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+
+    def get(self, keys):
+        """Return a dictionary mapping any of keys that are stored to their records."""
+        records = {}
+        with self._lock:
+            for key in keys:
+                row = self._db.execute('SELECT record FROM issues WHERE owner = ? AND repository = ? AND number = ?',
+                                       key).fetchone()
+                if row is not None:
+                    records[key] = json.loads(row[0])
+        return records
+
+    def put(self, records):
+        """Store records, given as (key, record) pairs."""
+        with self._transaction() as db:
+            db.executemany('INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?)', [
+                key + (json.dumps(record, sort_keys=True), record['fetched_at']) for (key, record) in records])
+
+    def claim(self, keys, fresh_after):
+        """Lease any of keys that are stale, and not leased by another process, returning them.
+
+        Issues fetched after fresh_after, such as those just refreshed by another
+        process, aren't stale.
+        """
+        claimed = []
+        with self._transaction() as db:
+            now = self._clock()
+            db.execute('DELETE FROM leases WHERE expires <= ?', (now,))
+            for key in keys:
+                row = db.execute('SELECT fetched_at FROM issues WHERE owner = ? AND repository = ? AND number = ?',
+                                 key).fetchone()
+                if row is not None and row[0] > fresh_after:
+                    continue
+                cursor = db.execute('INSERT OR IGNORE INTO leases VALUES (?, ?, ?, ?, ?)',
+                                    key + (self.holder, now + self.lease))
+                if cursor.rowcount == 1:
+                    claimed.append(key)
+        return claimed
+
+    def release(self, keys):
+        """Release the leases of this store on keys."""
+        with self._transaction() as db:
+            db.executemany('DELETE FROM leases WHERE owner = ? AND repository = ? AND number = ? AND holder = ?',
+                           [key + (self.holder,) for key in keys])
+
+    def clear(self):
+        """Remove every issue from the store."""
+        with self._transaction() as db:
+            db.execute('DELETE FROM issues')
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,55 @@
+"""Tune the HTTP session used to talk to GitHub.
+
+requests is only imported once a session is configured, so importing the
+plugin stays cheap.
+
+:copyright: see LICENSE for details
+:license: MIT, see LICENSE for more details.
+"""
+
+# Default number of seconds to wait for a connection, and for a response
+GITHUB_CONNECT_TIMEOUT = 4
+GITHUB_READ_TIMEOUT = 10
+
+# Default number of times an idempotent request is retried after a connection error or server error
+GITHUB_RETRIES = 2
+
+# Server errors worth retrying.  Rate limits (403/429) are left to the rate limit scheduler.
+GITHUB_RETRY_STATUSES = (500, 502, 503, 504)
+
+
+def retry_policy(retries):
+    """Return a urllib3 Retry that only retries idempotent requests."""
+    from requests.packages.urllib3.util.retry import Retry
+
+    kwargs = dict(total=retries, connect=retries, read=retries, status=retries, backoff_factor=0.5,
+                  status_forcelist=GITHUB_RETRY_STATUSES, raise_on_status=False)
+    methods = frozenset(['GET', 'HEAD', 'OPTIONS'])
+    try:
+        return Retry(allowed_methods=methods, **kwargs)
+    except TypeError:  # urllib3 < 1.26
+        return Retry(method_whitelist=methods, **kwargs)
+
+
+def configure_session(session, pool_size=10, connect_timeout=GITHUB_CONNECT_TIMEOUT,
+                      read_timeout=GITHUB_READ_TIMEOUT, retries=GITHUB_RETRIES):
+    """Configure a requests session for many concurrent requests to GitHub.
+
+    Connections are pooled and kept alive, so concurrent requests don't repeat
+    TLS handshakes, and responses are requested compressed.
+    """
+    from requests.adapters import HTTPAdapter
+
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry_policy(retries))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive',
+    })
+
+    # github3.py sessions apply their own default timeouts to every request
+    if hasattr(session, 'default_connect_timeout'):
+        session.default_connect_timeout = connect_timeout
+        session.default_read_timeout = read_timeout
+    return session
@@ -101,6 +101,9 @@ setup(
         'pytest11': [
             'pytest-github = pytest_github.plugin'
         ],
+        'console_scripts': [
+            'pytest-github-proxy = pytest_github.proxy:main'
+        ],
     },
     # zip_safe=False,
     setup_requires=[
@@ -116,6 +119,9 @@ setup(
         'PyYAML',
         'github3.py',
     ],
+    extras_require={
+        'async': ['aiohttp; python_version >= "3.5"'],
+    },
     cmdclass={
         'test': ToxTestCommand,
         'clean': CleanCommand,
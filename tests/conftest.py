@@ -1,7 +1,17 @@
+import json
+import re
+import threading
+import time
+
 import pytest
 
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:  # python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
 
-pytest_plugins = 'pytester',
+pytest_plugins = 'pytester', 'pytest_github.fakeserver'
 
 
 @pytest.fixture()
@@ -22,29 +32,157 @@ def closed_issues(request):
     ]
 
 
+@pytest.fixture()
+def issue_src(open_issues, closed_issues):
+    '''Return the source of a test module with one test linked to open_issues, and one to closed_issues.'''
+    return """
+        import pytest
+        @pytest.mark.github(*%s)
+        def test_foo():
+            assert False
+
+        @pytest.mark.github(*%s)
+        def test_bar():
+            assert False
+    """ % (open_issues, closed_issues)
+
+
 @pytest.fixture(autouse=True)
 def no_requests(request, monkeypatch):
+    # Tests talking to the fake GitHub server send real requests
+    if 'github_server_args' in request.fixturenames:
+        return
     monkeypatch.delattr("requests.sessions.Session.request")
 
 
+@pytest.fixture()
+def github_server_args(github_server):
+    '''Return the options pointing the plugin at the fake GitHub server, allowing requests to reach it.'''
+    return ['--github-api-url', github_server.url, '--github-username', 'user', '--github-token', 'token']
+
+
 @pytest.fixture()
 def monkeypatch_github3(request, monkeypatch):
     monkeypatch.setattr('github3.login', lambda x, y: FakeGitHub(x, y))
 
 
+@pytest.fixture()
+def github_requests(request, monkeypatch):
+    '''Record the requests made against FakeGitHub.'''
+    requests = []
+    monkeypatch.setattr(FakeGitHub, 'requests', requests)
+    return requests
+
+
+@pytest.fixture()
+def issue_server(request):
+    '''Serve github issues over HTTP, using the same states as FakeIssue.'''
+
+    class IssueHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            server.paths.append(self.path)
+            time.sleep(server.delay)
+            (username, repository, _, number) = self.path.strip('/').split('/')[1:]
+            issue = FakeIssue(username, repository, number)
+            if self.headers.get('If-None-Match') == issue.etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = json.dumps(issue.to_json()).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', issue.etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), IssueHandler)
+    server.paths = []
+    server.delay = 0
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    request.addfinalizer(server.server_close)
+    request.addfinalizer(server.shutdown)
+    return server
+
+
 class FakeGitHub(object):
+    requests = []
+    updated = []
+
     def __init__(self, *args, **kwargs):
         self.username = args[0]
         self.password = args[1]
+        self.session = FakeSession(self)
+
+    def _build_url(self, *args):
+        return '/'.join(('https://api.github.com',) + args)
 
     def issue(self, username, repository, number):
+        self.requests.append(('GET', self._build_url('repos', username, repository, 'issues', str(number))))
         return FakeIssue(username, repository, number)
 
 
+class FakeSession(object):
+    def __init__(self, github):
+        self.github = github
+
+    def post(self, url, json=None, **kwargs):
+        self.github.requests.append(('POST', url))
+        data = {}
+        # Each repository is followed by the issues requested from it
+        fragments = re.split(r'(r\d+): repository\(owner: "([^"]+)", name: "([^"]+)"\)', json['query'])
+        for repo_alias, owner, name, body in zip(*[iter(fragments[1:])] * 4):
+            data[repo_alias] = {}
+            for issue_alias, number in re.findall(r'(i\d+): issueOrPullRequest\(number: (\d+)\)', body):
+                issue = FakeIssue(owner, name, number)
+                data[repo_alias][issue_alias] = {
+                    'state': issue.state.upper(),
+                    'title': issue.title,
+                    'url': issue.html_url,
+                    'labels': {'nodes': [{'name': label.name} for label in issue.labels]},
+                }
+        return FakeResponse(200, {'data': data})
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        self.github.requests.append(('GET', url))
+        if url.endswith('/issues'):
+            return self.listing(url, **params)
+        (username, repository, _, number) = url.split('/')[-4:]
+        issue = FakeIssue(username, repository, number)
+        if (headers or {}).get('If-None-Match') == issue.etag:
+            return FakeResponse(304, None)
+        return FakeResponse(200, issue.to_json(), headers={'ETag': issue.etag})
+
+    def listing(self, url, since=None, per_page=30, page=1, **kwargs):
+        (username, repository) = url.split('/')[-3:-1]
+        # Only the issues in FakeGitHub.updated changed since any previous listing
+        numbers = list(range(1, 1000) if since is None else self.github.updated)
+        numbers = numbers[(page - 1) * per_page:page * per_page]
+        return FakeResponse(200, [FakeIssue(username, repository, number).to_json() for number in numbers])
+
+
+class FakeResponse(object):
+    def __init__(self, status_code, data, headers=None):
+        self.status_code = status_code
+        self.data = data
+        self.headers = headers or {}
+
+    def json(self):
+        return self.data
+
+
 class FakeIssue(object):
     def __init__(self, *args, **kwargs):
         self.html_url = "https://github.com/{0}/{1}/issues/{2}".format(*args)
+        self.number = int(args[2])
         self.title = 'Mock issue title'
+        self.etag = '"%s"' % self.html_url
+        self.last_modified = None
 
     def is_closed(self):
         return 'closed' in self.html_url.lower() and True or False
@@ -60,6 +198,15 @@ class FakeIssue(object):
     def labels(self):
         return [FakeLabel()]
 
+    def to_json(self):
+        return {
+            'html_url': self.html_url,
+            'number': self.number,
+            'state': self.state,
+            'title': self.title,
+            'labels': [{'name': label.name} for label in self.labels],
+        }
+
 
 class FakeLabel(object):
     def __init__(self, *args, **kwargs):
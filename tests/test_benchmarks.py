@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import sys
+
+BENCHMARK = os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'bench_plugin.py')
+STARTUP_BENCHMARK = os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'bench_startup.py')
+
+
+def test_benchmark_smoke(testdir):
+    '''Verifies the benchmark suite runs every scenario on a small tree.'''
+    result = testdir.run(sys.executable, BENCHMARK, '--items', '60', '--issues', '6', '--json', 'results.json')
+    assert result.ret == 0
+    result.stdout.fnmatch_lines(['6? items referencing 6 github issues*', 'summary *s *'])
+
+    results = json.loads(testdir.tmpdir.join('results.json').read())
+    assert sorted(results['results']) == [
+        'collect', 'run', 'run-baseline', 'run-pipeline', 'run-static', 'summary', 'summary-static']
+
+    # Any real result is a regression against a baseline this small, however loaded the machine
+    for metrics in results['results'].values():
+        metrics.update(wall=1e-6, peak=1e-6)
+    testdir.tmpdir.join('baseline.json').write(json.dumps(results))
+    result = testdir.run(sys.executable, BENCHMARK, '--items', '60', '--issues', '6', '--scenarios', 'collect',
+                         '--compare', 'baseline.json')
+    assert result.ret == 1
+    result.stdout.fnmatch_lines(['REGRESSION collect wall: *', 'REGRESSION collect peak: *'])
+
+
+def test_startup_benchmark_smoke(testdir):
+    '''Verifies the startup benchmark runs, and that loading the plugin doesn't import its dependencies.'''
+    result = testdir.run(sys.executable, STARTUP_BENCHMARK, '--repeat', '1', '--json', 'results.json')
+    assert result.ret == 0
+    result.stdout.fnmatch_lines(['import *s  imported: -', 'run overhead *s'])
+
+    results = json.loads(testdir.tmpdir.join('results.json').read())
+    assert sorted(results['results']) == ['import', 'import-baseline', 'run', 'run-baseline']
+    for scenario in results['results'].values():
+        assert scenario['imported'] == []
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+
+import pytest
+from . import assert_outcome
+
+pytestmark = pytest.mark.usefixtures("monkeypatch_github3")
+
+
+def test_cache_reused_within_ttl(testdir, capsys, github_requests, issue_src, open_issues, closed_issues):
+    '''Verifies issues resolved by a previous run are reused without any requests.'''
+
+    testdir.makepyfile(issue_src)
+    for expected_requests in (len(open_issues + closed_issues), 0):
+        del github_requests[:]
+        result = testdir.inline_run('--github-cache-ttl', '3600')
+        assert_outcome(result, xfailed=1, failed=1)
+        assert len(github_requests) == expected_requests
+
+        stdout, stderr = capsys.readouterr()
+        assert 'collected %s github issues' % len(open_issues + closed_issues) in stdout
+
+
+def test_cache_reuses_listed_issues(testdir, github_requests):
+    '''Verifies issues resolved by listing their repository are cached like any other.'''
+
+    issues = ['https://github.com/pytest-github/open/issues/%s' % number for number in range(1, 31)]
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.github(*%s)
+        def test_foo():
+            assert False
+    """ % issues)
+    for expected_requests in (1, 0):
+        del github_requests[:]
+        result = testdir.inline_run('--github-cache-ttl', '3600')
+        assert_outcome(result, xfailed=1)
+        assert len(github_requests) == expected_requests
+
+
+@pytest.mark.parametrize('args', [
+    ('--github-cache-ttl', '0'),
+    ('--github-cache-ttl', '3600', '--github-cache-clear'),
+])
+def test_cache_disabled_or_cleared(testdir, github_requests, issue_src, open_issues, closed_issues, args):
+    '''Verifies issues are fetched again when the cache is disabled, or cleared.'''
+
+    testdir.makepyfile(issue_src)
+    testdir.inline_run('--github-cache-ttl', '3600')
+
+    del github_requests[:]
+    result = testdir.inline_run(*args)
+    assert_outcome(result, xfailed=1, failed=1)
+    assert len(github_requests) == len(open_issues + closed_issues)
+
+
+def test_cache_revalidates_stale_issues(testdir, capsys, github_requests, issue_src, open_issues, closed_issues):
+    '''Verifies expired issues are refreshed using conditional requests.'''
+
+    testdir.makepyfile(issue_src)
+    testdir.inline_run('--github-cache-ttl', '3600')
+    capsys.readouterr()
+
+    # Expire every cached issue, and change the validator of one
+    cache_file = testdir.tmpdir.join('.pytest_cache', 'v', 'github', 'issues')
+    records = json.loads(cache_file.read())
+    for record in records.values():
+        record['fetched_at'] = 0
+    records[open_issues[0]]['etag'] = '"outdated"'
+    cache_file.write(json.dumps(records))
+
+    del github_requests[:]
+    result = testdir.inline_run('--github-cache-ttl', '3600')
+    assert_outcome(result, xfailed=1, failed=1)
+    assert len(github_requests) == len(open_issues + closed_issues)
+
+    stdout, stderr = capsys.readouterr()
+    assert 'revalidated %s github issues (%s not modified, 1 modified)' % (
+        len(open_issues + closed_issues), len(open_issues + closed_issues) - 1) in stdout
+
+
+@pytest.mark.parametrize('updated', [[], [1]])
+def test_cache_sync_lists_updated_issues(testdir, capsys, monkeypatch, github_requests, issue_src,
+                                         open_issues, closed_issues, updated):
+    '''Verifies expired issues are refreshed with one listing of updated issues per repository.'''
+
+    testdir.makepyfile(issue_src)
+    testdir.inline_run('--github-cache-ttl', '3600')
+    capsys.readouterr()
+
+    # Expire every cached issue, and change the title of one
+    cache_file = testdir.tmpdir.join('.pytest_cache', 'v', 'github', 'issues')
+    records = json.loads(cache_file.read())
+    for record in records.values():
+        record['fetched_at'] = time.time() - 7200
+    records[open_issues[0]]['title'] = 'Outdated title'
+    cache_file.write(json.dumps(records))
+
+    from .conftest import FakeGitHub
+    monkeypatch.setattr(FakeGitHub, 'updated', updated)
+    del github_requests[:]
+    result = testdir.inline_run('--github-cache-ttl', '3600', '--github-cache-sync')
+    assert_outcome(result, xfailed=1, failed=1)
+    assert sorted(url for method, url in github_requests) == [
+        'https://api.github.com/repos/pytest-github/closed/issues',
+        'https://api.github.com/repos/pytest-github/open/issues',
+    ]
+
+    stdout, stderr = capsys.readouterr()
+    assert 'synced 2 github repositories (%s issues updated)' % len(updated) in stdout
+
+    records = json.loads(cache_file.read())
+    assert all(time.time() - record['fetched_at'] < 60 for record in records.values())
+    assert (records[open_issues[0]]['title'] == 'Outdated title') == (not updated)
@@ -1,6 +1,8 @@
 import pytest
 from _pytest.main import EXIT_OK
 
+from . import assert_outcome
+
 pytestmark = pytest.mark.usefixtures("monkeypatch_github3")
 
 
@@ -110,3 +112,80 @@ def test_collection_reporter_duplicate_issues(testdir, capsys, closed_issues, op
 
     stdout, stderr = capsys.readouterr()
     assert 'collected %s github issues' % (len(closed_issues) + len(open_issues)) in stdout
+
+
+def test_collection_only_fetches_selected_issues(testdir, capsys, github_requests, closed_issues, open_issues):
+    '''verifies issues are only fetched for tests that remain after deselection'''
+
+    src = """
+        import pytest
+        @pytest.mark.github('%s')
+        def test_foo():
+            assert True
+
+        @pytest.mark.github('%s')
+        def test_bar():
+            assert True
+    """ % (closed_issues[0], open_issues[0])
+    result = testdir.inline_runsource(src, *['-k', 'test_foo'])
+    assert result.ret == EXIT_OK
+
+    stdout, stderr = capsys.readouterr()
+    assert 'collected 1 github issues' in stdout
+    assert [url.split('/')[-1] for method, url in github_requests] == [closed_issues[0].split('/')[-1]]
+
+
+def test_collection_collectonly_skips_requests(testdir, capsys, github_requests, closed_issues, open_issues):
+    '''verifies --collect-only reports github issues without fetching them'''
+
+    src = """
+        import pytest
+        @pytest.mark.github(*%s)
+        def test_foo():
+            assert True
+    """ % (closed_issues + open_issues)
+    result = testdir.inline_runsource(src, *['--collectonly'])
+    assert result.ret == EXIT_OK
+
+    stdout, stderr = capsys.readouterr()
+    assert 'collected %s github issues' % len(closed_issues + open_issues) in stdout
+    assert github_requests == []
+
+
+def test_collection_shares_decisions(testdir, closed_issues, open_issues):
+    '''verifies items linked to the same issues, with the same marker arguments, share one decision'''
+
+    src = """
+        import pytest
+        @pytest.mark.github('%s')
+        @pytest.mark.parametrize('value', range(3))
+        def test_open(value):
+            assert False
+
+        @pytest.mark.github('%s', skip=True)
+        @pytest.mark.parametrize('value', range(2))
+        def test_open_skip(value):
+            assert False
+
+        @pytest.mark.github('%s', ids=['1'])
+        @pytest.mark.parametrize('value', range(2), ids=['0', '1'])
+        def test_closed(value):
+            assert value == 0
+
+        def test_unlinked():
+            pass
+    """ % (open_issues[0], open_issues[0], closed_issues[0])
+    result = testdir.inline_runsource(src)
+    assert_outcome(result, passed=2, failed=1, skipped=2, xfailed=3)
+
+    (items,) = [call.items for call in result.getcalls('pytest_collection_modifyitems')]
+    decisions = dict((item.name, item._github_decision) for item in items)
+    assert decisions['test_open[0]'] is decisions['test_open[1]'] is decisions['test_open[2]']
+    assert decisions['test_open_skip[0]'] is decisions['test_open_skip[1]']
+    assert decisions['test_open[0]'] is not decisions['test_open_skip[0]']
+    assert decisions['test_open[0]'].xfail_marker is not None
+    assert decisions['test_open_skip[0]'].skip_reason.startswith('Skipping due to unresolved github issues')
+    assert decisions['test_closed[0]'].issue_urls == ()
+    assert decisions['test_closed[1]'].issue_urls == (closed_issues[0],)
+    assert decisions['test_closed[1]'].skip_reason is decisions['test_closed[1]'].xfail_marker is None
+    assert decisions['test_closed[0]'] is decisions['test_unlinked']
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+import pytest
+from _pytest.main import EXIT_OK
+from . import assert_outcome
+
+pytestmark = pytest.mark.usefixtures("monkeypatch_github3")
+
+
+def test_graphql_engine_batches_issues(testdir, capsys, github_requests, open_issues, closed_issues):
+    '''Verifies issues across repositories are resolved with one GraphQL query per batch.'''
+
+    src = """
+        import pytest
+        @pytest.mark.github(*%s)
+        def test_foo():
+            assert False
+
+        @pytest.mark.github(*%s)
+        def test_bar():
+            assert False
+    """ % (open_issues, closed_issues)
+    result = testdir.inline_runsource(src, *['--github-engine', 'graphql', '--github-batch-size', '4'])
+    assert result.ret != EXIT_OK
+    assert_outcome(result, xfailed=1, failed=1)
+
+    stdout, stderr = capsys.readouterr()
+    assert 'collected %s github issues' % len(open_issues + closed_issues) in stdout
+    assert [method for method, url in github_requests] == ['POST', 'POST']
+    assert set(url for method, url in github_requests) == set(['https://api.github.com/graphql'])
+
+
+def test_rest_engine_requests_each_issue(testdir, github_requests, open_issues):
+    '''Verifies the default engine requests each distinct issue once.'''
+
+    src = """
+        import pytest
+        @pytest.mark.github(*%s)
+        def test_foo():
+            assert False
+
+        @pytest.mark.github(*%s)
+        def test_bar():
+            assert False
+    """ % (open_issues, open_issues)
+    result = testdir.inline_runsource(src)
+    assert result.ret == EXIT_OK
+    assert_outcome(result, xfailed=2)
+    assert len(github_requests) == len(open_issues)
+
+
+@pytest.mark.parametrize('workers', ['1', '4'])
+def test_rest_engine_workers(testdir, capsys, github_requests, open_issues, closed_issues, workers):
+    '''Verifies concurrent issue lookups give the same results as serial lookups.'''
+
+    src = """
+        import pytest
+        @pytest.mark.github(*%s)
+        def test_foo():
+            assert False
+
+        @pytest.mark.github(*%s)
+        def test_bar():
+            assert False
+    """ % (open_issues, closed_issues)
+    result = testdir.inline_runsource(src, *['--github-workers', workers])
+    assert_outcome(result, xfailed=1, failed=1)
+
+    stdout, stderr = capsys.readouterr()
+    assert 'collected %s github issues' % len(open_issues + closed_issues) in stdout
+    assert sorted(url for method, url in github_requests) == sorted(
+        url.replace('https://github.com/', 'https://api.github.com/repos/') for url in open_issues + closed_issues)
+
+
+def test_async_engine(testdir, capsys, monkeypatch, issue_server, open_issues, closed_issues):
+    '''Verifies the asyncio engine resolves every issue over HTTP.'''
+    pytest.importorskip('aiohttp')
+    from .conftest import FakeGitHub
+
+    base_url = 'http://127.0.0.1:%s' % issue_server.server_address[1]
+    monkeypatch.setattr(FakeGitHub, '_build_url', lambda self, *args: '/'.join((base_url,) + args))
+
+    src = """
+        import pytest
+        @pytest.mark.github(*%s)
+        def test_foo():
+            assert False
+
+        @pytest.mark.github(*%s)
+        def test_bar():
+            assert False
+    """ % (open_issues, closed_issues)
+    result = testdir.inline_runsource(src, *['--github-engine', 'async', '--github-workers', '4'])
+    assert_outcome(result, xfailed=1, failed=1)
+
+    stdout, stderr = capsys.readouterr()
+    assert 'collected %s github issues' % len(open_issues + closed_issues) in stdout
+    assert len(issue_server.paths) == len(open_issues + closed_issues)
+
+
+@pytest.mark.parametrize('threshold,expected', [('20', 1), ('0', 30)])
+def test_rest_engine_lists_busy_repositories(testdir, github_requests, threshold, expected):
+    '''Verifies repositories referenced by many issues are listed in bulk.'''
+
+    issues = ['https://github.com/pytest-github/open/issues/%s' % number for number in range(1, 31)]
+    src = """
+        import pytest
+        @pytest.mark.github(*%s)
+        def test_foo():
+            assert False
+    """ % issues
+    result = testdir.inline_runsource(src, *['--github-bulk-threshold', threshold])
+    assert result.ret == EXIT_OK
+    assert_outcome(result, xfailed=1)
+    assert len(github_requests) == expected
+
+
+def test_rest_engine_skips_sparse_repositories(testdir, github_requests):
+    '''Verifies issues spread over many pages are still requested individually.'''
+
+    issues = ['https://github.com/pytest-github/open/issues/%s' % number for number in range(100, 1000, 200)]
+    src = """
+        import pytest
+        @pytest.mark.github(*%s)
+        def test_foo():
+            assert False
+    """ % issues
+    result = testdir.inline_runsource(src, *['--github-bulk-threshold', '2'])
+    assert result.ret == EXIT_OK
+    assert len(github_requests) == len(issues)
+    assert all(url.split('/')[-1].isdigit() for method, url in github_requests)
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from . import assert_outcome
+
+
+def add_closed_issues(github_server, closed_issues):
+    '''Add closed_issues to the fake server, which answers requests for any other issue with an open one.'''
+    for url in closed_issues:
+        github_server.add_issue(url, state='closed')
+
+
+@pytest.mark.parametrize('engine', ['rest', 'graphql'])
+def test_fakeserver_resolves_issues(testdir, github_server, github_server_args, issue_src, open_issues, closed_issues,
+                                    engine):
+    '''Verifies issues are resolved over HTTP by each engine.'''
+    add_closed_issues(github_server, closed_issues)
+    result = testdir.inline_runsource(issue_src, *github_server_args + ['--github-engine', engine])
+    assert_outcome(result, xfailed=1, failed=1)
+    if engine == 'rest':
+        assert github_server.count('/repos/') == len(open_issues + closed_issues)
+    else:
+        assert github_server.count('/graphql', method='POST') == 1
+
+
+def test_fakeserver_revalidates_with_etags(testdir, github_server, github_server_args, issue_src, open_issues,
+                                           closed_issues):
+    '''Verifies unchanged expired issues are answered with 304 Not Modified.'''
+    add_closed_issues(github_server, closed_issues)
+    testdir.makepyfile(issue_src)
+    testdir.inline_run(*github_server_args + ['--github-cache-ttl', '3600'])
+
+    # Expire every cached issue, and close one
+    cache = testdir.tmpdir.join('.pytest_cache', 'v', 'github', 'issues')
+    cache.write(cache.read().replace('"fetched_at": ', '"fetched_at": -'))
+    github_server.update_issue(open_issues[0], state='closed')
+
+    result = testdir.runpytest(*github_server_args + ['--github-cache-ttl', '3600'])
+    result.stdout.fnmatch_lines(['revalidated 6 github issues (5 not modified, 1 modified)'])
+    result.assert_outcomes(failed=1, xfailed=1)
+
+
+def test_fakeserver_paginates_listings(testdir, github_server, github_server_args):
+    '''Verifies heavily referenced repositories are listed one page at a time.'''
+    issues = ['https://github.com/pytest-github/busy/issues/%s' % number for number in range(1, 251)]
+    for url in issues:
+        github_server.add_issue(url, state='closed')
+    src = """
+        import pytest
+        @pytest.mark.github(*%s)
+        def test_foo():
+            assert False
+    """ % issues
+    result = testdir.inline_runsource(src, *github_server_args)
+    assert_outcome(result, failed=1)
+    assert github_server.count(r'/issues\?') == 3
+    assert github_server.count(r'/issues/\d+') == 0
+
+
+def test_fakeserver_retries_rate_limited_listings(testdir, github_server, github_server_args):
+    '''Verifies a listing page hitting a secondary rate limit is requested again once it expires.'''
+    issues = ['https://github.com/pytest-github/busy/issues/%s' % number for number in range(1, 31)]
+    for url in issues:
+        github_server.add_issue(url, state='closed')
+    github_server.fail('/busy/issues$', status=403, times=1, headers={'Retry-After': '0'})
+    src = """
+        import pytest
+        @pytest.mark.github(*%s)
+        def test_foo():
+            assert False
+    """ % issues
+    result = testdir.inline_runsource(src, *github_server_args)
+    assert_outcome(result, failed=1)
+    assert github_server.count(r'/issues\?') == 2
+    assert github_server.count(r'/issues/\d+') == 0
+
+
+def test_fakeserver_rate_limit(testdir, github_server, github_server_args, issue_src, open_issues, closed_issues):
+    '''Verifies no requests are sent when the remaining rate limit would take too long to spread.'''
+    testdir.makepyfile(issue_src)
+    github_server.rate_limits['core'].remaining = 2
+    result = testdir.runpytest(*github_server_args + ['--github-max-wait', '0'])
+    result.stdout.fnmatch_lines(['*Unable to inspect %s github issues - GitHub rate limit exceeded until *' % len(
+        open_issues + closed_issues)])
+    assert github_server.count('/repos/') == 0
+    assert github_server.count('/rate_limit') == 1
+
+
+def test_fakeserver_async_rate_limit(testdir, github_server, github_server_args, issue_src, open_issues, closed_issues):
+    '''Verifies the asyncio engine is paced by the rate limit, and reports the issues it can't fetch once.'''
+    pytest.importorskip('aiohttp')
+    testdir.makepyfile(issue_src)
+    # Enough for every issue, but spread over longer than --github-max-wait
+    github_server.rate_limits['core'].remaining = len(open_issues + closed_issues)
+    result = testdir.runpytest(*github_server_args + ['--github-engine', 'async', '--github-max-wait', '0'])
+    result.stdout.fnmatch_lines(['*Unable to inspect %s github issues - GitHub rate limit exceeded until *' % len(
+        open_issues + closed_issues)])
+    assert 'Unable to inspect github issue' not in result.stdout.str()
+    assert github_server.count('/repos/') == 0
+
+
+def test_fakeserver_async_retries(testdir, github_server, github_server_args, issue_src, closed_issues):
+    '''Verifies the asyncio engine sends requests hitting a secondary rate limit again once it expires.'''
+    pytest.importorskip('aiohttp')
+    add_closed_issues(github_server, closed_issues)
+    github_server.fail('/issues/1$', status=403, times=1, headers={'Retry-After': '0'})
+    result = testdir.inline_runsource(issue_src, *github_server_args + ['--github-engine', 'async'])
+    assert_outcome(result, xfailed=1, failed=1)
+    assert github_server.count('/issues/1$') == 2
+
+
+def test_fakeserver_injected_errors(testdir, github_server, github_server_args, issue_src, open_issues):
+    '''Verifies server errors are retried, and reported once retries run out.'''
+    testdir.makepyfile(issue_src)
+    github_server.fail('/issues/1$', status=502, times=1)
+    github_server.fail('/issues/2$', status=500, times=None)
+    result = testdir.runpytest(*github_server_args + ['--github-retries', '1'])
+    result.stdout.fnmatch_lines(['*Unable to inspect github issue %s - 500 Injected failure*' % open_issues[1]])
+    assert github_server.count('/issues/1$') == 2
+    assert github_server.count('/issues/2$') == 2
+
+
+def test_fakeserver_retries_graphql_batches(testdir, github_server, github_server_args, issue_src, closed_issues):
+    '''Verifies a rate limited GraphQL batch is sent again over the same kept alive connection.'''
+    add_closed_issues(github_server, closed_issues)
+    github_server.fail('/graphql', status=403, times=1, headers={'Retry-After': '0'}, method='POST')
+    result = testdir.inline_runsource(issue_src, *github_server_args + ['--github-engine', 'graphql'])
+    assert_outcome(result, xfailed=1, failed=1)
+    assert github_server.count('/graphql', method='POST') == 2
+
+
+def test_fakeserver_latency(testdir, github_server, github_server_args, issue_src, closed_issues):
+    '''Verifies concurrent lookups are in flight together.'''
+    add_closed_issues(github_server, closed_issues)
+    github_server.latency = 0.2
+    result = testdir.inline_runsource(issue_src, *github_server_args + ['--github-workers', '6'])
+    assert_outcome(result, xfailed=1, failed=1)
+    assert github_server.max_in_flight > 1
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+from . import assert_outcome
+
+
+def test_resolve_issues_hook(testdir, github_server, github_server_args, issue_src, open_issues, closed_issues):
+    '''Verifies issues resolved by pytest_github_resolve_issues aren't requested from GitHub.'''
+    testdir.makeconftest("""
+        def pytest_github_resolve_issues(config, urls):
+            return dict((url, {'html_url': url, 'state': 'closed', 'title': 'Mirrored', 'labels': []})
+                        for url in urls if 'closed' in url)
+    """)
+    result = testdir.inline_runsource(issue_src, *github_server_args)
+    assert_outcome(result, xfailed=1, failed=1)
+    assert github_server.count('/repos/pytest-github/closed/') == 0
+    assert github_server.count('/repos/pytest-github/open/') == len(open_issues)
+
+
+@pytest.mark.parametrize('args', [[], ['--github-static']])
+def test_resolve_issues_hook_metrics(testdir, github_server_args, open_issues, closed_issues, args):
+    '''Verifies issues resolved by pytest_github_resolve_issues are counted as cached once.'''
+    testdir.makeconftest("""
+        def pytest_github_resolve_issues(config, urls):
+            return dict((url, {'html_url': url, 'state': 'closed', 'title': 'Mirrored', 'labels': []})
+                        for url in urls if 'closed' in url)
+    """)
+    # Literal URLs, so --github-static resolves them before collection
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.github('%s', '%s')
+        def test_foo():
+            assert False
+    """ % (open_issues[0], closed_issues[0]))
+    result = testdir.runpytest(*github_server_args + args)
+    result.stdout.fnmatch_lines(['issues: 2 (1 cached, 1 fetched)'])
+
+
+@pytest.mark.parametrize('engine', ['rest', 'graphql'])
+def test_fetch_hooks(testdir, github_server, github_server_args, issue_src, open_issues, closed_issues, engine):
+    '''Verifies pytest_github_issue_fetched and pytest_github_fetch_failed are called for each issue.'''
+    testdir.makeconftest("""
+        import json
+
+        def log(event):
+            with open('hooks.log', 'a') as fd:
+                fd.write(json.dumps(event) + '\\n')
+
+        def pytest_github_issue_fetched(config, url, record, elapsed):
+            log(['fetched', url, record['state'], elapsed >= 0])
+
+        def pytest_github_fetch_failed(config, url, exc):
+            log(['failed', url, type(exc).__name__])
+    """)
+    github_server.autocreate = False
+    for url in open_issues[1:]:
+        github_server.add_issue(url)
+    for url in closed_issues:
+        github_server.add_issue(url, state='closed')
+
+    testdir.makepyfile(issue_src)
+    testdir.runpytest(*github_server_args + ['--github-engine', engine])
+    events = [json.loads(line) for line in testdir.tmpdir.join('hooks.log').readlines()]
+    failure = 'NotFoundError' if engine == 'rest' else 'IssueUnavailable'
+    assert sorted(events) == sorted(
+        [['failed', open_issues[0], failure]] +
+        [['fetched', url, 'open', True] for url in open_issues[1:]] +
+        [['fetched', url, 'closed', True] for url in closed_issues])
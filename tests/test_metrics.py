@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from pytest_github.metrics import Metrics, percentile
+
+
+@pytest.mark.parametrize('percent,expected', [(0, 1), (50, 5), (95, 10), (100, 10)])
+def test_percentile(percent, expected):
+    assert percentile(list(range(10, 0, -1)), percent) == expected
+
+
+def test_metrics_without_requests():
+    metrics = Metrics()
+    data = metrics.to_dict()
+    assert data['requests'] == 0
+    assert data['latency'] == {'total': 0, 'p50': None, 'p95': None, 'max': None}
+    assert 'latency' not in ' '.join(metrics.lines())
+
+
+def test_metrics_merge():
+    worker = Metrics()
+    worker.issues = worker.cache_misses = 2
+    worker.record(0.5, 1024)
+    controller = Metrics()
+    controller.merge(worker.to_state({'core': 10, 'graphql': None}, 1.0))
+    controller.merge(worker.to_state({'core': 5}, 2.0))
+    data = controller.to_dict({'core': 20})
+    assert (data['issues'], data['cache_misses'], data['requests'], data['bytes_received']) == (2, 4, 2, 2048)
+    assert data['latency']['total'] == 1.0
+    assert data['rate_limit_remaining'] == {'core': 5, 'graphql': None}
+    assert data['rate_limit_wait'] == 3.0
+
+
+def test_metrics_json(testdir, github_server, github_server_args, open_issues, closed_issues):
+    '''Verifies requests, cache hits and misses are written to --github-metrics-json.'''
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.github(*%s)
+        def test_foo():
+            assert False
+
+        @pytest.mark.github(*%s)
+        def test_bar():
+            assert False
+    """ % (open_issues, closed_issues))
+    issues = len(open_issues + closed_issues)
+
+    result = testdir.runpytest(*github_server_args + ['--github-cache-ttl', '3600',
+                                                      '--github-metrics-json', 'metrics.json'])
+    result.stdout.fnmatch_lines([
+        '*github metrics*',
+        'issues: %s (0 cached, %s fetched)' % (issues, issues),
+        'requests: %s (*KiB received)' % (issues + 1),
+        'latency: total *s, p50 *s, p95 *s, max *s',
+        'rate limit remaining: core %s' % (5000 - issues),
+        'blocked collection: *s (0.000s waiting on rate limits)',
+    ])
+    metrics = json.loads(testdir.tmpdir.join('metrics.json').read())
+    assert metrics['issues'] == issues
+    assert metrics['cache_misses'] == issues
+    assert metrics['requests'] == issues + 1  # and /rate_limit
+    assert metrics['bytes_received'] > 0
+    assert 0 < metrics['latency']['p50'] <= metrics['latency']['p95'] <= metrics['latency']['max']
+    assert metrics['blocking'] > 0
+
+    # Every issue is cached by the second run
+    testdir.runpytest(*github_server_args + ['--github-cache-ttl', '3600', '--github-metrics-json', 'metrics.json'])
+    metrics = json.loads(testdir.tmpdir.join('metrics.json').read())
+    assert (metrics['cache_hits'], metrics['cache_misses'], metrics['requests']) == (issues, 0, 0)
+
+
+def test_metrics_without_issues(testdir):
+    '''Verifies the metrics section is only shown when github issues are referenced.'''
+    testdir.makepyfile("""
+        def test_foo():
+            pass
+    """)
+    result = testdir.runpytest()
+    assert 'github metrics' not in result.stdout.str()
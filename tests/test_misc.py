@@ -10,3 +10,95 @@ def test_version():
     import pytest_github
     assert hasattr(pytest_github, '__version__')
     assert isinstance(pytest_github.__version__, str)
+
+
+@pytest.mark.parametrize('state,labels,completed_labels,is_resolved', [
+    ('open', [], [], False),
+    ('closed', [], [], True),
+    ('open', ['bug'], ['done'], False),
+    ('open', ['bug', 'done'], ['done'], True),
+])
+def test_issue_wrapper(state, labels, completed_labels, is_resolved):
+    '''Verifies issue records precompute whether they are resolved, and survive pickling.'''
+    import pickle
+    from pytest_github.plugin import IssueWrapper
+
+    issue = IssueWrapper('https://github.com/some/repo/issues/1', state, 'title', labels, completed_labels)
+    assert issue.is_resolved is is_resolved
+    assert issue.is_closed is (state == 'closed')
+    assert not hasattr(issue, '__dict__')
+
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        copy = pickle.loads(pickle.dumps(issue, protocol))
+        assert copy.to_dict() == issue.to_dict()
+        assert copy.is_resolved is is_resolved
+
+
+def test_issue_wrapper_shares_label_names():
+    '''Verifies label names are shared between issue records.'''
+    from pytest_github.plugin import IssueWrapper
+
+    first = IssueWrapper('https://github.com/some/repo/issues/1', 'open', 'title', [''.join(['b', 'ug'])])
+    second = IssueWrapper('https://github.com/some/repo/issues/2', 'open', 'title', [''.join(['b', 'ug'])])
+    assert first.labels[0] is second.labels[0]
+
+
+def test_generic_path_cache(testdir):
+    '''Verifies cached generic paths match paths built from the full node chain.'''
+    from pytest_github.plugin import generic_path
+
+    def chain_path(item):
+        chain = item.listchain()
+        gpath = [chain[0].name]
+        fspath = chain[0].fspath
+        fspart = False
+        for node in chain[1:]:
+            if node.fspath == fspath:
+                gpath.append(":" if fspart else ".")
+                fspart = False
+            else:
+                gpath.append("/")
+                fspart = True
+            if node.name[0] in "([":
+                gpath.pop()
+            gpath.append(node.name)
+            fspath = node.fspath
+        return "".join(gpath)
+
+    testdir.mkpydir('pkg').join('test_nested.py').write("""
+import pytest
+
+class TestClass(object):
+    @pytest.mark.parametrize('value', [1, 2])
+    def test_method(self, value):
+        pass
+
+    class TestInner(object):
+        def test_inner(self):
+            pass
+
+def test_function():
+    pass
+""")
+    items = testdir.getitems("""
+        def test_top():
+            pass
+    """)
+    items += testdir.inline_genitems('pkg')[0]
+    cache = {}
+    paths = [generic_path(item, cache) for item in items]
+    assert paths == [chain_path(item) for item in items]
+    assert len(set(paths)) == 5
+
+
+def test_issue_sort_key():
+    '''Verifies issues are sorted by owner, repository and number.'''
+    from pytest_github.plugin import issue_sort_key
+
+    urls = [
+        'https://github.com/b/repo/issues/2',
+        'https://github.com/a/repo/issues/10',
+        'https://github.com/a/repo/pull/9',
+        'https://github.com/a/other/issues/30',
+    ]
+    assert sorted(urls, key=issue_sort_key) == [urls[3], urls[2], urls[1], urls[0]]
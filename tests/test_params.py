@@ -9,9 +9,10 @@ except ImportError:
     import mock
 
 from _pytest.main import (
-    EXIT_NOTESTSCOLLECTED,
+    EXIT_OK,
     EXIT_USAGEERROR,
 )
+from pytest_github.plugin import load_github_cfg
 from . import assert_outcome
 
 
@@ -66,31 +67,64 @@ def test_param_requires_value(testdir, required_value_parameter):
     ])
 
 
-def test_param_default_cfg(testdir):
+@pytest.mark.usefixtures('monkeypatch_github3')
+def test_param_default_cfg(testdir, closed_issues):
     '''verifies pytest-github loads configuration from the default configuration file'''
 
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.github('%s')
+        def test_foo():
+            pass
+    """ % closed_issues[0])
     with mock.patch('os.path.isfile', return_value=True):
         with mock.patch('pytest_github.plugin.open', mock.mock_open(read_data=''), create=True) as mock_open:
             result = testdir.runpytest()
 
     # Assert py.test exit code
-    assert result.ret == EXIT_NOTESTSCOLLECTED
+    assert result.ret == EXIT_OK
 
     # Assert mock open called on provided file
     mock_open.assert_called_once_with('github.yml', 'r')
 
 
-def test_param_missing_cfg(testdir):
+@pytest.mark.usefixtures('monkeypatch_github3')
+def test_param_missing_cfg(testdir, closed_issues):
     '''Verifies pytest-github handles when no github.yml is present.'''
 
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.github('%s')
+        def test_foo():
+            pass
+    """ % closed_issues[0])
     with mock.patch('os.path.isfile', return_value=False) as mock_isfile:
         result = testdir.runpytest()
 
     # Assert py.test exit code
-    assert result.ret == EXIT_NOTESTSCOLLECTED
+    assert result.ret == EXIT_OK
 
-    # Assert mock open called on provided file
-    mock_isfile.assert_called_once_with('github.yml')
+    # Assert mock isfile called on the default file, amongst files checked by pytest
+    assert mock_isfile.call_args_list.count(mock.call('github.yml')) == 1
+
+
+def test_param_cfg_not_loaded_without_issues(testdir):
+    '''Verifies pytest-github leaves its configuration file alone when no github issues are collected.'''
+
+    testdir.makepyfile("""
+        def test_foo():
+            pass
+    """)
+    with mock.patch('os.path.isfile', return_value=True) as mock_isfile:
+        with mock.patch('pytest_github.plugin.open', mock.mock_open(read_data=''), create=True) as mock_open:
+            result = testdir.runpytest()
+
+    # Assert py.test exit code
+    assert result.ret == EXIT_OK
+
+    # Assert the configuration file was neither checked nor opened
+    assert mock.call('github.yml') not in mock_isfile.call_args_list
+    assert not mock_open.called
 
 
 def test_param_empty_cfg(testdir, recwarn):
@@ -101,11 +135,7 @@ def test_param_empty_cfg(testdir, recwarn):
 
     with mock.patch('os.path.isfile', return_value=True) as mock_isfile:
         with mock.patch('pytest_github.plugin.open', mock.mock_open(read_data=content), create=True) as mock_open:
-            with mock.patch('pytest_github.plugin.GitHubPytestPlugin') as mock_plugin:
-                result = testdir.runpytest()
-
-    # Assert py.test exit code
-    assert result.ret == EXIT_NOTESTSCOLLECTED
+            settings = load_github_cfg(testdir.parseconfigure())
 
     # Assert mock isfile called
     mock_isfile.assert_called_once_with('github.yml')
@@ -113,8 +143,8 @@ def test_param_empty_cfg(testdir, recwarn):
     # Assert mock open called on provided file
     mock_open.assert_called_once_with('github.yml', 'r')
 
-    # Assert plugin initialized as expected
-    mock_plugin.assert_called_once_with(None, None, completed_labels=[])
+    # Assert settings loaded as expected
+    assert settings == (None, None, [])
 
     # check that only one warning was raised
     assert len(recwarn) > 0
@@ -146,11 +176,7 @@ def test_param_broken_cfg(testdir, content):
 
     with mock.patch('os.path.isfile', return_value=True) as mock_isfile:
         with mock.patch('pytest_github.plugin.open', mock.mock_open(read_data=content), create=True) as mock_open:
-            with mock.patch('pytest_github.plugin.GitHubPytestPlugin') as mock_plugin:
-                result = testdir.runpytest()
-
-    # Assert py.test exit code
-    assert result.ret == EXIT_NOTESTSCOLLECTED
+            settings = load_github_cfg(testdir.parseconfigure())
 
     # Assert mock isfile called
     mock_isfile.assert_called_once_with('github.yml')
@@ -158,8 +184,8 @@ def test_param_broken_cfg(testdir, content):
     # Assert mock open called on provided file
     mock_open.assert_called_once_with('github.yml', 'r')
 
-    # Assert plugin initialized as expected
-    mock_plugin.assert_called_once_with(None, None, completed_labels=[])
+    # Assert settings loaded as expected
+    assert settings == (None, None, [])
 
 
 @pytest.mark.parametrize(
@@ -186,11 +212,7 @@ def test_param_custom_cfg(testdir, username, token, completed_labels):
 
     with mock.patch('os.path.isfile', return_value=True) as mock_isfile:
         with mock.patch('pytest_github.plugin.open', mock.mock_open(read_data=content), create=True) as mock_open:
-            with mock.patch('pytest_github.plugin.GitHubPytestPlugin') as mock_plugin:
-                result = testdir.runpytest(*['--github-cfg', str(cfg_file)])
-
-    # Assert py.test exit code
-    assert result.ret == EXIT_NOTESTSCOLLECTED
+            settings = load_github_cfg(testdir.parseconfigure(*['--github-cfg', str(cfg_file)]))
 
     # Assert mock isfile called
     mock_isfile.assert_called_once_with(str(cfg_file))
@@ -198,8 +220,8 @@ def test_param_custom_cfg(testdir, username, token, completed_labels):
     # Assert mock open called on provided file
     mock_open.assert_called_once_with(str(cfg_file), 'r')
 
-    # Assert plugin initialized as expected
-    mock_plugin.assert_called_once_with(username, token, completed_labels=completed_labels)
+    # Assert settings loaded as expected
+    assert settings == (username, token, completed_labels)
 
 
 def test_param_override_cfg(testdir):
@@ -219,21 +241,17 @@ def test_param_override_cfg(testdir):
 
     with mock.patch('os.path.isfile', return_value=True) as mock_isfile:
         with mock.patch('pytest_github.plugin.open', mock.mock_open(read_data=content), create=True) as mock_open:
-            with mock.patch('pytest_github.plugin.GitHubPytestPlugin') as mock_plugin:
-                # Build argument string
-                args = [
-                    '--github-username', expected_username,
-                    '--github-token', expected_token,
-                ]
-                for c in expected_completed:
-                    args.append('--github-completed')
-                    args.append(c)
-
-                # Run pytest
-                result = testdir.runpytest(*args)
-
-    # Assert py.test exit code
-    assert result.ret == EXIT_NOTESTSCOLLECTED
+            # Build argument string
+            args = [
+                '--github-username', expected_username,
+                '--github-token', expected_token,
+            ]
+            for c in expected_completed:
+                args.append('--github-completed')
+                args.append(c)
+
+            # Load settings
+            settings = load_github_cfg(testdir.parseconfigure(*args))
 
     # Assert mock isfile called
     mock_isfile.assert_called_once_with('github.yml')
@@ -241,11 +259,8 @@ def test_param_override_cfg(testdir):
     # Assert mock open called on provided file
     mock_open.assert_called_once_with('github.yml', 'r')
 
-    # Assert plugin initialized as expected
-    mock_plugin.assert_called_once_with(
-        expected_username,
-        expected_token,
-        completed_labels=expected_completed)
+    # Assert settings loaded as expected
+    assert settings == (expected_username, expected_token, expected_completed)
 
 
 def test_param_github_summary_no_issues(testdir, capsys, closed_issues, open_issues):
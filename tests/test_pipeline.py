@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+
+import pytest
+
+from pytest_github.pipeline import FetchPipeline
+
+
+def blocked_pipeline():
+    '''Return a pipeline with one worker blocked resolving 'a', the event unblocking it, and the resolved urls.'''
+    (gate, started, resolved) = (threading.Event(), threading.Event(), [])
+
+    def resolve(url, parsed_url):
+        if url == 'a':
+            started.set()
+            gate.wait()
+        resolved.append(url)
+
+    pipeline = FetchPipeline(resolve, workers=1)
+    pipeline.submit('a', None, 0)
+    started.wait()
+    return (pipeline, gate, resolved)
+
+
+def test_pipeline_priorities():
+    '''Verifies queued issues are resolved in order of priority, and those missing from prioritize() cancelled.'''
+    (pipeline, gate, resolved) = blocked_pipeline()
+    futures = dict((url, pipeline.submit(url, None, priority)) for (url, priority) in [('b', 1), ('c', 2), ('d', 3)])
+
+    # Resubmitting with a lower priority moves an issue up the queue, but a higher one doesn't
+    pipeline.submit('c', None, 0)
+    pipeline.submit('b', None, 5)
+    pipeline.prioritize({'b': 1, 'c': 0})
+
+    gate.set()
+    for url in 'bc':
+        futures[url].wait()
+    assert resolved == ['a', 'c', 'b']
+    assert futures['d'].cancelled and futures['d'].done()
+    pipeline.close()
+    assert resolved == ['a', 'c', 'b']
+
+
+def test_pipeline_wait():
+    '''Verifies waiting for issues moves them to the front of the queue, and returns those that raised.'''
+    (pipeline, gate, resolved) = blocked_pipeline()
+    for (priority, url) in enumerate('bcd'):
+        pipeline.submit(url, None, priority)
+
+    threading.Timer(0.1, gate.set).start()
+    assert pipeline.wait(['d']) == []
+    assert resolved[:2] == ['a', 'd']
+
+    failing = FetchPipeline(lambda url, parsed_url: 1 / 0)
+    failing.submit('e', None, 0)
+    assert [(future.url, type(future.exception)) for future in failing.wait(['e', 'unknown'])] == [
+        ('e', ZeroDivisionError)]
+    pipeline.close()
+    failing.close()
+
+
+def test_pipeline_run(testdir, github_server, github_server_args, open_issues, closed_issues):
+    '''Verifies --github-pipeline fetches the issues of selected tests in run order, reporting them from the main thread.'''
+    testdir.makeconftest("""
+        import json
+        import threading
+
+        def pytest_github_issue_fetched(config, url, record, elapsed):
+            with open('hooks.log', 'a') as fd:
+                fd.write(json.dumps([url, threading.current_thread().name]) + '\\n')
+    """)
+    testdir.makepyfile("""
+        import pytest
+
+        @pytest.mark.github('%s')
+        def test_first():
+            assert False
+
+        @pytest.mark.github('%s')
+        def test_deselected():
+            assert False
+
+        @pytest.mark.github('%s')
+        def test_last():
+            assert False
+
+        @pytest.mark.github('%s')
+        def test_closed():
+            assert False
+    """ % (open_issues[0], open_issues[1], open_issues[2], closed_issues[0]))
+    github_server.add_issue(closed_issues[0], state='closed')
+    # Slow enough that the issues of later tests are still queued once tests are deselected
+    github_server.latency = 0.3
+
+    result = testdir.runpytest(*github_server_args + ['--github-pipeline', '-k', 'not deselected'])
+    result.assert_outcomes(xfailed=2, failed=1)
+    assert [path for (method, path) in github_server.requests if '/repos/' in path] == [
+        '/repos/pytest-github/open/issues/1',
+        '/repos/pytest-github/open/issues/3',
+        '/repos/pytest-github/closed/issues/4',
+    ]
+
+    events = [json.loads(line) for line in testdir.tmpdir.join('hooks.log').readlines()]
+    assert sorted(events) == sorted([[url, 'MainThread'] for url in [open_issues[0], open_issues[2], closed_issues[0]]])
+
+
+@pytest.mark.parametrize('args', [['--github-engine', 'graphql'], ['--github-cache-sync']])
+def test_pipeline_usage(testdir, args):
+    '''Verifies --github-pipeline is rejected with engines and options resolving issues in batches.'''
+    testdir.makepyfile("""
+        def test_foo():
+            pass
+    """)
+    result = testdir.runpytest('--github-pipeline', *args)
+    result.stderr.fnmatch_lines(['*--github-pipeline requires --github-engine=rest, without --github-cache-sync*'])
+
+
+def test_pipeline_cache(testdir, github_server, github_server_args, open_issues):
+    '''Verifies issues fetched by --github-pipeline are persisted for later runs once the session finishes.'''
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.github(*%s)
+        def test_foo():
+            assert False
+    """ % open_issues)
+
+    for _ in range(2):
+        result = testdir.runpytest(*github_server_args + ['--github-pipeline', '--github-cache-ttl', '3600'])
+        result.assert_outcomes(xfailed=1)
+    assert github_server.count('/repos/') == len(open_issues)
+
+
+def test_pipeline_hook_metrics(testdir, github_server_args, open_issues, closed_issues):
+    '''Verifies issues resolved by pytest_github_resolve_issues while collecting are counted as cached once.'''
+    testdir.makeconftest("""
+        def pytest_github_resolve_issues(config, urls):
+            return dict((url, {'html_url': url, 'state': 'closed', 'title': 'Mirrored', 'labels': []})
+                        for url in urls if 'closed' in url)
+    """)
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.github('%s', '%s')
+        def test_foo():
+            assert False
+    """ % (open_issues[0], closed_issues[0]))
+    result = testdir.runpytest(*github_server_args + ['--github-pipeline'])
+    result.stdout.fnmatch_lines(['issues: 2 (1 cached, 1 fetched)'])
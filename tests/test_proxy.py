@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+
+import pytest
+
+try:
+    from urllib.error import HTTPError
+    from urllib.request import Request, urlopen
+except ImportError:  # python 2
+    from urllib2 import HTTPError, Request, urlopen
+
+from pytest_github import proxy
+from . import assert_outcome
+
+
+@pytest.fixture()
+def proxy_server(request, issue_server):
+    '''Proxy issue_server, caching responses for 300 seconds unless another ttl is given as a parameter.'''
+    upstream = 'http://127.0.0.1:%s' % issue_server.server_address[1]
+    server = proxy.make_server(upstream=upstream, ttl=getattr(request, 'param', 300))
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    request.addfinalizer(server.server_close)
+    request.addfinalizer(server.shutdown)
+    server.url = 'http://127.0.0.1:%s' % server.server_address[1]
+    return server
+
+
+def get(url, headers=None):
+    try:
+        response = urlopen(Request(url, headers=headers or {}), timeout=10)
+    except HTTPError as e:
+        response = e
+    try:
+        return (response.code, response.read())
+    finally:
+        response.close()
+
+
+def test_proxy_coalesces_concurrent_requests(proxy_server, issue_server):
+    '''Verifies concurrent requests for the same issue make one upstream request.'''
+    issue_server.delay = 0.2
+    url = proxy_server.url + '/repos/pytest-github/open/issues/1'
+    responses = []
+    threads = [threading.Thread(target=lambda: responses.append(get(url))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    (status, body) = get(url)
+
+    assert issue_server.paths == ['/repos/pytest-github/open/issues/1']
+    assert set(responses) == set([(status, body)])
+    assert status == 200
+    assert json.loads(body.decode('utf-8'))['html_url'] == 'https://github.com/pytest-github/open/issues/1'
+
+
+@pytest.mark.parametrize('proxy_server', [0], indirect=True)
+def test_proxy_revalidates_expired_responses(proxy_server, issue_server):
+    '''Verifies expired responses are revalidated upstream, and still served in full.'''
+    url = proxy_server.url + '/repos/pytest-github/closed/issues/4'
+    first = get(url)
+    second = get(url)
+    assert first == second
+    assert first[0] == 200
+    assert len(issue_server.paths) == 2
+
+
+def test_proxy_answers_conditional_requests(proxy_server):
+    '''Verifies clients holding the current ETag get 304 Not Modified.'''
+    url = proxy_server.url + '/repos/pytest-github/open/issues/2'
+    etag = '"https://github.com/pytest-github/open/issues/2"'
+    assert get(url, {'If-None-Match': etag}) == (304, b'')
+    assert get(url, {'If-None-Match': '"outdated"'})[0] == 200
+
+
+def test_proxy_unreachable_upstream():
+    '''Verifies upstream connection errors are reported as 502 Bad Gateway, and not cached.'''
+    responses = proxy.ResponseCache(proxy.Upstream('http://127.0.0.1:1', timeout=1))
+    for _ in range(2):
+        response = responses.get('/repos/pytest-github/open/issues/1')
+        assert response.status == 502
+        assert 'Bad Gateway' in json.loads(response.body.decode('utf-8'))['message']
+
+
+def test_plugin_uses_proxy(testdir, monkeypatch, github_requests, open_issues):
+    '''Verifies --github-proxy resolves issues through the proxy, without logging in.'''
+    from .conftest import FakeGitHub
+
+    def login(*args):
+        raise AssertionError('github3.login() called')
+
+    clients = []
+    monkeypatch.setattr('github3.login', login)
+    monkeypatch.setattr('github3.GitHub', lambda: clients.append(FakeGitHub(None, None)) or clients[-1])
+
+    src = """
+        import pytest
+        @pytest.mark.github(*%s)
+        def test_foo():
+            assert False
+    """ % open_issues
+    result = testdir.inline_runsource(src, *['--github-proxy', 'http://127.0.0.1:8765/'])
+    assert_outcome(result, xfailed=1)
+    assert len(github_requests) == len(open_issues)
+    assert [client.session.base_url for client in clients] == ['http://127.0.0.1:8765']
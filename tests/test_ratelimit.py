@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from pytest_github.ratelimit import RateLimitExceeded, RateLimitScheduler
+from . import assert_outcome
+
+
+class FakeClock(object):
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeResponse(object):
+    def __init__(self, status_code, headers):
+        self.status_code = status_code
+        self.headers = headers
+
+
+class FakeRateLimitError(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+@pytest.fixture()
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture()
+def scheduler(clock):
+    return RateLimitScheduler(max_wait=60, low_water=10, clock=clock, sleep=clock.sleep)
+
+
+def test_scheduler_observes_headers(scheduler):
+    '''Verifies each resource keeps its own budget.'''
+    assert scheduler.remaining() is None
+    assert scheduler.can_afford(10000)
+
+    scheduler.observe(FakeResponse(200, {'X-RateLimit-Remaining': '5', 'X-RateLimit-Reset': '2000'}))
+    scheduler.observe(FakeResponse(200, {'X-RateLimit-Remaining': '50', 'X-RateLimit-Resource': 'graphql'}))
+    assert scheduler.remaining('core') == 5
+    assert scheduler.remaining('graphql') == 50
+    assert not scheduler.can_afford(6)
+    assert scheduler.can_afford(6, 'graphql')
+
+
+def test_scheduler_paces_low_budget(scheduler, clock):
+    '''Verifies the last of the budget is spread until the limit resets.'''
+    scheduler.update('core', 1000, clock.now + 30)
+    scheduler.wait()
+    assert clock.sleeps == []
+
+    scheduler.update('core', 5, clock.now + 30)
+    scheduler.wait()
+    scheduler.wait()
+    assert clock.sleeps == [6.0, 6.0]
+
+
+def test_scheduler_reserves_without_sleeping(scheduler, clock):
+    '''Verifies reserved requests are paced like waiting ones, leaving the caller to wait and report it.'''
+    scheduler.update('core', 5, clock.now + 30)
+    assert [scheduler.reserve(), scheduler.reserve()] == [6.0, 6.0 + 30.0 / 4]
+    assert clock.sleeps == []
+
+    scheduler.record_wait(12.0)
+    assert scheduler.waited == 12.0
+    assert scheduler.retry_delay(FakeResponse(200, {}), 0) is None
+    assert scheduler.retry_delay(FakeResponse(403, {'Retry-After': '1'}), scheduler.max_retries) is None
+    assert 1 <= scheduler.retry_delay(FakeResponse(403, {'Retry-After': '1'}), 0) <= 2
+
+
+def test_scheduler_gives_up_on_distant_reset(scheduler, clock):
+    '''Verifies requests fail fast rather than waiting past max_wait.'''
+    scheduler.update('core', 0, clock.now + 3600)
+    with pytest.raises(RateLimitExceeded):
+        scheduler.wait()
+    assert clock.sleeps == []
+
+
+def test_scheduler_retries_secondary_rate_limit(scheduler, clock):
+    '''Verifies Retry-After is honoured before retrying a request.'''
+    responses = [
+        FakeRateLimitError(FakeResponse(403, {'Retry-After': '3'})),
+        FakeRateLimitError(FakeResponse(429, {})),
+        'ok',
+    ]
+
+    def request():
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    assert scheduler.call(request) == 'ok'
+    assert len(clock.sleeps) == 2
+    assert 3 <= clock.sleeps[0] <= 6
+    assert 2 <= clock.sleeps[1] <= 4
+
+
+def test_scheduler_does_not_retry_other_errors(scheduler):
+    '''Verifies errors unrelated to rate limits are raised immediately.'''
+    def request():
+        raise FakeRateLimitError(FakeResponse(404, {}))
+
+    with pytest.raises(FakeRateLimitError):
+        scheduler.call(request)
+
+
+@pytest.mark.usefixtures("monkeypatch_github3")
+def test_rate_limit_falls_back_to_cache(testdir, monkeypatch, github_requests, open_issues, closed_issues):
+    '''Verifies expired issues are reused when the rate limit can't cover every pending issue.'''
+    from .conftest import FakeGitHub
+
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.github(*%s)
+        def test_foo():
+            assert False
+
+        @pytest.mark.github(*%s)
+        def test_bar():
+            assert False
+    """ % (open_issues, closed_issues))
+    testdir.inline_run('--github-cache-ttl', '3600')
+
+    # Expire every cached issue
+    cache_file = testdir.tmpdir.join('.pytest_cache', 'v', 'github', 'issues')
+    records = json.loads(cache_file.read())
+    for record in records.values():
+        record['fetched_at'] = 0
+    cache_file.write(json.dumps(records))
+
+    monkeypatch.setattr(FakeGitHub, 'rate_limit', lambda self: {
+        'resources': {'core': {'remaining': 1, 'reset': 0}},
+    }, raising=False)
+    del github_requests[:]
+    result = testdir.inline_run('--github-cache-ttl', '3600')
+    assert_outcome(result, xfailed=1, failed=1)
+    assert github_requests == []
+
+
+@pytest.mark.usefixtures("monkeypatch_github3")
+def test_rate_limit_counts_listing_pages(testdir, monkeypatch, recwarn, github_requests):
+    '''Verifies repositories listed in bulk are planned as one request per page, rather than one per issue.'''
+    from .conftest import FakeGitHub
+
+    issues = ['https://github.com/pytest-github/open/issues/%s' % number for number in range(1, 31)]
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.github(*%s)
+        def test_foo():
+            assert False
+    """ % issues)
+    testdir.inline_run('--github-cache-ttl', '3600')
+
+    # Expire every cached issue, and change the title of one
+    cache_file = testdir.tmpdir.join('.pytest_cache', 'v', 'github', 'issues')
+    records = json.loads(cache_file.read())
+    for record in records.values():
+        record['fetched_at'] = 0
+    records[issues[0]]['title'] = 'Outdated title'
+    cache_file.write(json.dumps(records))
+
+    # Enough for the one page listing every issue, but not for a request per issue
+    monkeypatch.setattr(FakeGitHub, 'rate_limit', lambda self: {
+        'resources': {'core': {'remaining': 2, 'reset': 0}},
+    }, raising=False)
+    del github_requests[:]
+    result = testdir.inline_run('--github-cache-ttl', '3600')
+    assert_outcome(result, xfailed=1)
+    assert github_requests == [('GET', 'https://api.github.com/repos/pytest-github/open/issues')]
+    assert not [w for w in recwarn if 'rate limit' in str(w.message)]
+    assert json.loads(cache_file.read())[issues[0]]['title'] == 'Mock issue title'
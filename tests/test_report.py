@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import json
+from xml.etree import ElementTree
+
+import pytest
+
+
+def read_report(path):
+    with open(str(path)) as fd:
+        return [json.loads(line) for line in fd]
+
+
+@pytest.mark.usefixtures('monkeypatch_github3')
+def test_report_links(testdir, open_issues, closed_issues):
+    '''Verifies --github-report lists each issue once, and each test linked to it with its outcome.'''
+    testdir.makepyfile("""
+        import pytest
+
+        @pytest.mark.github('%s')
+        def test_open():
+            assert False
+
+        @pytest.mark.github('%s', skip=True)
+        def test_open_skip():
+            assert False
+
+        @pytest.mark.github('%s', '%s')
+        @pytest.mark.parametrize('value', [1, 2])
+        def test_closed(value):
+            assert value == 1
+
+        def test_unlinked():
+            pass
+    """ % (open_issues[0], open_issues[0], closed_issues[0], closed_issues[1]))
+    result = testdir.runpytest('--github-report', 'report.jsonl')
+    result.assert_outcomes(passed=2, failed=1, skipped=1, xfailed=1)
+
+    records = read_report(testdir.tmpdir.join('report.jsonl'))
+    issues = [record for record in records if record['type'] == 'issue']
+    links = [(record['issue'], record['nodeid'], record['outcome']) for record in records if record['type'] == 'link']
+    assert [(issue['issue'], issue['state'], issue['resolved']) for issue in issues] == [
+        (open_issues[0], 'open', False),
+        (closed_issues[0], 'closed', True),
+        (closed_issues[1], 'closed', True),
+    ]
+    assert issues[0]['title'] == 'Mock issue title'
+    assert links == [
+        (open_issues[0], 'test_report_links.py::test_open', 'xfailed'),
+        (open_issues[0], 'test_report_links.py::test_open_skip', 'skipped'),
+        (closed_issues[0], 'test_report_links.py::test_closed[1]', 'passed'),
+        (closed_issues[1], 'test_report_links.py::test_closed[1]', 'passed'),
+        (closed_issues[0], 'test_report_links.py::test_closed[2]', 'failed'),
+        (closed_issues[1], 'test_report_links.py::test_closed[2]', 'failed'),
+    ]
+
+    # Each issue is written before the first test linked to it
+    assert records.index(issues[1]) < [record.get('nodeid') for record in records].index(
+        'test_report_links.py::test_closed[1]')
+
+
+@pytest.mark.usefixtures('monkeypatch_github3')
+def test_report_collect_only(testdir, open_issues):
+    '''Verifies --github-report lists linked tests without an outcome when they aren't run.'''
+    testdir.makepyfile("""
+        import pytest
+
+        @pytest.mark.github('%s')
+        @pytest.mark.parametrize('value', ['a', 'b'], ids=['a', 'b'])
+        def test_foo(value):
+            pass
+    """ % open_issues[0])
+    testdir.runpytest('--collect-only', '--github-report', 'report.jsonl')
+
+    records = read_report(testdir.tmpdir.join('report.jsonl'))
+    assert records == [
+        dict(type='issue', issue=open_issues[0], state='open', title='Mock issue title', labels=['state:Ready For Test'],
+             resolved=False),
+        dict(type='link', issue=open_issues[0], nodeid='test_report_collect_only.py::test_foo[a]', outcome=None),
+        dict(type='link', issue=open_issues[0], nodeid='test_report_collect_only.py::test_foo[b]', outcome=None),
+    ]
+
+
+@pytest.mark.usefixtures('monkeypatch_github3')
+def test_junitxml_properties(testdir, open_issues, closed_issues):
+    '''Verifies --junitxml lists the github issues of each test as properties.'''
+    testdir.makepyfile("""
+        import pytest
+
+        @pytest.mark.github('%s', '%s')
+        def test_foo():
+            pass
+
+        @pytest.mark.github('%s', ids=['b'])
+        @pytest.mark.parametrize('value', ['a', 'b'], ids=['a', 'b'])
+        def test_bar(value):
+            pass
+    """ % (closed_issues[0], closed_issues[1], closed_issues[2]))
+    testdir.runpytest('--junitxml', 'junit.xml')
+
+    properties = dict(
+        (testcase.get('name'), [(prop.get('name'), prop.get('value')) for prop in testcase.iter('property')])
+        for testcase in ElementTree.parse(str(testdir.tmpdir.join('junit.xml'))).iter('testcase'))
+    assert properties == {
+        'test_foo': [('github_issue', closed_issues[0]), ('github_issue', closed_issues[1])],
+        'test_bar[a]': [],
+        'test_bar[b]': [('github_issue', closed_issues[2])],
+    }
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+from . import assert_outcome
+
+
+@pytest.mark.usefixtures("monkeypatch_github3")
+def test_snapshot_write(testdir, issue_src, open_issues, closed_issues):
+    '''Verifies --github-snapshot-write records every collected issue.'''
+
+    testdir.makepyfile(issue_src)
+    result = testdir.inline_run('--collectonly', '--github-snapshot-write', 'github.lock')
+    assert result.ret == 0
+
+    snapshot = json.loads(testdir.tmpdir.join('github.lock').read())
+    assert sorted(snapshot['issues']) == sorted(open_issues + closed_issues)
+    for url, record in snapshot['issues'].items():
+        assert sorted(record) == ['fetched_at', 'labels', 'state', 'title']
+        assert record['state'] == ('closed' if url in closed_issues else 'open')
+
+
+def test_snapshot_read(testdir, monkeypatch, issue_src, open_issues, closed_issues):
+    '''Verifies --github-snapshot-read resolves issues without logging in to GitHub.'''
+
+    def login(*args):
+        raise AssertionError('github3.login called')
+    monkeypatch.setattr('github3.login', login)
+
+    snapshot = dict(issues=dict(
+        (url, dict(state='closed' if url in closed_issues else 'open', title='title', labels=[], fetched_at=0))
+        for url in open_issues + closed_issues))
+    testdir.tmpdir.join('github.lock').write(json.dumps(snapshot))
+    testdir.makepyfile(issue_src)
+
+    result = testdir.inline_run('--github-snapshot-read', 'github.lock')
+    assert_outcome(result, xfailed=1, failed=1)
+
+
+def test_snapshot_read_missing_issue(testdir, issue_src):
+    '''Verifies issues missing from --github-snapshot-read are reported.'''
+
+    testdir.tmpdir.join('github.lock').write(json.dumps(dict(issues=dict())))
+    testdir.makepyfile(issue_src)
+
+    result = testdir.runpytest('--github-snapshot-read', 'github.lock')
+    result.assert_outcomes(failed=2)
+    assert 'Not found in github snapshot' in ' '.join(result.stdout.lines)
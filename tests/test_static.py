@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+import json
+import textwrap
+
+import pytest
+
+from pytest_github import scanner
+
+
+def test_scan_source(open_issues, closed_issues):
+    '''Verifies literal github marker URLs are found, and linked to the tests their closest marker applies to.'''
+    result = scanner.scan_source(textwrap.dedent("""
+        import pytest
+        from pytest import mark
+
+        pytestmark = [pytest.mark.slow, pytest.mark.github('%s')]
+        URL = '%s'
+
+        def test_module():
+            pass
+
+        @mark.github('%s', '%s')
+        @pytest.mark.parametrize('value', [pytest.param(1, marks=pytest.mark.github('%s'))])
+        def test_function(value):
+            pass
+
+        @pytest.mark.github(URL)
+        def test_runtime():
+            pass
+
+        class TestClass(object):
+            pytestmark = pytest.mark.github('%s')
+
+            def test_method(self):
+                pass
+
+        def helper():
+            pass
+    """ % (open_issues[0], open_issues[1], closed_issues[0], closed_issues[1], closed_issues[2], open_issues[2])))
+
+    assert result['urls'] == [open_issues[0], closed_issues[0], closed_issues[1], closed_issues[2], open_issues[2]]
+    assert result['tests'] == [
+        ['test_module', [open_issues[0]]],
+        ['test_function', [closed_issues[0], closed_issues[1]]],
+        ['TestClass.test_method', [open_issues[2]]],
+    ]
+
+
+def test_scan_index(testdir, monkeypatch, open_issues):
+    '''Verifies test files are only parsed again once their modification time or size changes.'''
+    path = testdir.makepyfile(test_foo="""
+        import pytest
+        @pytest.mark.github('%s')
+        def test_foo():
+            pass
+    """ % open_issues[0])
+    testdir.makepyfile(helper="URL = 'https://github.com/pytest-github/open/issues/9'")
+    parsed = []
+    scan_source = scanner.scan_source
+    monkeypatch.setattr(scanner, 'scan_source', lambda source, **kwargs: parsed.append(source) or scan_source(source))
+
+    index = {}
+    for _ in range(2):
+        scans = scanner.scan([str(testdir.tmpdir)], index)
+        assert [(p, scan['urls']) for (p, scan) in scans] == [(str(path), [open_issues[0]])]
+    assert len(parsed) == 1
+
+    path.write(path.read() + '\n')
+    assert scanner.scan([str(testdir.tmpdir)], index)[0][1]['urls'] == [open_issues[0]]
+    assert len(parsed) == 2
+
+
+def test_static_prefetch(testdir, github_server, github_server_args, open_issues, closed_issues):
+    '''Verifies --github-static fetches the issues found in test files once, reporting them from the main thread.'''
+    testdir.makeconftest("""
+        import json
+        import threading
+
+        def log(event):
+            with open('hooks.log', 'a') as fd:
+                fd.write(json.dumps(event + [threading.current_thread().name]) + '\\n')
+
+        def pytest_github_issue_fetched(config, url, record, elapsed):
+            log(['fetched', url])
+
+        def pytest_github_fetch_failed(config, url, exc):
+            log(['failed', url])
+    """)
+    testdir.makepyfile("""
+        import pytest
+
+        pytestmark = pytest.mark.github('%s')
+
+        def test_open():
+            assert False
+
+        @pytest.mark.github('%s')
+        def test_closed():
+            assert False
+
+        @pytest.mark.github('%s')
+        def test_missing():
+            assert False
+    """ % (open_issues[0], closed_issues[0], open_issues[1]))
+    github_server.autocreate = False
+    github_server.add_issue(open_issues[0])
+    github_server.add_issue(closed_issues[0], state='closed')
+
+    result = testdir.runpytest(*github_server_args + ['--github-static'])
+    result.assert_outcomes(failed=2, xfailed=1)
+    assert github_server.count('/repos/') == 3
+    result.stdout.fnmatch_lines(['*Unable to inspect github issue %s*' % open_issues[1]])
+
+    events = [json.loads(line) for line in testdir.tmpdir.join('hooks.log').readlines()]
+    assert sorted(events) == sorted([
+        ['fetched', open_issues[0], 'MainThread'],
+        ['fetched', closed_issues[0], 'MainThread'],
+        ['failed', open_issues[1], 'MainThread'],
+    ])
+
+
+def test_static_prefetch_deselected(testdir, github_server, github_server_args, open_issues):
+    '''Verifies --github-static fetches issues before collection, so deselected tests' issues are fetched too.'''
+    testdir.makepyfile("""
+        import pytest
+
+        @pytest.mark.github('%s')
+        def test_foo():
+            assert False
+
+        @pytest.mark.github('%s')
+        def test_bar():
+            assert False
+    """ % (open_issues[0], open_issues[1]))
+
+    result = testdir.runpytest(*github_server_args + ['--github-static', '-k', 'test_foo'])
+    result.assert_outcomes(xfailed=1)
+    assert github_server.count('/repos/') == 2
+
+
+def test_static_summary(testdir, github_server, github_server_args, open_issues, closed_issues):
+    '''Verifies --github-summary --github-static summarizes test files without importing them.'''
+    testdir.makepyfile("""
+        import pytest
+
+        raise RuntimeError('not imported')
+
+        @pytest.mark.github('%s', '%s')
+        def test_foo():
+            pass
+
+        class TestBar(object):
+            @pytest.mark.github('%s')
+            @pytest.mark.parametrize('value', [1, 2])
+            def test_bar(self, value):
+                pass
+    """ % (open_issues[0], closed_issues[0], open_issues[0]))
+    github_server.add_issue(closed_issues[0], state='closed')
+
+    result = testdir.runpytest(*github_server_args + ['--github-static', '--github-summary'])
+    assert result.ret == 0
+    method = 'TestBar().test_bar' if int(pytest.__version__.split('.')[0]) < 7 else 'TestBar.test_bar'
+    prefix = '%s/test_static_summary.py' % testdir.tmpdir.basename
+    result.stdout.fnmatch_lines([
+        'collected 2 github issues',
+        '*github issue report*',
+        'Unresolved Issues',
+        open_issues[0],
+        ' - %s:test_foo' % prefix,
+        ' - %s:%s' % (prefix, method),
+        '',
+        'Resolved Issues',
+        closed_issues[0],
+        ' - %s:test_foo' % prefix,
+    ])
+    assert 'not imported' not in result.stdout.str()
+    assert github_server.count('/repos/') == 2
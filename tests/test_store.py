@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import subprocess
+import sys
+
+from pytest_github.store import IssueStore, issue_key
+
+
+def record(url, fetched_at, state='open'):
+    return dict(html_url=url, state=state, title='Issue', labels=[], etag=None, last_modified=None,
+                fetched_at=fetched_at)
+
+
+def test_issue_key():
+    assert issue_key('Owner', 'Repo', '12') == ('owner', 'repo', 12)
+
+
+def test_store_leases(tmpdir):
+    '''Verifies only one store at a time leases a stale issue, and that leases expire.'''
+    now = [1000.0]
+    path = str(tmpdir.join('issues.db'))
+    first = IssueStore(path, lease=60, clock=lambda: now[0])
+    second = IssueStore(path, lease=60, clock=lambda: now[0])
+    (key, other) = (issue_key('owner', 'repo', 1), issue_key('owner', 'repo', 2))
+
+    assert first.claim([key], fresh_after=900) == [key]
+    assert second.claim([key, other], fresh_after=900) == [other]
+
+    # Once refreshed, the issue is fresh for every store
+    first.put([(key, record('https://github.com/owner/repo/issues/1', 1000.0))])
+    first.release([key])
+    assert second.get([key, other]) == {key: record('https://github.com/owner/repo/issues/1', 1000.0)}
+    assert second.claim([key], fresh_after=900) == []
+
+    # Leases expire, in case their holder never releases them
+    assert first.claim([other], fresh_after=900) == []
+    now[0] += 61
+    assert first.claim([other], fresh_after=900) == [other]
+
+    first.clear()
+    assert second.get([key]) == {}
+    first.close()
+    second.close()
+
+
+def test_store_reused_within_ttl(testdir, github_server, github_server_args, open_issues):
+    '''Verifies issues in --github-store are only fetched once they expire.'''
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.github(*%s)
+        def test_foo():
+            assert False
+    """ % open_issues)
+
+    for _ in range(2):
+        result = testdir.runpytest(*github_server_args + ['--github-store', 'issues.db', '--github-cache-ttl', '3600'])
+        result.assert_outcomes(xfailed=1)
+    assert github_server.count('/repos/') == len(open_issues)
+
+    # Expired issues are revalidated using the validators in the store
+    result = testdir.runpytest(*github_server_args + ['--github-store', 'issues.db'])
+    result.assert_outcomes(xfailed=1)
+    assert github_server.count('/repos/') == 2 * len(open_issues)
+    result.stdout.fnmatch_lines(['revalidated %s github issues (%s not modified, 0 modified)' % (
+        len(open_issues), len(open_issues))])
+
+
+def test_store_shared_by_processes(testdir, github_server, github_server_args, open_issues, closed_issues):
+    '''Verifies concurrent pytest processes sharing --github-store fetch each issue once.'''
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.github(*%s)
+        def test_foo():
+            assert False
+
+        @pytest.mark.github(*%s)
+        def test_bar():
+            assert False
+    """ % (open_issues, closed_issues))
+    for url in closed_issues:
+        github_server.add_issue(url, state='closed')
+    github_server.latency = 0.1
+
+    processes = [subprocess.Popen([sys.executable, '-m', 'pytest', '-p', 'no:cacheprovider'] + github_server_args +
+                                  ['--github-store', 'issues.db', '--github-cache-ttl', '3600'],
+                                  cwd=str(testdir.tmpdir),
+                                  stdout=subprocess.PIPE, stderr=subprocess.STDOUT) for _ in range(4)]
+    for process in processes:
+        output = process.communicate()[0].decode('utf-8')
+        assert '1 failed, 1 xfailed' in output, output
+    assert github_server.count('/repos/') == len(open_issues + closed_issues)
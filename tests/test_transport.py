@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from pytest_github.transport import configure_session
+
+
+def test_configure_session():
+    '''Verifies the github3.py session is pooled, compressed and given timeouts and retries.'''
+    from github3.session import GitHubSession
+
+    session = configure_session(GitHubSession(), pool_size=16, connect_timeout=2, read_timeout=5, retries=3)
+
+    adapter = session.get_adapter('https://api.github.com/repos/some/repo/issues/1')
+    assert adapter._pool_maxsize == 16
+    assert adapter.max_retries.total == 3
+    assert 'POST' not in (getattr(adapter.max_retries, 'allowed_methods', None) or adapter.max_retries.method_whitelist)
+    assert session.timeout == (2, 5)
+    assert 'gzip' in session.headers['Accept-Encoding']
+
+
+@pytest.mark.parametrize('args,pool_size', [
+    ((), 10),
+    (('--github-workers', '32'), 32),
+    (('--github-workers', '32', '--github-pool-size', '8'), 8),
+])
+def test_plugin_session_pool_size(testdir, monkeypatch, args, pool_size):
+    '''Verifies the connection pool is sized to the number of workers.'''
+    import github3
+
+    sessions = []
+    real_login = github3.login
+
+    def login(username, password):
+        api = real_login('username', 'token')
+        sessions.append(api.session)
+        return api
+    monkeypatch.setattr('github3.login', login)
+
+    config = testdir.parseconfigure(*args)
+    plugin = config.pluginmanager.get_plugin('github_helper')
+    assert plugin.api() is not None
+    assert sessions[0].get_adapter('https://api.github.com')._pool_maxsize == pool_size
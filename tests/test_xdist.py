@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+
+import pytest
+
+pytest.importorskip('xdist')
+
+
+@pytest.fixture()
+def xdist_testdir(testdir):
+    '''Replace github3.login in every pytest-xdist worker, logging requests to a file.'''
+    testdir.makeconftest("""
+        import github3
+
+        class FakeIssue(object):
+            def __init__(self, username, repository, number):
+                self.html_url = 'https://github.com/%s/%s/issues/%s' % (username, repository, number)
+                self.title = 'Mock issue title'
+                self.state = 'closed' if 'closed' in repository else 'open'
+                self.labels = []
+
+            def is_closed(self):
+                return self.state == 'closed'
+
+        class FakeResponse(object):
+            status_code = 200
+            headers = {}
+
+            def json(self):
+                return []
+
+        class FakeSession(object):
+            def get(self, url, **kwargs):
+                # Every listing is empty, as no issue changed
+                with open('requests.log', 'a') as fd:
+                    fd.write('%s\\n' % url)
+                return FakeResponse()
+
+        class FakeGitHub(object):
+            session = FakeSession()
+
+            def _build_url(self, *args):
+                return '/'.join(args)
+
+            def issue(self, username, repository, number):
+                with open('requests.log', 'a') as fd:
+                    fd.write('%s/%s/%s\\n' % (username, repository, number))
+                return FakeIssue(username, repository, number)
+
+        github3.login = lambda *args: FakeGitHub()
+    """)
+    return testdir
+
+
+def test_xdist_workers_share_issues(xdist_testdir, open_issues, closed_issues):
+    '''Verifies each issue is only fetched once, regardless of the number of workers.'''
+
+    xdist_testdir.makepyfile("""
+        import pytest
+
+        @pytest.mark.github(*%s)
+        @pytest.mark.parametrize('count', range(8))
+        def test_foo(count):
+            assert False
+
+        @pytest.mark.github(*%s)
+        @pytest.mark.parametrize('count', range(8))
+        def test_bar(count):
+            assert False
+    """ % (open_issues, closed_issues))
+    result = xdist_testdir.runpytest_subprocess('-n', '4')
+    result.assert_outcomes(xfailed=8, failed=8)
+
+    requests = xdist_testdir.tmpdir.join('requests.log').readlines()
+    assert len(requests) == len(open_issues + closed_issues)
+
+
+def test_xdist_report(xdist_testdir, open_issues, closed_issues):
+    '''Verifies --github-report is written once, with the states of issues resolved by workers.'''
+
+    xdist_testdir.makepyfile("""
+        import pytest
+
+        @pytest.mark.github('%s', '%s')
+        @pytest.mark.parametrize('count', range(4))
+        def test_foo(count):
+            assert False
+    """ % (open_issues[0], closed_issues[0]))
+    result = xdist_testdir.runpytest_subprocess('-n', '2', '--github-report', 'report.jsonl')
+    result.assert_outcomes(xfailed=4)
+
+    records = [json.loads(line) for line in xdist_testdir.tmpdir.join('report.jsonl').readlines()]
+    assert sorted((record['issue'], record['state']) for record in records if record['type'] == 'issue') == sorted([
+        (open_issues[0], 'open'), (closed_issues[0], 'closed')])
+    assert sorted((record['nodeid'], record['outcome']) for record in records if record['type'] == 'link') == sorted(
+        ('test_xdist_report.py::test_foo[%s]' % count, 'xfailed') for count in range(4) for issue in range(2))
+
+
+def test_xdist_cache_sync(xdist_testdir, open_issues, closed_issues):
+    '''Verifies issues synced by one worker are shared with the others, and persisted once the session finishes.'''
+
+    xdist_testdir.makepyfile("""
+        import pytest
+
+        @pytest.mark.github(*%s)
+        @pytest.mark.parametrize('count', range(4))
+        def test_foo(count):
+            assert False
+
+        @pytest.mark.github(*%s)
+        @pytest.mark.parametrize('count', range(4))
+        def test_bar(count):
+            assert False
+    """ % (open_issues, closed_issues))
+    xdist_testdir.runpytest_subprocess('-n', '2', '--github-cache-ttl', '3600')
+
+    # Expire every cached issue
+    cache_file = xdist_testdir.tmpdir.join('.pytest_cache', 'v', 'github', 'issues')
+    records = json.loads(cache_file.read())
+    assert sorted(records) == sorted(open_issues + closed_issues)
+    for record in records.values():
+        record['fetched_at'] = time.time() - 7200
+    cache_file.write(json.dumps(records))
+
+    xdist_testdir.tmpdir.join('requests.log').remove()
+    result = xdist_testdir.runpytest_subprocess('-n', '2', '--github-cache-ttl', '3600', '--github-cache-sync')
+    result.assert_outcomes(xfailed=4, failed=4)
+    requests = xdist_testdir.tmpdir.join('requests.log').read().split()
+    assert sorted(requests) == ['repos/pytest-github/closed/issues', 'repos/pytest-github/open/issues']
+
+    records = json.loads(cache_file.read())
+    assert sorted(records) == sorted(open_issues + closed_issues)
+    assert all(time.time() - record['fetched_at'] < 60 for record in records.values())
+
+
+def test_xdist_pipeline(xdist_testdir, open_issues, closed_issues):
+    '''Verifies --github-pipeline requires --github-store with workers, which then fetch each issue once.'''
+
+    xdist_testdir.makepyfile("""
+        import pytest
+
+        @pytest.mark.github(*%s)
+        @pytest.mark.parametrize('count', range(4))
+        def test_foo(count):
+            assert False
+
+        @pytest.mark.github(*%s)
+        @pytest.mark.parametrize('count', range(4))
+        def test_bar(count):
+            assert False
+    """ % (open_issues, closed_issues))
+    result = xdist_testdir.runpytest_subprocess('-n', '2', '--github-pipeline')
+    result.stderr.fnmatch_lines(['*--github-pipeline requires --github-store with pytest-xdist*'])
+
+    result = xdist_testdir.runpytest_subprocess('-n', '2', '--github-pipeline', '--github-store', 'issues.db',
+                                                '--github-cache-ttl', '3600')
+    result.assert_outcomes(xfailed=4, failed=4)
+    requests = xdist_testdir.tmpdir.join('requests.log').readlines()
+    assert len(requests) == len(open_issues + closed_issues)
+
+
+def test_xdist_metrics(xdist_testdir, open_issues, closed_issues):
+    '''Verifies the metrics of every worker are merged, then reported and written once by the controller.'''
+
+    xdist_testdir.makepyfile("""
+        import pytest
+
+        @pytest.mark.github(*%s)
+        @pytest.mark.parametrize('count', range(4))
+        def test_foo(count):
+            assert False
+    """ % (open_issues + closed_issues))
+    result = xdist_testdir.runpytest_subprocess('-n', '2', '--github-metrics-json', 'metrics.json')
+    result.assert_outcomes(xfailed=4)
+    issues = len(open_issues + closed_issues)
+
+    # The first worker fetches every issue, and the other reuses them
+    result.stdout.fnmatch_lines(['*github metrics*', 'issues: %s (%s cached, %s fetched)' % (issues, issues, issues)])
+    metrics = json.loads(xdist_testdir.tmpdir.join('metrics.json').read())
+    assert (metrics['issues'], metrics['cache_hits'], metrics['cache_misses']) == (issues, issues, issues)